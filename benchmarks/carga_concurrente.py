@@ -0,0 +1,285 @@
+"""
+Prueba de carga con sesiones concurrentes simuladas (streamlit.testing AppTest).
+
+Cada sesión es un AppTest de formulario_polizas.py que corre en su propio
+hilo y recorre flujos elegidos al azar (con semilla):
+
+- navegar_cobranza: abrir Cobranza y cambiar de página en la tabla
+- registrar_pago: elegir un recibo abierto y registrar el pago
+- agregar_prospecto: capturar y guardar un prospecto nuevo
+- buscar_clientes: buscar en Consulta de Clientes y abrir el primer resultado
+
+Todas las sesiones comparten el mismo proceso (cachés de Streamlit, caché
+compartida y servidor de métricas, igual que una réplica real) y un
+LibroLocal con una cartera sintética en lugar de Google Sheets; ``--latencia``
+agrega una espera por llamada para simular la red.
+
+AppTest está pensado para una prueba a la vez: en cada run reemplaza
+``st.secrets`` y ``Runtime._instance`` y al terminar los restaura. Para
+correr sesiones en paralelo los secrets se instalan una sola vez (las
+sesiones no los pasan a AppTest) y Runtime.instance() conserva la última
+instancia para que una sesión que termina no deje sin runtime a las demás.
+Además cada sesión tiene su propio ScriptCache, así que la compilación del
+script se serializa con un candado global (``ast.parse`` en varios hilos a
+la vez falla en CPython 3.11 con "AST constructor recursion depth mismatch").
+
+Reporta rendimiento (reruns y flujos por segundo), latencia p50/p95/p99 de
+cada rerun por flujo y las llamadas al backend por operación.
+
+Uso (desde la raíz del repositorio):
+    python -m benchmarks.carga_concurrente --sesiones 8 --iteraciones 10
+    python -m benchmarks.carga_concurrente --sesiones 16 --filas 10000 --latencia 0.15
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import numpy as np
+
+from benchmarks.datos_sinteticos import generar_cartera
+from benchmarks.libro_local import ClienteLocal, LibroLocal
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPT = os.path.join(RAIZ, "formulario_polizas.py")
+TIEMPO_LIMITE_RERUN = 300  # Segundos
+
+PESTAÑA_COBRANZA = "💰 Cobranza"
+PESTAÑA_PROSPECTOS = "👥 Prospectos"
+PESTAÑA_CONSULTA = "🔍 Consulta de Clientes"
+
+# Proporción de cada flujo en la mezcla de una sesión
+MEZCLA = {
+    "navegar_cobranza": 0.4,
+    "buscar_clientes": 0.3,
+    "registrar_pago": 0.15,
+    "agregar_prospecto": 0.15,
+}
+
+
+SECRETS = {
+    "usuario": "carga",
+    "password": "carga",
+    "google_service_account": {"type": "service_account"},
+}
+
+
+def preparar_streamlit():
+    """Secrets globales y runtime persistente entre runs de AppTest concurrentes"""
+    import streamlit as st
+    from streamlit.runtime import Runtime
+    from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+    from streamlit.runtime.secrets import Secrets
+
+    secrets = Secrets()
+    secrets._secrets = SECRETS
+    st.secrets = secrets
+
+    ultimo = {}
+
+    def instancia(cls):
+        if cls._instance is not None:
+            ultimo["runtime"] = cls._instance
+            return cls._instance
+        if "runtime" not in ultimo:
+            raise RuntimeError("Runtime hasn't been created!")
+        return ultimo["runtime"]
+
+    Runtime.instance = classmethod(instancia)
+    Runtime.exists = classmethod(lambda cls: cls._instance is not None or "runtime" in ultimo)
+
+    compilar = ScriptCache.get_bytecode
+    candado = threading.Lock()
+
+    def compilar_serializado(self, ruta):
+        with candado:
+            return compilar(self, ruta)
+
+    ScriptCache.get_bytecode = compilar_serializado
+
+
+class Sesion:
+    """Un AppTest autenticado que cronometra cada rerun"""
+
+    def __init__(self, numero, semilla):
+        from streamlit.testing.v1 import AppTest
+
+        self.numero = numero
+        self.rng = random.Random(semilla * 1000 + numero)
+        self.tiempos = defaultdict(list)
+        self.errores = []
+        self.at = AppTest.from_file(SCRIPT, default_timeout=TIEMPO_LIMITE_RERUN)
+        self.at.session_state["authenticated"] = True
+        self.flujo = "inicio"
+        self.rerun(self.at)
+
+    def rerun(self, elemento):
+        """Ejecuta ``elemento.run()`` (el AppTest o un widget con valor ya asignado) y mide el rerun"""
+        inicio = time.perf_counter()
+        elemento.run()
+        self.tiempos[self.flujo].append(time.perf_counter() - inicio)
+        if self.at.exception:
+            self.errores.append((self.flujo, self.at.exception[0].message))
+
+    def ir_a(self, pestaña):
+        selector = self.at.radio(key="tab_selector")
+        if selector.value != pestaña:
+            self.rerun(selector.set_value(pestaña))
+
+    def navegar_cobranza(self):
+        self.ir_a(PESTAÑA_COBRANZA)
+        pagina = self.at.number_input(key="tabla_cobranza_pagina")
+        if pagina.max > 1:
+            self.rerun(pagina.set_value(self.rng.randint(1, int(pagina.max))))
+
+    def registrar_pago(self):
+        self.ir_a(PESTAÑA_COBRANZA)
+        recibos = [elemento for elemento in self.at.selectbox if elemento.key == "select_recibo_cobranza"]
+        if not recibos or len(recibos[0].options) < 2:
+            return
+        self.rerun(recibos[0].set_value(self.rng.choice(recibos[0].options[1:])))
+        fecha = [elemento for elemento in self.at.text_input if elemento.key == "fecha_pago_cob"]
+        if not fecha:
+            return
+        fecha[0].set_value(datetime.now().strftime("%d/%m/%Y"))
+        boton = next(elemento for elemento in self.at.button if elemento.label == "💾 Registrar Pago")
+        self.rerun(boton.click())
+
+    def agregar_prospecto(self):
+        self.ir_a(PESTAÑA_PROSPECTOS)
+        clave = self.at.session_state["form_key"]
+        self.at.text_input(key=f"nombre_razon_{clave}").set_value(f"PROSPECTO CARGA {self.numero}-{self.rng.randrange(10 ** 6)}")
+        self.at.text_input(key=f"fecha_registro_{clave}").set_value(datetime.now().strftime("%d/%m/%Y"))
+        boton = next(elemento for elemento in self.at.button if elemento.label == "💾 Agregar Nuevo Prospecto")
+        self.rerun(boton.click())
+
+    def buscar_clientes(self):
+        self.ir_a(PESTAÑA_CONSULTA)
+        selector = self.at.selectbox(key="consulta_cliente")
+        nombres = [opcion for opcion in selector.options if opcion]
+        if not nombres:
+            return
+        # Parte de un nombre conocido, como lo teclearía un agente
+        palabra = self.rng.choice(self.rng.choice(nombres).split())
+        self.rerun(self.at.text_input(key="consulta_cliente_consulta").set_value(palabra[:max(3, len(palabra) - 2)]))
+        selector = self.at.selectbox(key="consulta_cliente")
+        if len(selector.options) > 1:
+            self.rerun(selector.set_value(selector.options[1]))
+
+    def recorrer(self, iteraciones):
+        flujos, pesos = zip(*MEZCLA.items())
+        for _ in range(iteraciones):
+            self.flujo = self.rng.choices(flujos, pesos)[0]
+            try:
+                getattr(self, self.flujo)()
+            except Exception as e:
+                self.errores.append((self.flujo, f"{type(e).__name__}: {e}"))
+        return self
+
+
+def preparar_backend(filas, latencia, semilla):
+    """LibroLocal con la cartera sintética y la app apuntando a él (caché compartida en un temporal)"""
+    import cartera.almacenamiento
+
+    directorio = tempfile.mkdtemp(prefix="rizkora_carga_")
+    os.environ["RIZKORA_CACHE_DB"] = os.path.join(directorio, "cache.sqlite3")
+    os.environ["RIZKORA_TRAZAS"] = os.path.join(directorio, "trazas.jsonl")
+    libro = LibroLocal(generar_cartera(filas, semilla), latencia=latencia)
+    cartera.almacenamiento.autorizar = lambda credenciales=None: ClienteLocal(libro)
+    return libro
+
+
+def percentiles(tiempos):
+    if not tiempos:
+        return {"n": 0, "p50_ms": None, "p95_ms": None, "p99_ms": None}
+    p50, p95, p99 = np.percentile(np.asarray(tiempos) * 1000, [50, 95, 99])
+    return {"n": len(tiempos), "p50_ms": round(p50, 1), "p95_ms": round(p95, 1), "p99_ms": round(p99, 1)}
+
+
+def correr(sesiones, iteraciones, filas, latencia=0.0, semilla=0):
+    """
+    Corre la prueba y devuelve el resumen.
+
+    La apertura de sesiones (primer rerun de cada una) no cuenta para el
+    rendimiento ni para las latencias.
+    """
+    os.chdir(RAIZ)
+    preparar_streamlit()
+    libro = preparar_backend(filas, latencia, semilla)
+    with ThreadPoolExecutor(max_workers=sesiones) as ejecutor:
+        abiertas = list(ejecutor.map(lambda numero: Sesion(numero, semilla), range(sesiones)))
+        libro.reiniciar_contadores()
+        inicio = time.perf_counter()
+        terminadas = list(ejecutor.map(lambda sesion: sesion.recorrer(iteraciones), abiertas))
+        transcurrido = time.perf_counter() - inicio
+
+    por_flujo = defaultdict(list)
+    for sesion in terminadas:
+        for flujo, tiempos in sesion.tiempos.items():
+            if flujo != "inicio":
+                por_flujo[flujo].extend(tiempos)
+    todos = [t for tiempos in por_flujo.values() for t in tiempos]
+    errores = [error for sesion in terminadas for error in sesion.errores]
+    return {
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "sesiones": sesiones,
+        "iteraciones": iteraciones,
+        "filas": filas,
+        "latencia_s": latencia,
+        "segundos": round(transcurrido, 2),
+        "reruns_por_segundo": round(len(todos) / transcurrido, 2) if transcurrido else None,
+        "flujos_por_segundo": round(sesiones * iteraciones / transcurrido, 2) if transcurrido else None,
+        "reruns": percentiles(todos),
+        "por_flujo": {flujo: percentiles(tiempos) for flujo, tiempos in sorted(por_flujo.items())},
+        "backend": {**libro.contadores(), "por_operacion": dict(libro.llamadas)},
+        "errores": len(errores),
+        "ejemplos_error": errores[:5],
+        "hilos": threading.active_count(),
+    }
+
+
+def imprimir(resumen):
+    print(f"\n{resumen['sesiones']} sesiones × {resumen['iteraciones']} flujos sobre {resumen['filas']:,} filas "
+          f"(latencia simulada {resumen['latencia_s'] * 1000:.0f} ms) en {resumen['segundos']} s")
+    print(f"Rendimiento: {resumen['reruns_por_segundo']} reruns/s · {resumen['flujos_por_segundo']} flujos/s")
+    print(f"{'flujo':<20} {'reruns':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for flujo, p in list(resumen["por_flujo"].items()) + [("total", resumen["reruns"])]:
+        print(f"{flujo:<20} {p['n']:>7} {p['p50_ms'] or 0:>9.1f} {p['p95_ms'] or 0:>9.1f} {p['p99_ms'] or 0:>9.1f}")
+    backend = resumen["backend"]
+    print(f"Backend: {backend['llamadas']} llamadas, {backend['bytes_enviados'] / 1024:.1f} KB enviados, "
+          f"{backend['bytes_recibidos'] / 1024:.1f} KB recibidos")
+    print("  " + ", ".join(f"{operacion}={n}" for operacion, n in sorted(backend["por_operacion"].items())))
+    if resumen["errores"]:
+        print(f"Errores: {resumen['errores']}")
+        for flujo, mensaje in resumen["ejemplos_error"]:
+            print(f"  [{flujo}] {mensaje}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Prueba de carga con sesiones concurrentes de AppTest")
+    parser.add_argument("--sesiones", type=int, default=4)
+    parser.add_argument("--iteraciones", type=int, default=10, help="Flujos por sesión")
+    parser.add_argument("--filas", type=int, default=1000, help="Tamaño de la cartera sintética")
+    parser.add_argument("--latencia", type=float, default=0.0, help="Segundos simulados por llamada al backend")
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--json", help="Agrega el resumen como línea JSON a este archivo")
+    args = parser.parse_args(argv)
+
+    resumen = correr(args.sesiones, args.iteraciones, args.filas, args.latencia, args.semilla)
+    imprimir(resumen)
+    if args.json:
+        with open(args.json, "a", encoding="utf-8") as f:
+            f.write(json.dumps(resumen, ensure_ascii=False) + "\n")
+    return 1 if resumen["errores"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,240 @@
+"""
+Generador determinista de carteras sintéticas para benchmarks.
+
+Produce las cinco hojas (Prospectos, Polizas, Cobranza, Seguimiento y
+Operacion) con las columnas de cartera.esquema, valores tomados de los
+catálogos OPCIONES_* y fechas dd/mm/yyyy. Los montos mezclan "$12,345.67"
+y "12345.67" como en las hojas reales. La misma semilla y el mismo
+número de filas producen siempre los mismos datos.
+
+Uso:
+    python -m benchmarks.datos_sinteticos --filas 10000 --salida datos_10k
+"""
+
+import argparse
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+from cartera.cobranza import MESES_POR_PERIODICIDAD
+from cartera.esquema import (
+    COLUMNAS_COBRANZA, COLUMNAS_OPERACION, COLUMNAS_POLIZAS, COLUMNAS_PROSPECTOS, COLUMNAS_SEGUIMIENTO,
+    HOJAS, OPCIONES_ASEG, OPCIONES_BANCO, OPCIONES_CLAVE_EMISION, OPCIONES_CONCEPTO_OPERACION, OPCIONES_DEDUCIBLE,
+    OPCIONES_ESTATUS_SEGUIMIENTO, OPCIONES_FORMA_PAGO_OPERACION, OPCIONES_MONEDA, OPCIONES_PAGO, OPCIONES_PERIODICIDAD,
+    OPCIONES_PERSONA, OPCIONES_PRODUCTO, OPCIONES_PROMOCION,
+)
+
+TAMAÑOS = [1_000, 10_000, 100_000, 1_000_000]
+# Fecha a la que están "tomados" los datos; los benchmarks usan la misma como hoy
+FECHA_REFERENCIA = pd.Timestamp("2025-06-30")
+RECIBOS_POR_POLIZA = 4
+
+NOMBRES = ["JUAN", "MARÍA", "JOSÉ", "GUADALUPE", "LUIS", "ANA", "CARLOS", "FERNANDA", "JORGE", "SOFÍA",
+           "MIGUEL", "LAURA", "RICARDO", "PATRICIA", "ALEJANDRO", "VERÓNICA", "FRANCISCO", "ROCÍO", "JAVIER", "ELENA"]
+APELLIDOS = ["HERNÁNDEZ", "GARCÍA", "MARTÍNEZ", "LÓPEZ", "GONZÁLEZ", "PÉREZ", "RODRÍGUEZ", "SÁNCHEZ", "RAMÍREZ",
+             "CRUZ", "FLORES", "GÓMEZ", "MORALES", "VÁZQUEZ", "REYES", "JIMÉNEZ", "TORRES", "DÍAZ", "GUTIÉRREZ",
+             "RUIZ", "MENDOZA", "AGUILAR", "ORTIZ", "MORENO", "CASTILLO"]
+PROVEEDORES = ["OXXO GAS", "PEMEX", "OFFICE DEPOT", "SAT", "META", "GOOGLE", "IMPRENTA DEL CENTRO", "DESPACHO CONTABLE"]
+
+
+def _elegir(rng, opciones, n, p=None):
+    return np.asarray(opciones, dtype=object)[rng.choice(len(opciones), size=n, p=p)]
+
+
+def _fechas(dias):
+    """Días desde FECHA_REFERENCIA a texto dd/mm/yyyy"""
+    return (FECHA_REFERENCIA + pd.to_timedelta(dias, unit="D")).strftime("%d/%m/%Y")
+
+
+def _montos(rng, valores):
+    """Mitad con formato de moneda y mitad como número plano, igual que en las hojas"""
+    formateados = pd.Series(valores).map("${:,.2f}".format).to_numpy(dtype=object)
+    planos = pd.Series(valores).map("{:.2f}".format).to_numpy(dtype=object)
+    return np.where(rng.random(len(valores)) < 0.5, formateados, planos)
+
+
+def _nombres(codigos):
+    """Nombre completo a partir de un código de persona (único hasta 10,000 códigos, luego con sufijo)"""
+    codigos = np.asarray(codigos)
+    base = (
+        pd.Series(np.asarray(NOMBRES, dtype=object)[codigos % len(NOMBRES)])
+        + " " + np.asarray(APELLIDOS, dtype=object)[(codigos // len(NOMBRES)) % len(APELLIDOS)]
+        + " " + np.asarray(APELLIDOS, dtype=object)[(codigos // (len(NOMBRES) * len(APELLIDOS))) % len(APELLIDOS)]
+    )
+    grupo = codigos // (len(NOMBRES) * len(APELLIDOS) ** 2)
+    return np.where(grupo > 0, base + " " + pd.Series(grupo).astype(str), base)
+
+
+def _rfc(rng, nombres, nacimiento):
+    letras = pd.Series(nombres).str.replace(r"[^A-Z]", "", regex=True).str[:4].str.pad(4, fillchar="X")
+    homoclave = pd.Series(rng.integers(0, 36 ** 3, len(nombres))).map(lambda x: np.base_repr(x, 36).zfill(3))
+    return (letras + nacimiento.strftime("%y%m%d") + homoclave).to_numpy(dtype=object)
+
+
+def generar_polizas(rng, n):
+    clientes = rng.integers(0, max(n // 2, 1), n)
+    nombres = _nombres(clientes)
+    inicio = rng.integers(-730, 30, n)
+    nacimiento = FECHA_REFERENCIA - pd.to_timedelta(rng.integers(18 * 365, 80 * 365, n), unit="D")
+    periodicidad = _elegir(rng, OPCIONES_PERIODICIDAD, n, p=[0.4, 0.3, 0.15, 0.15])
+    recibos_por_año = 12 // pd.Series(periodicidad).map(MESES_POR_PERIODICIDAD).to_numpy()
+    prima_total = np.round(rng.lognormal(9.5, 0.8, n), 2)
+    pago = np.round(prima_total / recibos_por_año, 2)
+
+    return pd.DataFrame({
+        "Tipo Persona": _elegir(rng, OPCIONES_PERSONA, n, p=[0.15, 0.85]),
+        "Nombre/Razón Social": nombres,
+        "No. Póliza": pd.Series(np.arange(n)).map("P{:07d}".format).to_numpy(dtype=object),
+        "Producto": _elegir(rng, OPCIONES_PRODUCTO, n),
+        "Inicio Vigencia": _fechas(inicio),
+        "Fin Vigencia": _fechas(inicio + 365),
+        "RFC": _rfc(rng, nombres, nacimiento),
+        "Forma de Pago": _elegir(rng, OPCIONES_PAGO, n),
+        "Banco": _elegir(rng, OPCIONES_BANCO, n),
+        "Periodicidad": periodicidad,
+        "Prima Total Emitida": _montos(rng, prima_total),
+        "Prima Neta": _montos(rng, np.round(prima_total / 1.16, 2)),
+        "Primer Pago": _montos(rng, pago),
+        "Pagos Subsecuentes": _montos(rng, pago),
+        "Aseguradora": _elegir(rng, OPCIONES_ASEG, n),
+        "% Comisión": rng.choice([5, 10, 15, 20, 25], n),
+        "Estado": _elegir(rng, ["VIGENTE", "CANCELADO", "TERMINADO"], n, p=[0.8, 0.1, 0.1]),
+        "Contacto": "",
+        "Dirección": "",
+        "Teléfono": pd.Series(rng.integers(10 ** 9, 10 ** 10, n)).astype(str).to_numpy(dtype=object),
+        "Correo": pd.Series(clientes).map("cliente{}@correo.mx".format).to_numpy(dtype=object),
+        "Fecha Nacimiento": nacimiento.strftime("%d/%m/%Y"),
+        "Moneda": _elegir(rng, OPCIONES_MONEDA, n, p=[0.85, 0.05, 0.1]),
+        "Referenciador": "",
+        "Clave de Emisión": _elegir(rng, OPCIONES_CLAVE_EMISION, n),
+        "Promoción": _elegir(rng, OPCIONES_PROMOCION, n, p=[0.1, 0.9]),
+    }, columns=COLUMNAS_POLIZAS)
+
+
+def generar_cobranza(rng, n, polizas):
+    """``n`` recibos: los primeros RECIBOS_POR_POLIZA de cada póliza, en orden"""
+    posicion = (np.arange(n) // RECIBOS_POR_POLIZA) % len(polizas)
+    recibo = np.arange(n) % RECIBOS_POR_POLIZA + 1
+    poliza = polizas.iloc[posicion]
+
+    inicio = pd.to_datetime(poliza["Inicio Vigencia"], format="%d/%m/%Y").to_numpy(dtype="datetime64[D]")
+    meses = poliza["Periodicidad"].map(MESES_POR_PERIODICIDAD).to_numpy()
+    mes = inicio.astype("datetime64[M]") + (recibo - 1) * meses
+    dia = np.minimum((inicio - inicio.astype("datetime64[M]")).astype("int64"), 27)
+    vencimiento = pd.DatetimeIndex(mes.astype("datetime64[D]") + dia)
+    dias_restantes = (vencimiento - FECHA_REFERENCIA).days.to_numpy()
+
+    estatus = _elegir(rng, ["Pagado", "Vencido", "Cancelado"], n, p=[0.75, 0.2, 0.05])
+    estatus = np.where(dias_restantes >= 0, "Pendiente", estatus)
+    pagado = estatus == "Pagado"
+    prima = poliza["Primer Pago"].to_numpy(dtype=object)
+    fecha_pago = vencimiento + pd.to_timedelta(rng.integers(-5, 20, n), unit="D")
+
+    return pd.DataFrame({
+        "No. Póliza": poliza["No. Póliza"].to_numpy(),
+        "Mes Cobranza": vencimiento.strftime("%m/%Y"),
+        "Prima de Recibo": prima,
+        "Monto Pagado": np.where(pagado, prima, 0),
+        "Fecha Pago": np.where(pagado, fecha_pago.strftime("%d/%m/%Y"), ""),
+        "Estatus": estatus,
+        "Días Atraso": np.where(estatus == "Vencido", -dias_restantes, 0),
+        "Fecha Vencimiento": vencimiento.strftime("%d/%m/%Y"),
+        "Nombre/Razón Social": poliza["Nombre/Razón Social"].to_numpy(),
+        "Días Restantes": dias_restantes,
+        "Periodicidad": poliza["Periodicidad"].to_numpy(),
+        "Moneda": poliza["Moneda"].to_numpy(),
+        "Recibo": recibo,
+        "Clave de Emisión": poliza["Clave de Emisión"].to_numpy(),
+        "Comentario": "",
+        "ID_Cobranza": (poliza["No. Póliza"].reset_index(drop=True) + "_R" + pd.Series(recibo).astype(str)).to_numpy(),
+    }, columns=COLUMNAS_COBRANZA)
+
+
+def generar_prospectos(rng, n):
+    nombres = _nombres(rng.integers(0, n, n) + 5_000_000)
+    nacimiento = FECHA_REFERENCIA - pd.to_timedelta(rng.integers(18 * 365, 70 * 365, n), unit="D")
+    registro = rng.integers(-365, 1, n)
+    return pd.DataFrame({
+        "Tipo Persona": _elegir(rng, OPCIONES_PERSONA, n, p=[0.15, 0.85]),
+        "Nombre/Razón Social": nombres,
+        "Fecha Nacimiento": nacimiento.strftime("%d/%m/%Y"),
+        "RFC": _rfc(rng, nombres, nacimiento),
+        "Teléfono": pd.Series(rng.integers(10 ** 9, 10 ** 10, n)).astype(str).to_numpy(dtype=object),
+        "Correo": pd.Series(np.arange(n)).map("prospecto{}@correo.mx".format).to_numpy(dtype=object),
+        "Producto": _elegir(rng, OPCIONES_PRODUCTO, n),
+        "Fecha Registro": _fechas(registro),
+        "Fecha Contacto": _fechas(registro + rng.integers(0, 30, n)),
+        "Seguimiento": "",
+        "Representantes Legales": "",
+        "Referenciador": "",
+        "Estatus": _elegir(rng, OPCIONES_ESTATUS_SEGUIMIENTO, n, p=[0.6, 0.25, 0.15]),
+        "Notas": "",
+        "Dirección": "",
+    }, columns=COLUMNAS_PROSPECTOS)
+
+
+def generar_seguimiento(rng, n, prospectos):
+    prospecto = prospectos.iloc[rng.integers(0, len(prospectos), n)]
+    contacto = rng.integers(-365, 1, n)
+    return pd.DataFrame({
+        "Nombre/Razón Social": prospecto["Nombre/Razón Social"].to_numpy(),
+        "Fecha Contacto": _fechas(contacto),
+        "Estatus": _elegir(rng, OPCIONES_ESTATUS_SEGUIMIENTO, n, p=[0.6, 0.25, 0.15]),
+        "Comentarios": _elegir(rng, ["Llamada", "Envío de cotización", "Sin respuesta", "Cita agendada"], n),
+        "Fecha Registro": _fechas(contacto),
+    }, columns=COLUMNAS_SEGUIMIENTO)
+
+
+def generar_operacion(rng, n):
+    return pd.DataFrame({
+        "Fecha": _fechas(rng.integers(-730, 1, n)),
+        "Concepto": _elegir(rng, OPCIONES_CONCEPTO_OPERACION, n),
+        "Proveedor": _elegir(rng, PROVEEDORES, n),
+        "Monto": np.round(rng.lognormal(6.5, 1.0, n), 2),
+        "Forma de Pago": _elegir(rng, OPCIONES_FORMA_PAGO_OPERACION, n),
+        "Banco": _elegir(rng, OPCIONES_BANCO, n),
+        "Responsable del pago": _elegir(rng, OPCIONES_CLAVE_EMISION, n),
+        "Finalidad": "",
+        "Deducible": _elegir(rng, OPCIONES_DEDUCIBLE, n, p=[0.7, 0.3]),
+    }, columns=COLUMNAS_OPERACION)
+
+
+def generar_cartera(filas, semilla=0):
+    """
+    Las cinco hojas con ``filas`` renglones cada una.
+
+    Returns:
+        dict hoja -> DataFrame en el orden de HOJAS
+    """
+    rng = np.random.default_rng(semilla)
+    polizas = generar_polizas(rng, filas)
+    prospectos = generar_prospectos(rng, filas)
+    datos = {
+        "Prospectos": prospectos,
+        "Polizas": polizas,
+        "Cobranza": generar_cobranza(rng, filas, polizas),
+        "Seguimiento": generar_seguimiento(rng, filas, prospectos),
+        "Operacion": generar_operacion(rng, filas),
+    }
+    return {hoja: datos[hoja] for hoja in HOJAS}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Genera una cartera sintética en CSV (una hoja por archivo)")
+    parser.add_argument("--filas", type=int, default=TAMAÑOS[0])
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--salida", required=True, help="Directorio destino")
+    args = parser.parse_args(argv)
+
+    os.makedirs(args.salida, exist_ok=True)
+    for hoja, df in generar_cartera(args.filas, args.semilla).items():
+        ruta = os.path.join(args.salida, f"{hoja}.csv")
+        df.to_csv(ruta, index=False)
+        print(f"{ruta}: {len(df)} filas")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
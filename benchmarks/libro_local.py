@@ -0,0 +1,165 @@
+"""
+Libro de Google Sheets en memoria para benchmarks sin red.
+
+Implementa la parte de la API de gspread que usa cartera.almacenamiento
+(worksheet, add_worksheet, get_all_records, row_values, col_values, clear,
+update, append_rows, batch_update, add_cols) y guarda las celdas como
+texto, igual que Sheets. La lectura convierte con gspread.utils igual que
+Worksheet.get_all_records, así que el costo de numerizar se mide.
+
+Cada hoja cuenta llamadas y bytes (JSON de lo enviado y lo recibido) para
+comparar estrategias de guardado además del tiempo. Las operaciones se
+serializan con un candado para poder compartir el libro entre sesiones
+concurrentes, y ``latencia`` simula el tiempo de red de cada llamada.
+"""
+
+import json
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+import gspread
+from gspread.utils import a1_to_rowcol, numericise_all, to_records
+
+
+def _texto(valor):
+    return "" if valor is None else str(valor)
+
+
+def _bytes(valores):
+    return len(json.dumps(valores, ensure_ascii=False, default=str).encode("utf-8"))
+
+
+class HojaLocal:
+    """Una hoja: lista de filas de texto"""
+
+    def __init__(self, libro, title, filas=None, cols=20):
+        self.libro = libro
+        self.title = title
+        self.filas = [list(map(_texto, fila)) for fila in (filas or [])]
+        self.col_count = max(cols, max((len(fila) for fila in self.filas), default=0))
+
+    def _recibido(self, valores):
+        self.libro.bytes_recibidos += _bytes(valores)
+
+    def get_all_records(self, empty2zero=False, default_blank=""):
+        with self.libro._operacion("get_all_records"):
+            filas = [list(fila) for fila in self.filas]
+            self._recibido(filas)
+        if not filas:
+            return []
+        encabezado = filas[0]
+        ancho = len(encabezado)
+        valores = [
+            numericise_all((fila + [""] * (ancho - len(fila)))[:ancho], empty2zero, default_blank)
+            for fila in filas[1:]
+        ]
+        return to_records(encabezado, valores)
+
+    def row_values(self, fila):
+        with self.libro._operacion("row_values"):
+            valores = list(self.filas[fila - 1]) if fila <= len(self.filas) else []
+            self._recibido(valores)
+        return valores
+
+    def col_values(self, columna):
+        with self.libro._operacion("col_values"):
+            valores = [fila[columna - 1] if columna <= len(fila) else "" for fila in self.filas]
+            while valores and valores[-1] == "":
+                valores.pop()
+            self._recibido(valores)
+        return valores
+
+    def clear(self):
+        with self.libro._operacion("clear"):
+            self.filas = []
+
+    def _escribir(self, fila, columna, valores):
+        for i, renglon in enumerate(valores):
+            while len(self.filas) < fila + i:
+                self.filas.append([])
+            destino = self.filas[fila + i - 1]
+            if len(destino) < columna - 1 + len(renglon):
+                destino.extend([""] * (columna - 1 + len(renglon) - len(destino)))
+            destino[columna - 1:columna - 1 + len(renglon)] = map(_texto, renglon)
+
+    def update(self, values=None, range_name=None, value_input_option=None):
+        with self.libro._operacion("update", enviado=values):
+            fila, columna = a1_to_rowcol((range_name or "A1").split(":")[0])
+            self._escribir(fila, columna, values)
+
+    def append_rows(self, values, value_input_option=None):
+        with self.libro._operacion("append_rows", enviado=values):
+            self._escribir(len(self.filas) + 1, 1, values)
+
+    def batch_update(self, data, value_input_option=None):
+        with self.libro._operacion("batch_update", enviado=data):
+            for bloque in data:
+                fila, columna = a1_to_rowcol(bloque["range"].split(":")[0])
+                self._escribir(fila, columna, bloque["values"])
+
+    def add_cols(self, cols):
+        with self.libro._operacion("add_cols"):
+            self.col_count += cols
+
+
+class LibroLocal:
+    """Sustituto de gspread.Spreadsheet con las hojas en memoria"""
+
+    def __init__(self, hojas=None, latencia=0.0):
+        self.latencia = latencia
+        self._candado = threading.RLock()
+        self.llamadas = Counter()
+        self.bytes_enviados = 0
+        self.bytes_recibidos = 0
+        self.hojas = {}
+        for nombre, df in (hojas or {}).items():
+            filas = [list(df.columns)] + df.astype(object).fillna("").values.tolist()
+            self.hojas[nombre] = HojaLocal(self, nombre, filas)
+
+    @contextmanager
+    def _operacion(self, nombre, enviado=None):
+        """Cuenta la llamada, espera la latencia simulada (fuera del candado) y bloquea el libro"""
+        if self.latencia:
+            time.sleep(self.latencia)
+        with self._candado:
+            self.llamadas[nombre] += 1
+            if enviado is not None:
+                self.bytes_enviados += _bytes(enviado)
+            yield
+
+    def worksheet(self, title):
+        with self._operacion("worksheet"):
+            if title not in self.hojas:
+                raise gspread.WorksheetNotFound(title)
+            return self.hojas[title]
+
+    def add_worksheet(self, title, rows, cols):
+        with self._operacion("add_worksheet"):
+            self.hojas[title] = HojaLocal(self, title, cols=cols)
+            return self.hojas[title]
+
+    def reiniciar_contadores(self):
+        with self._candado:
+            self.llamadas.clear()
+            self.bytes_enviados = 0
+            self.bytes_recibidos = 0
+
+    def contadores(self):
+        with self._candado:
+            return {
+                "llamadas": sum(self.llamadas.values()),
+                "bytes_enviados": self.bytes_enviados,
+                "bytes_recibidos": self.bytes_recibidos,
+            }
+
+
+class ClienteLocal:
+    """Sustituto de gspread.Client: ``open`` devuelve siempre el mismo LibroLocal"""
+
+    def __init__(self, libro):
+        self.libro = libro
+
+    def open(self, title):
+        return self.libro
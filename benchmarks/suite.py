@@ -0,0 +1,215 @@
+"""
+Suite de benchmarks sobre carteras sintéticas (1k, 10k, 100k y 1M filas).
+
+Mide las rutas que crecen con la cartera, todas contra LibroLocal en lugar
+de Google Sheets para que sólo cuente el cómputo (y las llamadas/bytes que
+se enviarían):
+
+- carga: leer_hoja de las cinco hojas (incluye numerizar como gspread)
+- proyeccion_recibos / pronostico: generar_recibos y pronosticar_cobranza
+- estatus_recibos: actualizar_estatus del proceso nocturno
+- renovaciones: IndiceVencimientos y las ventanas de VENTANAS
+- enriquecimiento: comisiones_por_recibo y cubo_antiguedad (uniones con Pólizas)
+- guardado_completo / guardado_dirigido: reemplazar_hoja y actualizar_celdas
+
+Cada corrida agrega una línea JSON por tamaño a benchmarks/resultados.jsonl
+(commit, versiones y medianas) y muestra la diferencia contra la corrida
+anterior del mismo tamaño.
+
+Uso (desde la raíz del repositorio):
+    python -m benchmarks.suite
+    python -m benchmarks.suite --filas 1000000 --repeticiones 1
+    python -m benchmarks.suite --casos carga guardado_completo --no-guardar
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.datos_sinteticos import FECHA_REFERENCIA, TAMAÑOS, generar_cartera
+from benchmarks.libro_local import LibroLocal
+from cartera.almacenamiento import actualizar_celdas, leer_hoja, reemplazar_hoja
+from cartera.antiguedad import cubo_antiguedad
+from cartera.cobranza import actualizar_estatus, generar_recibos
+from cartera.comisiones import comisiones_por_recibo
+from cartera.esquema import CLAVE_POR_HOJA, COLUMNAS_POR_HOJA, HOJAS
+from cartera.pronostico import pronosticar_cobranza
+from cartera.renovaciones import VENTANAS, IndiceVencimientos
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RUTA_RESULTADOS = os.path.join(RAIZ, "benchmarks", "resultados.jsonl")
+TAMAÑOS_POR_DEFECTO = TAMAÑOS[:3]
+# El proceso nocturno corre unas semanas después de la toma de datos para que haya cambios de estatus
+DIAS_PROCESO_NOCTURNO = 45
+
+# nombre -> (preparar, medir); preparar(contexto) no se cronometra y su resultado se pasa a medir
+CASOS = {}
+
+
+def caso(nombre, preparar=None):
+    def registrar(funcion):
+        CASOS[nombre] = (preparar, funcion)
+        return funcion
+    return registrar
+
+
+@caso("carga")
+def _carga(ctx):
+    return {hoja: leer_hoja(ctx["libro"], hoja, COLUMNAS_POR_HOJA[hoja]) for hoja in HOJAS}
+
+
+@caso("proyeccion_recibos")
+def _proyeccion_recibos(ctx):
+    return generar_recibos(ctx["hojas"]["Polizas"], ctx["hojas"]["Cobranza"], hoy=FECHA_REFERENCIA)
+
+
+@caso("pronostico")
+def _pronostico(ctx):
+    return pronosticar_cobranza(ctx["hojas"]["Polizas"], desde=FECHA_REFERENCIA, df_cobranza=ctx["hojas"]["Cobranza"])
+
+
+def _copia_cobranza(ctx):
+    return ctx["hojas"]["Cobranza"].copy()
+
+
+@caso("estatus_recibos", preparar=_copia_cobranza)
+def _estatus_recibos(df_cobranza):
+    return actualizar_estatus(df_cobranza, FECHA_REFERENCIA + pd.Timedelta(days=DIAS_PROCESO_NOCTURNO))
+
+
+@caso("renovaciones")
+def _renovaciones(ctx):
+    indice = IndiceVencimientos(ctx["hojas"]["Polizas"])
+    return [indice.ventana(desde, hasta, FECHA_REFERENCIA) for desde, hasta in VENTANAS.values()]
+
+
+@caso("enriquecimiento")
+def _enriquecimiento(ctx):
+    df_cobranza, df_polizas = ctx["hojas"]["Cobranza"], ctx["hojas"]["Polizas"]
+    return (
+        comisiones_por_recibo(df_cobranza, df_polizas, fecha_registro=FECHA_REFERENCIA.strftime("%d/%m/%Y")),
+        cubo_antiguedad(df_cobranza, df_polizas, hoy=FECHA_REFERENCIA),
+    )
+
+
+@caso("guardado_completo")
+def _guardado_completo(ctx):
+    reemplazar_hoja(ctx["libro"], "Cobranza", ctx["hojas"]["Cobranza"])
+
+
+def _cambios_estatus(ctx):
+    df_cobranza, celdas = _estatus_recibos(_copia_cobranza(ctx))
+    return ctx["libro"], df_cobranza, celdas
+
+
+@caso("guardado_dirigido", preparar=_cambios_estatus)
+def _guardado_dirigido(argumentos):
+    libro, df_cobranza, celdas = argumentos
+    actualizar_celdas(libro, "Cobranza", df_cobranza, celdas, clave=CLAVE_POR_HOJA["Cobranza"])
+
+
+def _commit():
+    try:
+        salida = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=RAIZ, capture_output=True, text=True, check=True)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return salida.stdout.strip()
+
+
+def medir(filas, casos, repeticiones, semilla=0):
+    """
+    Genera la cartera, la carga en un LibroLocal y cronometra ``casos``.
+
+    Returns:
+        dict caso -> {"mediana_s", "minimo_s", "llamadas", "bytes_enviados", "bytes_recibidos"}
+    """
+    inicio = time.perf_counter()
+    libro = LibroLocal(generar_cartera(filas, semilla))
+    print(f"\n{filas:,} filas (generadas en {time.perf_counter() - inicio:.1f} s)")
+    ctx = {"libro": libro}
+    ctx["hojas"] = _carga(ctx)
+
+    resultados = {}
+    for nombre in casos:
+        preparar, funcion = CASOS[nombre]
+        tiempos = []
+        for _ in range(repeticiones):
+            argumento = preparar(ctx) if preparar else ctx
+            libro.reiniciar_contadores()
+            inicio = time.perf_counter()
+            funcion(argumento)
+            tiempos.append(time.perf_counter() - inicio)
+        resultados[nombre] = {
+            "mediana_s": round(statistics.median(tiempos), 6),
+            "minimo_s": round(min(tiempos), 6),
+            **libro.contadores(),
+        }
+    return resultados
+
+
+def _anterior(ruta, filas, semilla):
+    """Última corrida registrada con el mismo tamaño y semilla"""
+    if not os.path.exists(ruta):
+        return None
+    anterior = None
+    with open(ruta, encoding="utf-8") as f:
+        for linea in f:
+            registro = json.loads(linea)
+            if registro.get("filas") == filas and registro.get("semilla") == semilla:
+                anterior = registro
+    return anterior
+
+
+def _imprimir(resultados, anterior):
+    print(f"{'caso':<20} {'mediana ms':>11} {'mínimo ms':>10} {'llamadas':>9} {'KB enviados':>12} {'vs anterior':>12}")
+    for nombre, r in resultados.items():
+        previo = (anterior or {}).get("resultados", {}).get(nombre)
+        cambio = f"{(r['mediana_s'] / previo['mediana_s'] - 1) * 100:+.1f}%" if previo and previo["mediana_s"] else "-"
+        print(
+            f"{nombre:<20} {r['mediana_s'] * 1000:>11.1f} {r['minimo_s'] * 1000:>10.1f} "
+            f"{r['llamadas']:>9} {r['bytes_enviados'] / 1024:>12.1f} {cambio:>12}"
+        )
+    if anterior:
+        print(f"(anterior: {anterior.get('fecha')} commit {anterior.get('commit')})")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks de la cartera sobre datos sintéticos")
+    parser.add_argument("--filas", type=int, nargs="+", default=TAMAÑOS_POR_DEFECTO,
+                        help=f"Tamaños a medir (por defecto {' '.join(map(str, TAMAÑOS_POR_DEFECTO))})")
+    parser.add_argument("--casos", nargs="+", choices=list(CASOS), default=list(CASOS))
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--resultados", default=RUTA_RESULTADOS, help="Archivo JSON lines con el historial")
+    parser.add_argument("--no-guardar", action="store_true", help="No agrega la corrida al historial")
+    args = parser.parse_args(argv)
+
+    registro_base = {
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "commit": _commit(),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "semilla": args.semilla,
+        "repeticiones": args.repeticiones,
+    }
+    for filas in args.filas:
+        resultados = medir(filas, args.casos, args.repeticiones, args.semilla)
+        _imprimir(resultados, _anterior(args.resultados, filas, args.semilla))
+        if not args.no_guardar:
+            with open(args.resultados, "a", encoding="utf-8") as f:
+                f.write(json.dumps({**registro_base, "filas": filas, "resultados": resultados}, ensure_ascii=False) + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,63 @@
+"""
+Tiempo de importación de la aplicación en procesos nuevos (arranque en frío).
+
+Mide la mediana de importar formulario_polizas y, por separado, lo que
+costarían matplotlib.pyplot y reportlab si se cargaran al arrancar.
+También verifica que importar la aplicación no los cargue.
+
+Uso (desde la raíz del repositorio):
+    python benchmarks/tiempo_importacion.py
+    python benchmarks/tiempo_importacion.py --repeticiones 10
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODULOS = {
+    "formulario_polizas": "import formulario_polizas",
+    "matplotlib.pyplot": "import matplotlib.pyplot",
+    "reportlab (platypus, styles, lib)": (
+        "import reportlab.platypus, reportlab.lib.styles, reportlab.lib.pagesizes, reportlab.lib.units, reportlab.lib.colors"
+    ),
+}
+
+MEDICION = """
+import json, sys, time
+inicio = time.perf_counter()
+{importacion}
+segundos = time.perf_counter() - inicio
+print(json.dumps({{"segundos": segundos, "matplotlib": "matplotlib" in sys.modules, "reportlab": "reportlab" in sys.modules}}))
+"""
+
+
+def medir(importacion):
+    salida = subprocess.run(
+        [sys.executable, "-c", MEDICION.format(importacion=importacion)],
+        cwd=RAIZ, capture_output=True, text=True, check=True,
+    )
+    return json.loads(salida.stdout.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Tiempo de importación en frío")
+    parser.add_argument("--repeticiones", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    for nombre, importacion in MODULOS.items():
+        mediciones = [medir(importacion) for _ in range(args.repeticiones)]
+        mediana = statistics.median(m["segundos"] for m in mediciones)
+        print(f"{nombre:<36} {mediana * 1000:8.1f} ms (mediana de {args.repeticiones})")
+        if nombre == "formulario_polizas":
+            cargados = [mod for mod in ("matplotlib", "reportlab") if mediciones[-1][mod]]
+            print(f"{'':<36} cargados al importar: {', '.join(cargados) or 'ninguno'}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
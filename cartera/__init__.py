@@ -0,0 +1,16 @@
+"""
+Núcleo del Gestor de Cartera Rizkora.
+
+Módulos sin dependencia de Streamlit que la app, las tareas batch y los
+CLIs comparten:
+
+- almacenamiento, esquema, cache_compartido: acceso a Google Sheets y caché
+- montos, registros: montos en centavos y registros compactos de pólizas y recibos
+- cobranza, antiguedad, pronostico, conciliacion, comisiones: motor de cobranza
+- renovaciones, busqueda, paginacion: índices y consultas para las vistas
+- tipos_cambio, importacion, exportacion: conversión y carga/descarga de datos
+- asesoria: métricas, gráficas y reportes de asesoría financiera
+- instrumentacion, metricas: trazas por ejecución y métricas estilo Prometheus
+
+formulario_polizas.py sólo arma la interfaz sobre estos módulos.
+"""
@@ -0,0 +1,232 @@
+"""
+Acceso al libro base_polizas_ealc sin depender de Streamlit.
+
+La app obtiene las credenciales de ``st.secrets``; los CLIs y tareas batch
+usan ``cargar_credenciales`` (JSON de la cuenta de servicio o el mismo
+``.streamlit/secrets.toml``).
+"""
+
+import json
+import os
+import tomllib
+
+import gspread
+import pandas as pd
+from google.oauth2.service_account import Credentials
+
+from cartera.esquema import CATALOGOS_POR_HOJA
+from cartera.instrumentacion import ClienteHTTPInstrumentado
+from cartera.metricas import FILAS_ESCRITAS
+
+NOMBRE_LIBRO = "base_polizas_ealc"
+SCOPES = [
+    "https://www.googleapis.com/auth/spreadsheets",
+    "https://www.googleapis.com/auth/drive"
+]
+
+
+def cargar_credenciales(ruta=None):
+    """
+    Lee la cuenta de servicio para uso fuera de Streamlit.
+
+    Busca en este orden: ``ruta``, la variable GOOGLE_APPLICATION_CREDENTIALS
+    (JSON) y la sección ``google_service_account`` de RIZKORA_SECRETS o
+    ``.streamlit/secrets.toml``.
+    """
+    ruta = ruta or os.environ.get("GOOGLE_APPLICATION_CREDENTIALS")
+    if ruta:
+        with open(ruta, encoding="utf-8") as f:
+            return json.load(f)
+
+    ruta_secrets = os.environ.get("RIZKORA_SECRETS", os.path.join(".streamlit", "secrets.toml"))
+    with open(ruta_secrets, "rb") as f:
+        secrets = tomllib.load(f)
+    if "google_service_account" not in secrets:
+        raise KeyError(f"No se encontró 'google_service_account' en {ruta_secrets}")
+    return dict(secrets["google_service_account"])
+
+
+def autorizar(credenciales=None):
+    """Cliente de gspread autenticado con la cuenta de servicio (llamadas contadas en la traza activa)"""
+    creds = Credentials.from_service_account_info(
+        credenciales or cargar_credenciales(),
+        scopes=SCOPES
+    )
+    return gspread.authorize(creds, http_client=ClienteHTTPInstrumentado)
+
+
+def abrir_libro(credenciales=None):
+    """Autentica con la cuenta de servicio y abre el libro base_polizas_ealc"""
+    return autorizar(credenciales).open(NOMBRE_LIBRO)
+
+
+def leer_hoja(spreadsheet, nombre_hoja, columnas=None):
+    """Lee una hoja completa; si no existe devuelve un DataFrame vacío con ``columnas``"""
+    try:
+        worksheet = spreadsheet.worksheet(nombre_hoja)
+    except gspread.WorksheetNotFound:
+        return pd.DataFrame(columns=columnas or [])
+    return tipar_catalogos(pd.DataFrame(worksheet.get_all_records()), nombre_hoja)
+
+
+def tipar_catalogos(df, nombre_hoja):
+    """
+    Convierte las columnas de CATALOGOS_POR_HOJA a category con la forma canónica de ``OPCIONES_*``.
+
+    Los valores se comparan sin importar mayúsculas ni espacios, así que
+    "vigente " queda como "VIGENTE" y los filtros son comparaciones de
+    códigos enteros. Las categorías incluyen "" y los valores fuera del
+    catálogo que ya estén en la hoja: cualquier valor leído se puede volver
+    a asignar sin error y el guardado escribe el mismo texto. Para asignar
+    valores nuevos hay que pasar antes por admitir_categorias().
+    """
+    for columna, opciones in CATALOGOS_POR_HOJA.get(nombre_hoja, {}).items():
+        if columna not in df.columns:
+            continue
+        canonicos = {str(opcion).upper(): opcion for opcion in opciones}
+        serie = df[columna].astype(object).where(df[columna].notna(), "")
+        # Normaliza una vez por valor distinto, no por celda
+        mapa = {
+            valor: canonicos.get(str(valor).strip().upper(), str(valor).strip())
+            for valor in pd.unique(serie)
+        }
+        valores = serie.map(mapa)
+        extras = sorted(set(mapa.values()) - set(opciones) - {""})
+        df[columna] = pd.Categorical(valores, categories=[""] + list(opciones) + extras)
+    return df
+
+
+def admitir_categorias(df, valores):
+    """
+    Agrega como categorías los valores que se van a asignar a columnas category.
+
+    ``df.loc[filas, columna] = valor`` falla si la columna es categórica y el
+    valor no es una de sus categorías (texto libre, " " de un selectbox);
+    hay que llamar a esta función antes. Las demás columnas no se tocan.
+
+    Args:
+        valores: dict columna -> valor o lista de valores a asignar
+    """
+    for columna, valor in valores.items():
+        if columna not in df.columns or not isinstance(df[columna].dtype, pd.CategoricalDtype):
+            continue
+        nuevos = pd.Series(valor if pd.api.types.is_list_like(valor) else [valor], dtype=object).dropna()
+        faltantes = [v for v in nuevos.unique() if v not in df[columna].cat.categories]
+        if faltantes:
+            df[columna] = df[columna].cat.add_categories(faltantes)
+    return df
+
+
+def reemplazar_hoja(spreadsheet, nombre_hoja, df):
+    """Sobrescribe la hoja completa con ``df`` (encabezado incluido); la crea si no existe"""
+    try:
+        worksheet = spreadsheet.worksheet(nombre_hoja)
+        worksheet.clear()
+    except gspread.WorksheetNotFound:
+        worksheet = spreadsheet.add_worksheet(title=nombre_hoja, rows=1000, cols=max(20, len(df.columns)))
+    if not df.empty:
+        datos = [df.columns.values.tolist()] + df.fillna("").values.tolist()
+        worksheet.update(datos, value_input_option="USER_ENTERED")
+    FILAS_ESCRITAS.observar(len(df), hoja=nombre_hoja, modo="completo")
+
+
+def agregar_filas(spreadsheet, nombre_hoja, df):
+    """
+    Agrega las filas de ``df`` al final de la hoja en una sola llamada.
+
+    Las columnas se alinean con el encabezado existente; las que no estén en
+    él se agregan al final del encabezado.
+
+    Returns:
+        Número de filas agregadas
+    """
+    if df.empty:
+        return 0
+
+    try:
+        worksheet = spreadsheet.worksheet(nombre_hoja)
+    except gspread.WorksheetNotFound:
+        worksheet = spreadsheet.add_worksheet(title=nombre_hoja, rows=1000, cols=max(20, len(df.columns)))
+
+    encabezado = worksheet.row_values(1)
+    filas = []
+    if not encabezado:
+        encabezado = list(df.columns)
+        filas.append(encabezado)
+    else:
+        nuevas = [col for col in df.columns if col not in encabezado]
+        if nuevas:
+            encabezado = encabezado + nuevas
+            if len(encabezado) > worksheet.col_count:
+                worksheet.add_cols(len(encabezado) - worksheet.col_count)
+            worksheet.update(values=[encabezado], range_name="A1")
+
+    valores = df.reindex(columns=encabezado).astype(object).fillna("").values.tolist()
+    worksheet.append_rows(filas + valores, value_input_option="USER_ENTERED")
+    FILAS_ESCRITAS.observar(len(valores), hoja=nombre_hoja, modo="agregar")
+    return len(valores)
+
+
+class HojaDesalineada(Exception):
+    """El DataFrame ya no corresponde fila por fila con la hoja en Sheets"""
+
+
+def _valor_celda(valor):
+    if valor is None or (isinstance(valor, float) and valor != valor):
+        return ""
+    if hasattr(valor, "item"):
+        return valor.item()
+    return valor
+
+
+def actualizar_filas(spreadsheet, nombre_hoja, df, indices, columnas, clave="No. Póliza"):
+    """
+    Escribe sólo las celdas ``columnas`` de las filas ``indices`` en una llamada batch_update.
+
+    ``df`` debe ser la hoja tal como se leyó (índice 0 = fila 2 de la hoja).
+    Antes de escribir se compara la columna ``clave`` con Sheets para no
+    pisar filas que otra sesión haya reordenado.
+
+    Returns:
+        Número de celdas escritas
+
+    Raises:
+        HojaDesalineada: Si la hoja cambió desde la lectura; hay que recargarla antes de escribir
+    """
+    celdas = [(idx, col) for idx in indices for col in columnas]
+    return actualizar_celdas(spreadsheet, nombre_hoja, df, celdas, clave=clave)
+
+
+def actualizar_celdas(spreadsheet, nombre_hoja, df, celdas, clave="No. Póliza"):
+    """
+    Igual que actualizar_filas() pero con una lista explícita de pares (índice, columna).
+    """
+    celdas = list(celdas)
+    if not celdas:
+        return 0
+
+    worksheet = spreadsheet.worksheet(nombre_hoja)
+    encabezado = worksheet.row_values(1)
+    columnas = list(dict.fromkeys(col for _, col in celdas))
+    faltantes = [col for col in columnas + [clave] if col not in encabezado]
+    if faltantes:
+        raise HojaDesalineada(f"Columnas no presentes en '{nombre_hoja}': {', '.join(faltantes)}")
+
+    indices = list(dict.fromkeys(idx for idx, _ in celdas))
+    filas = {idx: df.index.get_loc(idx) + 2 for idx in indices}
+    claves_hoja = worksheet.col_values(encabezado.index(clave) + 1)
+    for idx, fila in filas.items():
+        valor_hoja = claves_hoja[fila - 1] if fila - 1 < len(claves_hoja) else None
+        if valor_hoja is None or str(valor_hoja).strip() != str(df.at[idx, clave]).strip():
+            raise HojaDesalineada(f"La fila {fila} de '{nombre_hoja}' cambió desde la última lectura")
+
+    datos = [
+        {
+            "range": gspread.utils.rowcol_to_a1(filas[idx], encabezado.index(col) + 1),
+            "values": [[_valor_celda(df.at[idx, col])]],
+        }
+        for idx, col in celdas
+    ]
+    worksheet.batch_update(datos, value_input_option="USER_ENTERED")
+    FILAS_ESCRITAS.observar(len(filas), hoja=nombre_hoja, modo="dirigido")
+    return len(datos)
@@ -0,0 +1,81 @@
+"""
+Antigüedad de saldos: cubo pre-agregado de los recibos abiertos.
+
+Los rangos coinciden con los colores de la tabla de Cobranza
+(menos de 5 días, 5–10, 11–19 y 20 o más días de atraso).
+"""
+
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from cartera.cobranza import ESTATUS_ABIERTOS, calcular_antiguedad, parsear_fechas_dmy
+from cartera.montos import a_centavos, a_pesos
+
+RANGOS = ["0-4 días", "5-10 días", "11-19 días", "20+ días"]
+LIMITES = [5, 11, 20]
+DIMENSIONES = ["Clave de Emisión", "Aseguradora", "Moneda", "Mes"]
+
+
+def cubo_antiguedad(df_cobranza, df_polizas, hoy=None, tipos_cambio=None):
+    """
+    Agrupa los recibos abiertos por Clave de Emisión, Aseguradora, Moneda, mes de vencimiento y rango de atraso.
+
+    Args:
+        tipos_cambio: TablaTiposCambio opcional; agrega "Monto MXN" al tipo de cambio de ``hoy``
+
+    Returns:
+        DataFrame con DIMENSIONES + ["Rango", "Recibos", "Monto"] (+ "Monto MXN")
+    """
+    columnas = DIMENSIONES + ["Rango", "Recibos", "Monto"] + (["Monto MXN"] if tipos_cambio is not None else [])
+    if df_cobranza.empty or "Estatus" not in df_cobranza.columns:
+        return pd.DataFrame(columns=columnas)
+
+    abiertos = df_cobranza[df_cobranza["Estatus"].isin(ESTATUS_ABIERTOS)]
+    if abiertos.empty:
+        return pd.DataFrame(columns=columnas)
+
+    no_poliza = abiertos["No. Póliza"].astype(str).str.strip()
+    if "Aseguradora" in df_polizas.columns:
+        aseguradoras = df_polizas.drop_duplicates("No. Póliza", keep="last").set_index("No. Póliza")["Aseguradora"]
+        aseguradora = no_poliza.map(aseguradoras).fillna("")
+    else:
+        aseguradora = pd.Series("", index=abiertos.index)
+
+    dias_atraso = calcular_antiguedad(abiertos["Fecha Vencimiento"], hoy)["Días Atraso"]
+    rango = np.digitize(dias_atraso.fillna(0).to_numpy(dtype="int64"), LIMITES)
+
+    vencimiento = parsear_fechas_dmy(abiertos["Fecha Vencimiento"])
+    datos = pd.DataFrame({
+        "Clave de Emisión": abiertos.get("Clave de Emisión", pd.Series("", index=abiertos.index)).fillna("").astype(str),
+        "Aseguradora": aseguradora.astype(str),
+        "Moneda": abiertos.get("Moneda", pd.Series("", index=abiertos.index)).fillna("").astype(str),
+        "Mes": vencimiento.dt.strftime("%Y-%m").fillna("Sin fecha"),
+        "Rango": pd.Categorical.from_codes(rango, RANGOS),
+        "Monto": a_centavos(abiertos["Prima de Recibo"]).fillna(0).astype("int64"),
+    })
+    cubo = datos.groupby(DIMENSIONES + ["Rango"], observed=True).agg(
+        Recibos=("Monto", "size"), Monto=("Monto", "sum")
+    ).reset_index()
+    cubo["Monto"] = a_pesos(cubo["Monto"])
+    if tipos_cambio is not None:
+        cubo["Monto MXN"] = tipos_cambio.a_mxn(cubo["Monto"], cubo["Moneda"], pd.Timestamp(hoy or datetime.now()))
+    return cubo[columnas]
+
+
+def resumen_antiguedad(cubo, dimensiones, valor="Monto"):
+    """
+    Tabla resumen del cubo: una fila por combinación de ``dimensiones`` y una columna por rango, más el total.
+    """
+    if cubo.empty:
+        return pd.DataFrame(columns=list(dimensiones) + RANGOS + ["Total"])
+    filas = list(dimensiones) or None
+    if filas is None:
+        tabla = cubo.groupby("Rango", observed=False)[valor].sum().to_frame().T
+    else:
+        tabla = cubo.pivot_table(index=filas, columns="Rango", values=valor, aggfunc="sum", fill_value=0, observed=False)
+    tabla = tabla.reindex(columns=RANGOS, fill_value=0)
+    tabla.columns = list(tabla.columns)
+    tabla["Total"] = tabla.sum(axis=1)
+    return tabla.reset_index(drop=filas is None)
@@ -0,0 +1,664 @@
+"""
+Asesoría financiera: métricas, gráficas y reportes (Excel y PDF) a partir
+de los datos capturados en el formulario de asesoría.
+
+``datos`` es el diccionario con las secciones informacion_personal,
+informacion_familiar, informacion_financiera y objetivos. matplotlib y
+reportlab se importan sólo al graficar o generar el PDF.
+"""
+
+import io
+from datetime import datetime
+
+import pandas as pd
+
+# Paleta de colores AXA
+COLORES_AXA = {
+    'azul_principal': '#064c78',      # Mayor uso
+    'verde_oscuro': '#00796b',
+    'verde_agua': '#00bfa5',
+    'azul_claro': '#90caf9',
+    'amarillo': '#fff59d',
+    'gris': '#e0e0e0',
+    'lila': '#b39ddb',
+    'azul_gris': '#7986cb',
+    'morado': '#c95ef5'
+}
+
+
+def pyplot():
+    """matplotlib.pyplot (backend sin ventana) con el estilo de los reportes"""
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    plt.style.use('seaborn-v0_8-whitegrid')
+    return plt
+
+
+def metricas_financieras(datos):
+    """Calcula métricas financieras basadas en los datos ingresados"""
+    # Extraer datos básicos con valores por defecto seguros
+    ingreso_mensual = datos['informacion_financiera'].get('ingreso_mensual', 0)
+    gastos_mensuales = datos['informacion_financiera'].get('gastos_mensuales', 0)
+    ahorro_actual = datos['informacion_financiera'].get('ahorro_actual', 0)
+    edad = datos['informacion_familiar'].get('edad', 30)
+
+    # Convertir a float si es necesario
+    if isinstance(ingreso_mensual, str):
+        try:
+            ingreso_mensual = float(ingreso_mensual)
+        except (TypeError, ValueError):
+            ingreso_mensual = 0.0
+
+    if isinstance(gastos_mensuales, str):
+        try:
+            gastos_mensuales = float(gastos_mensuales)
+        except (TypeError, ValueError):
+            gastos_mensuales = 0.0
+
+    if isinstance(ahorro_actual, str):
+        try:
+            ahorro_actual = float(ahorro_actual)
+        except (TypeError, ValueError):
+            ahorro_actual = 0.0
+
+    if isinstance(edad, str):
+        try:
+            edad = int(edad)
+        except (TypeError, ValueError):
+            edad = 30
+
+    # Cálculos básicos
+    ingreso_anual = ingreso_mensual * 12
+    gastos_anuales = gastos_mensuales * 12
+    ahorro_mensual = ingreso_mensual - gastos_mensuales
+    ahorro_anual = ahorro_mensual * 12
+    porcentaje_ahorro = (ahorro_mensual / ingreso_mensual * 100) if ingreso_mensual > 0 else 0
+
+    # Fondo de emergencia recomendado (6 meses de gastos)
+    fondo_emergencia_recomendado = gastos_mensuales * 6
+
+    # Necesidad de protección familiar
+    meses_proteccion = datos['objetivos'].get('meses_proteccion_familiar', 6)
+    if isinstance(meses_proteccion, str):
+        try:
+            meses_proteccion = int(meses_proteccion)
+        except (TypeError, ValueError):
+            meses_proteccion = 6
+    necesidad_proteccion = gastos_mensuales * meses_proteccion
+
+    # Necesidad de retiro
+    edad_retiro_deseada = datos['objetivos'].get('edad_retiro_deseada', 65)
+    if isinstance(edad_retiro_deseada, str):
+        try:
+            edad_retiro_deseada = int(edad_retiro_deseada)
+        except (TypeError, ValueError):
+            edad_retiro_deseada = 65
+
+    años_hasta_retiro = max(0, edad_retiro_deseada - edad) if edad_retiro_deseada > edad else 0
+
+    ingreso_retiro_mensual = datos['objetivos'].get('ingreso_retiro_mensual', 0)
+    if isinstance(ingreso_retiro_mensual, str):
+        try:
+            ingreso_retiro_mensual = float(ingreso_retiro_mensual)
+        except (TypeError, ValueError):
+            ingreso_retiro_mensual = 0.0
+
+    años_retiro = max(0, 80 - edad_retiro_deseada)  # Esperanza de vida 80 años
+    necesidad_retiro_total = ingreso_retiro_mensual * 12 * años_retiro
+
+    # Necesidad educación
+    necesidad_educacion = 0
+    num_hijos = datos['informacion_familiar'].get('num_hijos', 0)
+    hijos = datos['informacion_familiar'].get('hijos', [])
+    costo_universidad = datos['objetivos'].get('costo_universidad_por_hijo', 0)
+
+    if isinstance(costo_universidad, str):
+        try:
+            costo_universidad = float(costo_universidad)
+        except (TypeError, ValueError):
+            costo_universidad = 0.0
+
+    for i in range(min(num_hijos, len(hijos))):
+        if hijos[i].get('edad'):
+            try:
+                edad_hijo = int(hijos[i]['edad'])
+                if edad_hijo < 18:
+                    necesidad_educacion += costo_universidad
+            except (TypeError, ValueError):
+                necesidad_educacion += costo_universidad
+
+    # Necesidad proyecto
+    necesidad_proyecto = datos['objetivos'].get('costo_proyecto', 0)
+    if isinstance(necesidad_proyecto, str):
+        try:
+            necesidad_proyecto = float(necesidad_proyecto)
+        except (TypeError, ValueError):
+            necesidad_proyecto = 0.0
+
+    # Metas financieras
+    metas = {
+        'Protección': necesidad_proteccion,
+        'Retiro': necesidad_retiro_total,
+        'Educación': necesidad_educacion,
+        'Proyecto': necesidad_proyecto
+    }
+
+    # Ahorro recomendado (10% del ingreso anual)
+    ahorro_recomendado_10 = ingreso_anual * 0.10
+    ahorro_recomendado_7 = ingreso_mensual * 0.07 * 12
+
+    # Asegurarse de incluir TODAS las métricas necesarias
+    metricas = {
+        'ingreso_anual': ingreso_anual,
+        'gastos_anuales': gastos_anuales,
+        'ahorro_mensual': ahorro_mensual,
+        'ahorro_anual': ahorro_anual,
+        'porcentaje_ahorro': porcentaje_ahorro,
+        'fondo_emergencia_recomendado': fondo_emergencia_recomendado,
+        'años_hasta_retiro': años_hasta_retiro,
+        'necesidad_retiro_total': necesidad_retiro_total,
+        'necesidad_educacion': necesidad_educacion,
+        'necesidad_proteccion': necesidad_proteccion,
+        'necesidad_proyecto': necesidad_proyecto,  # ¡IMPORTANTE! Esta es la clave faltante
+        'ahorro_recomendado_10': ahorro_recomendado_10,
+        'ahorro_recomendado_7': ahorro_recomendado_7,
+        'metas': metas,
+        'datos_basicos': {
+            'ingreso_mensual': ingreso_mensual,
+            'gastos_mensuales': gastos_mensuales,
+            'ahorro_actual': ahorro_actual,
+            'deudas_totales': datos['informacion_financiera'].get('deudas_totales', 0)
+        }
+    }
+
+    return metricas
+
+
+def grafico_pastel_gastos(metricas):
+    """Crea gráfico de pastel para distribución de finanzas"""
+    plt = pyplot()
+    fig, ax = plt.subplots(figsize=(8, 6))
+
+    datos = metricas['datos_basicos']
+    labels = ['Gastos Mensuales', 'Ahorro Actual', 'Deudas Totales']
+    sizes = [
+        datos['gastos_mensuales'],
+        datos['ahorro_actual'],
+        datos.get('deudas_totales', 0)
+    ]
+
+    # Filtrar valores cero
+    filtered_labels = []
+    filtered_sizes = []
+    colors = []
+
+    for i, (label, size) in enumerate(zip(labels, sizes)):
+        if size > 0:
+            filtered_labels.append(label)
+            filtered_sizes.append(size)
+            colors.append(list(COLORES_AXA.values())[i % len(COLORES_AXA)])
+
+    if filtered_sizes:
+        wedges, texts, autotexts = ax.pie(
+            filtered_sizes,
+            labels=filtered_labels,
+            colors=colors,
+            autopct='%1.1f%%',
+            startangle=90,
+            textprops={'fontsize': 9}
+        )
+
+        ax.set_title('Distribución Financiera Actual',
+                    fontsize=14,
+                    fontweight='bold',
+                    color=COLORES_AXA['azul_principal'])
+
+        plt.tight_layout()
+        return fig
+    return None
+
+
+def grafico_barras_metas(metricas):
+    """Crea gráfico de barras para metas financieras"""
+    plt = pyplot()
+    fig, ax = plt.subplots(figsize=(10, 6))
+
+    metas = metricas['metas']
+    labels = list(metas.keys())
+    valores = list(metas.values())
+
+    # Filtrar metas con valor > 0
+    filtered_labels = []
+    filtered_valores = []
+    for label, valor in zip(labels, valores):
+        if valor > 0:
+            filtered_labels.append(label)
+            filtered_valores.append(valor)
+
+    if filtered_valores:
+        bars = ax.bar(filtered_labels, filtered_valores,
+                     color=[COLORES_AXA['azul_principal'],
+                           COLORES_AXA['verde_oscuro'],
+                           COLORES_AXA['verde_agua'],
+                           COLORES_AXA['azul_claro']][:len(filtered_labels)])
+
+        # Agregar valores en las barras
+        for bar, valor in zip(bars, filtered_valores):
+            height = bar.get_height()
+            ax.text(bar.get_x() + bar.get_width()/2., height + height*0.01,
+                   f'${valor:,.0f}',
+                   ha='center', va='bottom',
+                   fontsize=9, fontweight='bold')
+
+        ax.set_title('Metas Financieras por Categoría',
+                    fontsize=14,
+                    fontweight='bold',
+                    color=COLORES_AXA['azul_principal'])
+        ax.set_ylabel('Monto ($)', fontsize=12)
+        ax.grid(axis='y', alpha=0.3)
+        ax.set_axisbelow(True)
+
+        # Formatear eje Y
+        ax.yaxis.set_major_formatter(plt.FuncFormatter(lambda x, p: f'${x:,.0f}'))
+
+        plt.xticks(rotation=15)
+        plt.tight_layout()
+        return fig
+    return None
+
+
+def grafico_ahorro(metricas):
+    """Crea gráfico comparativo de ahorro"""
+    plt = pyplot()
+    fig, ax = plt.subplots(figsize=(8, 6))
+
+    datos = metricas['datos_basicos']
+    labels = ['Ahorro Actual', 'Ahorro Recomendado 10%', 'Ahorro Recomendado 7%']
+    valores = [
+        datos['ahorro_actual'],
+        metricas['ahorro_recomendado_10'],
+        metricas['ahorro_recomendado_7']
+    ]
+
+    bars = ax.bar(labels, valores,
+                 color=[COLORES_AXA['verde_agua'],
+                       COLORES_AXA['azul_principal'],
+                       COLORES_AXA['azul_claro']])
+
+    # Agregar valores
+    for bar, valor in zip(bars, valores):
+        height = bar.get_height()
+        ax.text(bar.get_x() + bar.get_width()/2., height + height*0.01,
+               f'${valor:,.0f}',
+               ha='center', va='bottom',
+               fontsize=9, fontweight='bold')
+
+    ax.set_title('Comparación de Ahorro',
+                fontsize=14,
+                fontweight='bold',
+                color=COLORES_AXA['azul_principal'])
+    ax.set_ylabel('Monto ($)', fontsize=12)
+    ax.grid(axis='y', alpha=0.3)
+    ax.set_axisbelow(True)
+
+    ax.yaxis.set_major_formatter(plt.FuncFormatter(lambda x, p: f'${x:,.0f}'))
+    plt.xticks(rotation=15)
+    plt.tight_layout()
+    return fig
+
+
+def reporte_excel(metricas, datos):
+    """Genera archivo Excel con el reporte financiero"""
+    output = io.BytesIO()
+
+    # Crear un Excel writer
+    with pd.ExcelWriter(output, engine='openpyxl') as writer:
+        # Hoja 1: Resumen Ejecutivo
+        datos_personales = datos['informacion_personal']
+        datos_familiares = datos['informacion_familiar']
+
+        resumen_data = {
+            'SECCIÓN': [
+                'INFORMACIÓN PERSONAL',
+                'Nombre',
+                'Teléfono',
+                'Email',
+                'Ocupación',
+                'Agente',
+                'Fecha Nacimiento',
+                'Edad',
+                'Estado Civil',
+                '',
+                'INFORMACIÓN FINANCIERA',
+                'Ingreso Mensual',
+                'Gastos Mensuales',
+                'Ahorro Actual',
+                'Deudas Totales',
+                'Capacidad de Ahorro Mensual',
+                'Porcentaje de Ahorro',
+                '',
+                'METAS FINANCIERAS',
+                'Fondo Emergencia Recomendado',
+                'Necesidad Protección Familiar',
+                'Necesidad Retiro Total',
+                'Necesidad Educación',
+                'Ahorro Recomendado 10%',
+                'Ahorro Recomendado 7%'
+            ],
+            'VALOR': [
+                '',
+                datos_personales.get('nombre', ''),
+                datos_personales.get('telefono', ''),
+                datos_personales.get('email', ''),
+                datos_personales.get('ocupacion', ''),
+                datos_personales.get('agente', ''),
+                datos_familiares.get('fecha_nacimiento', ''),
+                datos_familiares.get('edad', ''),
+                datos_familiares.get('estado_civil', ''),
+                '',
+                '',
+                f"${metricas['datos_basicos']['ingreso_mensual']:,.2f}",
+                f"${metricas['datos_basicos']['gastos_mensuales']:,.2f}",
+                f"${metricas['datos_basicos']['ahorro_actual']:,.2f}",
+                f"${metricas['datos_basicos'].get('deudas_totales', 0):,.2f}",
+                f"${metricas['ahorro_mensual']:,.2f}",
+                f"{metricas['porcentaje_ahorro']:.1f}%",
+                '',
+                '',
+                f"${metricas['fondo_emergencia_recomendado']:,.2f}",
+                f"${metricas['necesidad_proteccion']:,.2f}",
+                f"${metricas['necesidad_retiro_total']:,.2f}",
+                f"${metricas['necesidad_educacion']:,.2f}",
+                f"${metricas['ahorro_recomendado_10']:,.2f}",
+                f"${metricas['ahorro_recomendado_7']:,.2f}"
+            ]
+        }
+
+        df_resumen = pd.DataFrame(resumen_data)
+        df_resumen.to_excel(writer, sheet_name='RESUMEN EJECUTIVO', index=False)
+
+        # Hoja 2: Detalle de Metas
+        metas_data = {
+            'Meta': ['Protección Familiar', 'Retiro', 'Educación', 'Proyecto Futuro'],
+            'Monto Requerido': [
+                metricas['metas']['Protección'],
+                metricas['metas']['Retiro'],
+                metricas['metas']['Educación'],
+                metricas['metas']['Proyecto']
+            ],
+            'Descripción': [
+                f"{datos['objetivos'].get('meses_proteccion_familiar', 6)} meses de gastos",
+                f"Ingreso mensual deseado: ${datos['objetivos'].get('ingreso_retiro_mensual', 0):,.2f}",
+                f"Para {datos['informacion_familiar'].get('num_hijos', 0)} hijo(s)",
+                datos['objetivos'].get('proyecto_futuro', 'No especificado')
+            ]
+        }
+
+        df_metas = pd.DataFrame(metas_data)
+        df_metas.to_excel(writer, sheet_name='METAS DETALLADAS', index=False)
+
+        # Hoja 3: Plan de Ahorro
+        plan_data = {
+            'Recomendación': [
+                'Fondo de Emergencia',
+                'Ahorro para Protección',
+                'Ahorro para Retiro',
+                'Ahorro para Educación',
+                'Ahorro para Proyecto'
+            ],
+            'Monto Mensual Sugerido': [
+                metricas['fondo_emergencia_recomendado'] / 12,
+                metricas['metas']['Protección'] / 24 if metricas['metas']['Protección'] > 0 else 0,
+                metricas['metas']['Retiro'] / (metricas['años_hasta_retiro'] * 12) if metricas['años_hasta_retiro'] > 0 else 0,
+                metricas['metas']['Educación'] / 120 if metricas['metas']['Educación'] > 0 else 0,
+                metricas['metas']['Proyecto'] / 60 if metricas['metas']['Proyecto'] > 0 else 0
+            ],
+            'Plazo (meses)': [12, 24, metricas['años_hasta_retiro'] * 12, 120, 60],
+            'Prioridad': ['Alta', 'Alta', 'Media', 'Media', 'Baja']
+        }
+
+        df_plan = pd.DataFrame(plan_data)
+        df_plan.to_excel(writer, sheet_name='PLAN DE AHORRO', index=False)
+
+    output.seek(0)
+    return output
+
+
+def reporte_pdf(metricas, datos):
+    """Genera un archivo PDF con el reporte financiero"""
+    from reportlab.lib.pagesizes import letter
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    from reportlab.lib.units import inch
+    from reportlab.lib import colors
+
+    # Verificar que todas las claves necesarias existan
+    keys_required = [
+        'necesidad_proyecto', 'necesidad_proteccion',
+        'necesidad_retiro_total', 'necesidad_educacion'
+    ]
+
+    for key in keys_required:
+        if key not in metricas:
+            metricas[key] = 0.0  # Valor por defecto
+
+    # Verificar que 'metas' exista
+    if 'metas' not in metricas:
+        metricas['metas'] = {
+            'Protección': metricas.get('necesidad_proteccion', 0),
+            'Retiro': metricas.get('necesidad_retiro_total', 0),
+            'Educación': metricas.get('necesidad_educacion', 0),
+            'Proyecto': metricas.get('necesidad_proyecto', 0)
+        }
+
+    # Crear un buffer en memoria para el PDF
+    buffer = io.BytesIO()
+
+    # Crear el documento PDF
+    doc = SimpleDocTemplate(
+        buffer,
+        pagesize=letter,
+        rightMargin=72,
+        leftMargin=72,
+        topMargin=72,
+        bottomMargin=72
+    )
+
+    # Estilos
+    styles = getSampleStyleSheet()
+
+    # Crear estilos personalizados
+    title_style = ParagraphStyle(
+        'CustomTitle',
+        parent=styles['Heading1'],
+        fontSize=18,
+        textColor=colors.HexColor(COLORES_AXA['azul_principal']),
+        spaceAfter=30
+    )
+
+    subtitle_style = ParagraphStyle(
+        'CustomSubtitle',
+        parent=styles['Heading2'],
+        fontSize=14,
+        textColor=colors.HexColor(COLORES_AXA['verde_oscuro']),
+        spaceAfter=15
+    )
+
+    normal_style = styles['Normal']
+
+    # Contenido del PDF
+    story = []
+
+    # Título principal
+    nombre_cliente = datos['informacion_personal'].get('nombre', 'Cliente')
+    story.append(Paragraph(f"REPORTE FINANCIERO - {nombre_cliente.upper()}", title_style))
+    story.append(Paragraph(f"Fecha de generación: {datetime.now().strftime('%d/%m/%Y %H:%M')}", normal_style))
+    story.append(Spacer(1, 20))
+
+    # Información Personal
+    story.append(Paragraph("INFORMACIÓN PERSONAL", subtitle_style))
+
+    datos_personales = datos['informacion_personal']
+    datos_familiares = datos['informacion_familiar']
+
+    personal_data = [
+        ["Nombre:", datos_personales.get('nombre', 'No especificado')],
+        ["Teléfono:", datos_personales.get('telefono', 'No especificado')],
+        ["Email:", datos_personales.get('email', 'No especificado')],
+        ["Ocupación:", datos_personales.get('ocupacion', 'No especificado')],
+        ["Agente:", datos_personales.get('agente', 'No especificado')],
+        ["Estado Civil:", datos_familiares.get('estado_civil', 'No especificado')],
+        ["Fecha Nacimiento:", datos_familiares.get('fecha_nacimiento', 'No especificado')],
+        ["Edad:", str(datos_familiares.get('edad', 'No especificado'))],
+        ["Hijos:", str(datos_familiares.get('num_hijos', 0))]
+    ]
+
+    personal_table = Table(personal_data, colWidths=[2*inch, 4*inch])
+    personal_table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (0, -1), colors.HexColor(COLORES_AXA['azul_claro'])),
+        ('TEXTCOLOR', (0, 0), (0, -1), colors.white),
+        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+        ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, -1), 10),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
+        ('TOPPADDING', (0, 0), (-1, -1), 6),
+        ('GRID', (0, 0), (-1, -1), 1, colors.grey)
+    ]))
+
+    story.append(personal_table)
+    story.append(Spacer(1, 20))
+
+    # Información Financiera
+    story.append(Paragraph("INFORMACIÓN FINANCIERA", subtitle_style))
+
+    datos_financieros = datos['informacion_financiera']
+    financial_data = [
+        ["Ingreso Mensual Neto:", f"${datos_financieros.get('ingreso_mensual', 0):,.2f}"],
+        ["Gastos Mensuales Totales:", f"${datos_financieros.get('gastos_mensuales', 0):,.2f}"],
+        ["Ahorro Actual:", f"${datos_financieros.get('ahorro_actual', 0):,.2f}"],
+        ["Deudas Totales:", f"${datos_financieros.get('deudas_totales', 0):,.2f}"],
+        ["Capacidad de Ahorro Mensual:", f"${metricas.get('ahorro_mensual', 0):,.2f}"],
+        ["Porcentaje de Ahorro:", f"{metricas.get('porcentaje_ahorro', 0):.1f}%"],
+        ["Fondo Emergencia Recomendado:", f"${metricas.get('fondo_emergencia_recomendado', 0):,.2f}"]
+    ]
+
+    financial_table = Table(financial_data, colWidths=[2.5*inch, 3.5*inch])
+    financial_table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (0, -1), colors.HexColor(COLORES_AXA['verde_agua'])),
+        ('TEXTCOLOR', (0, 0), (0, -1), colors.white),
+        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+        ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, -1), 10),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
+        ('TOPPADDING', (0, 0), (-1, -1), 6),
+        ('GRID', (0, 0), (-1, -1), 1, colors.grey)
+    ]))
+
+    story.append(financial_table)
+    story.append(Spacer(1, 20))
+
+    # Metas Financieras - Usar metricas['metas'] en lugar de claves individuales
+    story.append(Paragraph("METAS FINANCIERAS", subtitle_style))
+
+    objetivos = datos['objetivos']
+    metas_data = [
+        ["Categoría", "Monto Requerido", "Descripción"],
+        ["Protección Familiar", f"${metricas['metas']['Protección']:,.2f}",
+         f"{objetivos.get('meses_proteccion_familiar', 6)} meses de gastos"],
+        ["Retiro", f"${metricas['metas']['Retiro']:,.2f}",
+         f"Ingreso mensual deseado: ${objetivos.get('ingreso_retiro_mensual', 0):,.2f}"],
+        ["Educación", f"${metricas['metas']['Educación']:,.2f}",
+         f"Para {datos_familiares.get('num_hijos', 0)} hijo(s)"],
+        ["Proyecto Futuro", f"${metricas['metas']['Proyecto']:,.2f}",
+         objetivos.get('proyecto_futuro', 'No especificado')]
+    ]
+
+    metas_table = Table(metas_data, colWidths=[1.5*inch, 2*inch, 3*inch])
+    metas_table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor(COLORES_AXA['azul_principal'])),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, -1), 10),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
+        ('TOPPADDING', (0, 0), (-1, -1), 6),
+        ('GRID', (0, 0), (-1, -1), 1, colors.grey),
+        ('BACKGROUND', (0, 1), (0, -1), colors.HexColor(COLORES_AXA['azul_claro'])),
+        ('BACKGROUND', (1, 1), (1, -1), colors.HexColor(COLORES_AXA['verde_agua'])),
+        ('BACKGROUND', (2, 1), (2, -1), colors.HexColor('#f0f0f0'))
+    ]))
+
+    story.append(metas_table)
+    story.append(Spacer(1, 20))
+
+    # Plan de Ahorro - Usar claves individuales con valores por defecto
+    story.append(Paragraph("PLAN DE AHORRO RECOMENDADO", subtitle_style))
+
+    años_hasta_retiro = metricas.get('años_hasta_retiro', 0)
+    plan_data = [
+        ["Recomendación", "Monto Mensual", "Plazo", "Prioridad"],
+        ["Fondo de Emergencia", f"${metricas.get('fondo_emergencia_recomendado', 0)/12:,.2f}", "12 meses", "Alta"],
+        ["Protección Familiar", f"${metricas.get('necesidad_proteccion', 0)/24:,.2f}" if metricas.get('necesidad_proteccion', 0) > 0 else "$0.00", "24 meses", "Alta"],
+        ["Retiro", f"${metricas.get('necesidad_retiro_total', 0)/(años_hasta_retiro*12):,.2f}" if años_hasta_retiro > 0 else "$0.00", f"{años_hasta_retiro*12} meses", "Media"],
+        ["Educación", f"${metricas.get('necesidad_educacion', 0)/120:,.2f}" if metricas.get('necesidad_educacion', 0) > 0 else "$0.00", "120 meses", "Media"],
+        ["Proyecto", f"${metricas.get('necesidad_proyecto', 0)/60:,.2f}" if metricas.get('necesidad_proyecto', 0) > 0 else "$0.00", "60 meses", "Baja"]
+    ]
+
+    plan_table = Table(plan_data, colWidths=[1.5*inch, 1.5*inch, 1.2*inch, 1.2*inch])
+    plan_table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor(COLORES_AXA['verde_oscuro'])),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, -1), 10),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
+        ('TOPPADDING', (0, 0), (-1, -1), 6),
+        ('GRID', (0, 0), (-1, -1), 1, colors.grey),
+        ('BACKGROUND', (3, 1), (3, 1), colors.HexColor('#ffcccc')),  # Alta - rojo claro
+        ('BACKGROUND', (3, 2), (3, 2), colors.HexColor('#ffcccc')),  # Alta - rojo claro
+        ('BACKGROUND', (3, 3), (3, 3), colors.HexColor('#ffffcc')),  # Media - amarillo claro
+        ('BACKGROUND', (3, 4), (3, 4), colors.HexColor('#ffffcc')),  # Media - amarillo claro
+        ('BACKGROUND', (3, 5), (3, 5), colors.HexColor('#ccffcc'))   # Baja - verde claro
+    ]))
+
+    story.append(plan_table)
+    story.append(Spacer(1, 30))
+
+    # Recomendaciones finales
+    story.append(Paragraph("RECOMENDACIONES GENERALES", subtitle_style))
+
+    recomendaciones = [
+        "1. Establecer un fondo de emergencia equivalente a 6 meses de gastos",
+        "2. Considerar un seguro de vida para proteger a la familia",
+        "3. Iniciar un plan de ahorro para el retiro lo antes posible",
+        "4. Diversificar las inversiones para reducir riesgos",
+        "5. Revisar periódicamente el plan financiero (al menos cada 6 meses)",
+        "6. Considerar instrumentos de inversión acordes al perfil de riesgo"
+    ]
+
+    for rec in recomendaciones:
+        story.append(Paragraph(rec, normal_style))
+        story.append(Spacer(1, 5))
+
+    story.append(Spacer(1, 20))
+
+    # Pie de página
+    footer = Paragraph(
+        f"Reporte generado por Sistema de Asesoría Financiera Rizkora • {datetime.now().strftime('%d/%m/%Y')} • Página 1 de 1",
+        ParagraphStyle(
+            'Footer',
+            parent=styles['Normal'],
+            fontSize=8,
+            textColor=colors.grey,
+            alignment=1
+        )
+    )
+    story.append(footer)
+
+    # Construir el PDF
+    doc.build(story)
+
+    # Obtener los datos del buffer
+    buffer.seek(0)
+    return buffer
@@ -0,0 +1,154 @@
+"""
+Índice de búsqueda aproximada de clientes y prospectos.
+
+Cada entidad (un Nombre/Razón Social) se indexa con el texto de todos sus
+campos de contacto: nombre, RFC, teléfono, correo y números de póliza.
+El texto se normaliza sin acentos y se indexa de dos formas:
+
+- trigramas de cada palabra (índice invertido trigrama -> entidades), para
+  tolerar errores de captura;
+- palabras completas ordenadas, para búsquedas por prefijo con searchsorted
+  (consultas cortas como "55" o "JU").
+"""
+
+import re
+import unicodedata
+
+import numpy as np
+import pandas as pd
+
+CAMPOS_BUSQUEDA = ["Nombre/Razón Social", "RFC", "Teléfono", "Correo", "No. Póliza"]
+RESULTADOS_POR_DEFECTO = 20
+PUNTAJE_MINIMO = 0.5
+
+
+def normalizar_texto(texto):
+    """
+    Mayúsculas sin acentos ni signos, con espacios simples.
+
+    Mismos pasos que normalizar_serie (NFKD y se descarta lo que no es
+    ASCII, como ß o ø) para que consultas e índice coincidan.
+    """
+    texto = unicodedata.normalize("NFKD", str(texto)).encode("ascii", "ignore").decode("ascii")
+    return re.sub(r"[^A-Z0-9]+", " ", texto.upper()).strip()
+
+
+def normalizar_serie(serie):
+    """normalizar_texto() vectorizado para una columna completa"""
+    return (
+        serie.fillna("").astype(str)
+        .str.normalize("NFKD").str.encode("ascii", "ignore").str.decode("ascii")
+        .str.upper().str.replace(r"[^A-Z0-9]+", " ", regex=True).str.strip()
+    )
+
+
+def _trigramas(palabra):
+    return {palabra[i:i + 3] for i in range(len(palabra) - 2)}
+
+
+def _csr(claves, valores, total):
+    """Agrupa ``valores`` por ``claves`` (0..total-1) en un arreglo continuo y sus límites"""
+    orden = np.argsort(claves, kind="stable")
+    limites = np.searchsorted(claves[orden], np.arange(total + 1), side="left")
+    return valores[orden], limites
+
+
+class IndiceBusqueda:
+    """Búsqueda de los ``k`` nombres más parecidos a una consulta libre"""
+
+    def __init__(self, df, campos=CAMPOS_BUSQUEDA, clave="Nombre/Razón Social"):
+        self.etiquetas = np.array([], dtype=object)
+        self._palabras = np.array([], dtype=object)
+        self._entidades_palabra, self._limites_palabra = np.array([], dtype="int64"), np.zeros(1, dtype="int64")
+        self._codigo_trigrama = {}
+        self._entidades_trigrama, self._limites_trigrama = np.array([], dtype="int64"), np.zeros(1, dtype="int64")
+        if df.empty or clave not in df.columns:
+            return
+
+        campos = [col for col in campos if col in df.columns]
+        nombres = df[clave].fillna("").astype(str)
+        con_nombre = nombres.str.strip() != ""
+        df = df[con_nombre]
+        if df.empty:
+            return
+        entidad, etiquetas = pd.factorize(nombres[con_nombre], sort=True)
+        self.etiquetas = np.asarray(etiquetas, dtype=object)
+
+        # Palabras de cada campo y el campo completo sin espacios (teléfonos, pólizas con guiones)
+        partes = []
+        for col in campos:
+            normalizado = normalizar_serie(df[col])
+            partes.append(pd.DataFrame({"entidad": entidad, "palabra": normalizado.str.split()}).explode("palabra"))
+            partes.append(pd.DataFrame({"entidad": entidad, "palabra": normalizado.str.replace(" ", "", regex=False)}))
+        pares = pd.concat(partes, ignore_index=True).dropna()
+        pares = pares[pares["palabra"] != ""].drop_duplicates()
+
+        codigo_palabra, palabras = pd.factorize(pares["palabra"], sort=True)
+        self._palabras = np.asarray(palabras, dtype=object)
+        self._entidades_palabra, self._limites_palabra = _csr(
+            codigo_palabra, pares["entidad"].to_numpy(dtype="int64"), len(palabras)
+        )
+
+        # Trigramas de cada palabra distinta, llevados a nivel entidad
+        serie_palabras = pd.Series(palabras)
+        largo = serie_palabras.str.len()
+        trigramas = pd.concat([
+            pd.DataFrame({"palabra": np.nonzero(largo >= i + 3)[0], "trigrama": serie_palabras[largo >= i + 3].str[i:i + 3].to_numpy()})
+            for i in range(max(int(largo.max()) - 2, 0))
+        ], ignore_index=True) if len(palabras) else pd.DataFrame(columns=["palabra", "trigrama"])
+        por_entidad = pd.DataFrame({"palabra": codigo_palabra, "entidad": pares["entidad"].to_numpy()}).merge(trigramas, on="palabra")
+        por_entidad = por_entidad[["trigrama", "entidad"]].drop_duplicates()
+
+        codigo_trigrama, unicos = pd.factorize(por_entidad["trigrama"])
+        self._codigo_trigrama = {trigrama: codigo for codigo, trigrama in enumerate(unicos)}
+        self._entidades_trigrama, self._limites_trigrama = _csr(
+            codigo_trigrama, por_entidad["entidad"].to_numpy(dtype="int64"), len(unicos)
+        )
+
+    def __len__(self):
+        return len(self.etiquetas)
+
+    def _por_trigrama(self, trigrama):
+        codigo = self._codigo_trigrama.get(trigrama)
+        if codigo is None:
+            return None
+        return self._entidades_trigrama[self._limites_trigrama[codigo]:self._limites_trigrama[codigo + 1]]
+
+    def _por_prefijo(self, prefijo):
+        # Las palabras están ordenadas: las que empiezan con el prefijo forman un tramo continuo
+        inicio = np.searchsorted(self._palabras, prefijo, side="left")
+        fin = np.searchsorted(self._palabras, prefijo + "\uffff", side="left")
+        return np.unique(self._entidades_palabra[self._limites_palabra[inicio]:self._limites_palabra[fin]])
+
+    def buscar(self, consulta, k=RESULTADOS_POR_DEFECTO):
+        """
+        Nombres que mejor coinciden con ``consulta``.
+
+        Cada palabra de la consulta aporta hasta 1 punto: 1 si es prefijo de
+        alguna palabra de la entidad, o la fracción de sus trigramas presentes.
+        Se exige al menos PUNTAJE_MINIMO por palabra en promedio.
+        """
+        palabras = normalizar_texto(consulta).split()
+        if not palabras or not len(self.etiquetas):
+            return []
+
+        puntaje = np.zeros(len(self.etiquetas))
+        for palabra in palabras:
+            aporte = np.zeros(len(self.etiquetas))
+            trigramas = _trigramas(palabra)
+            listas = [lista for lista in map(self._por_trigrama, trigramas) if lista is not None]
+            if listas:
+                aporte = np.bincount(np.concatenate(listas), minlength=len(self.etiquetas)) / len(trigramas)
+            aporte[self._por_prefijo(palabra)] = 1.0
+            puntaje += aporte
+
+        puntaje /= len(palabras)
+        candidatos = np.nonzero(puntaje >= PUNTAJE_MINIMO)[0]
+        if len(candidatos) > k:
+            candidatos = candidatos[np.argpartition(-puntaje[candidatos], k - 1)[:k]]
+        orden = np.lexsort((self.etiquetas[candidatos], -puntaje[candidatos]))
+        return self.etiquetas[candidatos[orden]].tolist()
+
+    def primeros(self, k=RESULTADOS_POR_DEFECTO):
+        """Primeros ``k`` nombres en orden alfabético (consulta vacía)"""
+        return self.etiquetas[:k].tolist()
@@ -0,0 +1,151 @@
+"""
+Caché compartida entre procesos para las hojas de Google Sheets.
+
+Todas las réplicas de Streamlit leen primero de esta capa y sólo van a
+gspread cuando la hoja no está en ella. Los DataFrames se guardan ya
+tipados (pickle) por hoja y revisión en un archivo SQLite, que puede vivir
+en un volumen compartido entre réplicas. Como los marcos se deserializan con
+pickle, el archivo y su directorio deben ser del usuario del proceso y no
+escribibles por nadie más; por defecto viven en ~/.cache/rizkora.
+
+La invalidación funciona como pub/sub: ``publicar`` incrementa la revisión
+de las hojas modificadas y descarta sus marcos; cada proceso compara su
+firma de revisiones en cada ejecución y recarga lo que haya cambiado.
+"""
+
+import os
+import pickle
+import sqlite3
+import stat
+import time
+from contextlib import closing, contextmanager
+
+from cartera.metricas import CONSULTAS_CACHE
+
+DIRECTORIO_PRIVADO = os.path.join(
+    os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache"),
+    "rizkora"
+)
+RUTA_POR_DEFECTO = os.environ.get(
+    "RIZKORA_CACHE_DB",
+    os.path.join(DIRECTORIO_PRIVADO, "cache.sqlite3")
+)
+TTL_POR_DEFECTO = 300  # Segundos; mismo TTL que el cache local de cargar_datos
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS revisiones (
+    hoja TEXT PRIMARY KEY,
+    revision INTEGER NOT NULL,
+    publicado REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS marcos (
+    hoja TEXT NOT NULL,
+    revision INTEGER NOT NULL,
+    creado REAL NOT NULL,
+    datos BLOB NOT NULL,
+    PRIMARY KEY (hoja, revision)
+);
+"""
+
+
+def _verificar_propietario(ruta, info):
+    """Rechaza rutas de otro usuario o escribibles por grupo/otros"""
+    if hasattr(os, "getuid") and info.st_uid != os.getuid():
+        raise PermissionError(f"'{ruta}' pertenece a otro usuario")
+    if info.st_mode & (stat.S_IWGRP | stat.S_IWOTH):
+        raise PermissionError(f"'{ruta}' es escribible por otros usuarios")
+
+
+def preparar_archivo_privado(ruta):
+    """
+    Crea ``ruta`` con permisos 0600 en un directorio privado (0700).
+
+    Si el directorio o el archivo ya existen deben ser del usuario del
+    proceso; de otro modo cualquiera podría dejar un marco que pickle
+    ejecutaría al leerlo, o reemplazar el archivo por un enlace. También lo
+    usa la bitácora de trazas de cartera.instrumentacion.
+
+    Raises:
+        PermissionError: Si el directorio o el archivo son de otro usuario o escribibles por otros
+    """
+    directorio = os.path.dirname(os.path.abspath(ruta))
+    os.makedirs(directorio, mode=0o700, exist_ok=True)
+    _verificar_propietario(directorio, os.stat(directorio))
+    descriptor = os.open(ruta, os.O_RDWR | os.O_CREAT | getattr(os, "O_NOFOLLOW", 0), 0o600)
+    try:
+        info = os.fstat(descriptor)
+        _verificar_propietario(ruta, info)
+        if info.st_mode & 0o077:
+            os.fchmod(descriptor, 0o600)
+    finally:
+        os.close(descriptor)
+
+
+class CacheCompartido:
+    """Caché de DataFrames por hoja y revisión respaldada por SQLite"""
+
+    def __init__(self, ruta=None, ttl=TTL_POR_DEFECTO):
+        self.ruta = ruta or RUTA_POR_DEFECTO
+        self.ttl = ttl
+        preparar_archivo_privado(self.ruta)
+        with self._conexion() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_ESQUEMA)
+
+    @contextmanager
+    def _conexion(self):
+        with closing(sqlite3.connect(self.ruta, timeout=30)) as conn:
+            with conn:
+                yield conn
+
+    def firma(self, hojas):
+        """Devuelve la tupla de revisiones actuales de las hojas indicadas"""
+        with self._conexion() as conn:
+            filas = dict(conn.execute("SELECT hoja, revision FROM revisiones").fetchall())
+        return tuple(filas.get(hoja, 0) for hoja in hojas)
+
+    def leer(self, hoja, revision):
+        """Devuelve el DataFrame guardado para la revisión o None si no está vigente"""
+        limite = time.time() - self.ttl
+        with self._conexion() as conn:
+            fila = conn.execute(
+                "SELECT datos FROM marcos WHERE hoja = ? AND revision = ? AND creado >= ?",
+                (hoja, revision, limite)
+            ).fetchone()
+        if fila is None:
+            CONSULTAS_CACHE.incrementar(cache="compartida", resultado="fallo")
+            return None
+        try:
+            df = pickle.loads(fila[0])
+        except Exception:
+            CONSULTAS_CACHE.incrementar(cache="compartida", resultado="fallo")
+            return None
+        CONSULTAS_CACHE.incrementar(cache="compartida", resultado="acierto")
+        return df
+
+    def escribir(self, hoja, revision, df):
+        """
+        Guarda el DataFrame leído de Sheets bajo la revisión observada antes de leer.
+
+        Si otra réplica publicó mientras tanto, el marco queda bajo una revisión
+        vieja que nadie vuelve a pedir.
+        """
+        datos = pickle.dumps(df, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._conexion() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO marcos (hoja, revision, creado, datos) VALUES (?, ?, ?, ?)",
+                (hoja, revision, time.time(), datos)
+            )
+            conn.execute("DELETE FROM marcos WHERE hoja = ? AND revision < ?", (hoja, revision))
+
+    def publicar(self, hojas):
+        """Publica una nueva revisión de las hojas modificadas y descarta sus marcos"""
+        ahora = time.time()
+        with self._conexion() as conn:
+            for hoja in hojas:
+                conn.execute(
+                    "INSERT INTO revisiones (hoja, revision, publicado) VALUES (?, 1, ?) "
+                    "ON CONFLICT(hoja) DO UPDATE SET revision = revision + 1, publicado = excluded.publicado",
+                    (hoja, ahora)
+                )
+                conn.execute("DELETE FROM marcos WHERE hoja = ?", (hoja,))
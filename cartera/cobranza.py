@@ -0,0 +1,315 @@
+"""
+Motor de cobranza: operaciones vectorizadas sobre la hoja de Cobranza.
+
+Uso (proceso nocturno de estatus y antigüedad):
+    python -m cartera.cobranza
+    python -m cartera.cobranza --fecha 01/03/2025 --simular
+"""
+
+import argparse
+import sys
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from cartera.esquema import CLAVE_POR_HOJA
+from cartera.montos import a_centavos, a_pesos
+
+ESTATUS_ABIERTOS = ["Pendiente", "Vencido"]
+ESTATUS_CERRADOS = ["Pagado", "Cancelado"]
+
+# Programa de recibos: meses entre recibos según periodicidad (otras periodicidades se cobran mensual)
+MESES_POR_PERIODICIDAD = {"CONTADO": 12, "TRIMESTRAL": 3, "SEMESTRAL": 6, "MENSUAL": 1}
+MAX_RECIBOS = 36
+DIAS_HORIZONTE_RECIBOS = 60
+FORMATOS_FECHA_VIGENCIA = ("%d/%m/%Y", "%Y-%m-%d", "%d-%m-%Y")
+
+
+def parsear_fechas_dmy(serie):
+    """Convierte una columna dd/mm/yyyy a datetime64; NaT si no es válida"""
+    return pd.to_datetime(serie.astype(str).str.strip(), format="%d/%m/%Y", errors="coerce")
+
+
+def parsear_fechas_vigencia(serie):
+    """Como parsear_fechas_dmy() pero acepta también yyyy-mm-dd y dd-mm-yyyy, igual que calcular_cobranza"""
+    texto = serie.astype(str).str.strip()
+    fechas = pd.to_datetime(texto, format=FORMATOS_FECHA_VIGENCIA[0], errors="coerce")
+    for formato in FORMATOS_FECHA_VIGENCIA[1:]:
+        faltantes = fechas.isna()
+        if not faltantes.any():
+            break
+        fechas[faltantes] = pd.to_datetime(texto[faltantes], format=formato, errors="coerce")
+    return fechas
+
+
+def programa_recibos(df_polizas):
+    """
+    Datos del programa de recibos de cada póliza vigente, uno por No. Póliza.
+
+    Returns:
+        DataFrame con No. Póliza, Aseguradora, Moneda, Clave de Emisión,
+        Inicio (datetime), Meses (entre recibos), Primer Pago y Pagos Subsecuentes (en centavos, int64)
+    """
+    columnas = ["No. Póliza", "Aseguradora", "Moneda", "Clave de Emisión", "Inicio", "Meses",
+                "Primer Pago", "Pagos Subsecuentes"]
+    if df_polizas.empty or "Estado" not in df_polizas.columns:
+        return pd.DataFrame(columns=columnas)
+
+    vigentes = df_polizas[df_polizas["Estado"] == "VIGENTE"]
+    vacia = pd.Series("", index=vigentes.index)
+    programa = pd.DataFrame({
+        "No. Póliza": vigentes["No. Póliza"].astype(str).str.strip(),
+        "Aseguradora": vigentes.get("Aseguradora", vacia).fillna("").astype(str),
+        "Moneda": vigentes.get("Moneda", vacia).replace("", "MXN").fillna("MXN").astype(str),
+        "Clave de Emisión": vigentes.get("Clave de Emisión", vacia).fillna("").astype(str),
+        "Inicio": parsear_fechas_vigencia(vigentes.get("Inicio Vigencia", vacia)),
+        "Meses": vigentes.get("Periodicidad", vacia).astype(str).str.upper().str.strip()
+                 .map(MESES_POR_PERIODICIDAD).fillna(1).astype("int64"),
+        "Primer Pago": a_centavos(vigentes.get("Primer Pago", vacia)).fillna(0).astype("int64"),
+        "Pagos Subsecuentes": a_centavos(vigentes.get("Pagos Subsecuentes", vacia)).fillna(0).astype("int64"),
+    })
+    sin_subsecuente = programa["Pagos Subsecuentes"] == 0
+    programa.loc[sin_subsecuente, "Pagos Subsecuentes"] = programa.loc[sin_subsecuente, "Primer Pago"]
+    programa = programa[(programa["No. Póliza"] != "") & programa["Inicio"].notna()]
+    return programa.drop_duplicates("No. Póliza", keep="last").reset_index(drop=True)[columnas]
+
+
+COLUMNAS_RECIBOS = ["No. Póliza", "Nombre/Razón Social", "Mes Cobranza", "Fecha Vencimiento", "Prima de Recibo",
+                    "Monto Pagado", "Fecha Pago", "Estatus", "Días Restantes", "Días Atraso", "Periodicidad",
+                    "Moneda", "Recibo", "Clave de Emisión", "Comentario", "ID_Cobranza"]
+
+
+def _fechas_recibos(inicio, meses):
+    """
+    Matriz (pólizas, MAX_RECIBOS) de vencimientos sumando ``meses`` mes a mes
+    desde ``inicio``, como relativedelta: el día se recorta al fin de mes y
+    ese recorte se arrastra a los recibos siguientes.
+    """
+    mes = (inicio.dt.year.to_numpy(dtype="int64") - 1970) * 12 + inicio.dt.month.to_numpy(dtype="int64") - 1
+    dia = inicio.dt.day.to_numpy(dtype="int64")
+    fechas = np.empty((len(inicio), MAX_RECIBOS), dtype="datetime64[D]")
+    for recibo in range(MAX_RECIBOS):
+        if recibo:
+            mes = mes + meses
+            primero = mes.astype("datetime64[M]").astype("datetime64[D]")
+            dias_mes = ((mes + 1).astype("datetime64[M]").astype("datetime64[D]") - primero).astype("int64")
+            dia = np.minimum(dia, dias_mes)
+        fechas[:, recibo] = mes.astype("datetime64[M]").astype("datetime64[D]") + (dia - 1)
+    return fechas
+
+
+def generar_recibos(df_polizas, df_cobranza=None, hoy=None, dias_horizonte=DIAS_HORIZONTE_RECIBOS):
+    """
+    Recibos de las pólizas vigentes que vencen hasta ``dias_horizonte`` días
+    después de ``hoy`` y que aún no están en Cobranza (por No. Póliza y Recibo).
+
+    Los recibos ya vencidos se marcan "Vencido" con comentario de registro
+    tardío; el resto "Pendiente".
+
+    Returns:
+        DataFrame con COLUMNAS_RECIBOS, un recibo por ID_Cobranza
+    """
+    if df_polizas.empty or "Estado" not in df_polizas.columns:
+        return pd.DataFrame(columns=COLUMNAS_RECIBOS)
+    hoy = pd.Timestamp(hoy or datetime.now())
+    limite = np.datetime64((hoy + pd.Timedelta(days=dias_horizonte)).normalize(), "D")
+
+    vigentes = df_polizas[df_polizas["Estado"] == "VIGENTE"]
+    vacia = pd.Series("", index=vigentes.index)
+    no_poliza = vigentes.get("No. Póliza", vacia).astype(str).str.strip()
+    inicio = parsear_fechas_vigencia(vigentes.get("Inicio Vigencia", vacia).fillna(""))
+    validas = ((no_poliza != "") & inicio.notna()).to_numpy()
+    vigentes, no_poliza, inicio = vigentes[validas], no_poliza[validas], inicio[validas]
+    if vigentes.empty:
+        return pd.DataFrame(columns=COLUMNAS_RECIBOS)
+
+    vacia = pd.Series("", index=vigentes.index)
+    periodicidad = vigentes.get("Periodicidad", vacia).astype(str).str.upper().str.strip()
+    meses = periodicidad.map(MESES_POR_PERIODICIDAD).fillna(1).to_numpy(dtype="int64")
+    fechas = _fechas_recibos(inicio, meses)
+    numeros = np.arange(1, MAX_RECIBOS + 1)
+
+    generar = fechas <= limite
+    if df_cobranza is not None and not df_cobranza.empty and {"No. Póliza", "Recibo"} <= set(df_cobranza.columns):
+        existentes = pd.DataFrame({
+            "No. Póliza": df_cobranza["No. Póliza"].astype(str).str.strip().to_numpy(),
+            "Recibo": pd.to_numeric(df_cobranza["Recibo"], errors="coerce").to_numpy(),
+        })
+        existentes = existentes[existentes["Recibo"].between(1, MAX_RECIBOS)]
+        ya_registrados = pd.DataFrame({"No. Póliza": no_poliza.to_numpy(), "Fila": np.arange(len(no_poliza))}).merge(existentes)
+        generar[ya_registrados["Fila"].to_numpy(), ya_registrados["Recibo"].to_numpy(dtype="int64") - 1] = False
+
+    filas, columnas = np.nonzero(generar)
+    if not len(filas):
+        return pd.DataFrame(columns=COLUMNAS_RECIBOS)
+    vencimiento = pd.to_datetime(fechas[filas, columnas])
+    numero = numeros[columnas]
+    dias_restantes = ((vencimiento - hoy) // pd.Timedelta(days=1)).to_numpy(dtype="int64")
+    vencido = np.asarray(vencimiento < hoy.normalize())
+    primer_pago = a_centavos(vigentes.get("Primer Pago", vacia)).fillna(0).to_numpy(dtype="int64")
+    subsecuentes = a_centavos(vigentes.get("Pagos Subsecuentes", vacia)).fillna(0).to_numpy(dtype="int64")
+    subsecuentes = np.where(subsecuentes == 0, primer_pago, subsecuentes)
+    claves = no_poliza.to_numpy()[filas]
+
+    recibos = pd.DataFrame({
+        "No. Póliza": claves,
+        "Nombre/Razón Social": vigentes.get("Nombre/Razón Social", vacia).to_numpy()[filas],
+        "Mes Cobranza": vencimiento.strftime("%m/%Y"),
+        "Fecha Vencimiento": vencimiento.strftime("%d/%m/%Y"),
+        "Prima de Recibo": a_pesos(np.where(numero == 1, primer_pago[filas], subsecuentes[filas])),
+        "Monto Pagado": 0,
+        "Fecha Pago": "",
+        "Estatus": np.where(vencido, "Vencido", "Pendiente"),
+        "Días Restantes": dias_restantes,
+        "Días Atraso": np.where(vencido, np.abs(dias_restantes), 0),
+        "Periodicidad": periodicidad.to_numpy()[filas],
+        "Moneda": vigentes.get("Moneda", pd.Series("MXN", index=vigentes.index)).to_numpy()[filas],
+        "Recibo": numero,
+        "Clave de Emisión": vigentes.get("Clave de Emisión", vacia).to_numpy()[filas],
+        "Comentario": np.where(vencido, "Cobranza vencida - registro tardío", ""),
+        "ID_Cobranza": pd.Series(claves).str.cat(pd.Series(numero).astype(str), sep="_R").to_numpy(),
+    }, columns=COLUMNAS_RECIBOS)
+    return recibos.drop_duplicates("ID_Cobranza", keep="last").reset_index(drop=True)
+
+
+def cancelar_recibos_polizas(cancelaciones, df_cobranza):
+    """
+    Cancela en una sola pasada los recibos abiertos de varias pólizas.
+
+    Un recibo se cancela si está Pendiente o Vencido y vence después de la
+    fecha de cancelación de su póliza.
+
+    Args:
+        cancelaciones: Iterable de pares (No. Póliza, fecha_cancelacion dd/mm/yyyy)
+        df_cobranza: DataFrame de cobranza (se modifica en sitio)
+
+    Returns:
+        (df_cobranza, indices): DataFrame actualizado y lista de índices tocados
+
+    Raises:
+        ValueError: Si alguna fecha de cancelación no es dd/mm/yyyy
+    """
+    pares = pd.DataFrame(list(cancelaciones), columns=["No. Póliza", "Fecha Cancelación"], dtype=object)
+    if df_cobranza.empty or pares.empty:
+        return df_cobranza, []
+
+    pares["No. Póliza"] = pares["No. Póliza"].astype(str).str.strip()
+    pares["Fecha Cancelación"] = pares["Fecha Cancelación"].astype(str).str.strip()
+    fechas = parsear_fechas_dmy(pares["Fecha Cancelación"])
+    invalidas = pares.loc[fechas.isna(), "No. Póliza"].tolist()
+    if invalidas:
+        raise ValueError(f"Fecha de cancelación inválida para: {', '.join(invalidas)}")
+    pares = pares.assign(Fecha=fechas).drop_duplicates("No. Póliza", keep="last").set_index("No. Póliza")
+
+    no_poliza = df_cobranza["No. Póliza"].astype(str).str.strip()
+    fecha_cancelacion = no_poliza.map(pares["Fecha"])
+    vencimiento = parsear_fechas_dmy(df_cobranza["Fecha Vencimiento"])
+
+    mascara = df_cobranza["Estatus"].isin(ESTATUS_ABIERTOS) & (vencimiento > fecha_cancelacion)
+    if not mascara.any():
+        return df_cobranza, []
+
+    df_cobranza.loc[mascara, "Estatus"] = "Cancelado"
+    df_cobranza.loc[mascara, "Comentario"] = (
+        "Cancelado automáticamente - Póliza cancelada el " + no_poliza[mascara].map(pares["Fecha Cancelación"])
+    )
+    df_cobranza.loc[mascara, "Prima de Recibo"] = 0
+    df_cobranza.loc[mascara, "Monto Pagado"] = 0
+    return df_cobranza, df_cobranza.index[mascara].tolist()
+
+
+def claves_emision_por_poliza(df_polizas, no_polizas):
+    """Clave de Emisión de la póliza de cada valor de ``no_polizas`` (la primera captura gana; "" si no existe)"""
+    if df_polizas.empty or "Clave de Emisión" not in df_polizas.columns:
+        return pd.Series("", index=no_polizas.index, dtype=object)
+    claves = df_polizas.assign(**{"No. Póliza": df_polizas["No. Póliza"].astype(str)})
+    claves = claves.drop_duplicates("No. Póliza").set_index("No. Póliza")["Clave de Emisión"].astype(object)
+    return no_polizas.astype(str).map(claves).fillna("")
+
+
+def calcular_antiguedad(fechas_vencimiento, hoy=None):
+    """
+    Días Restantes y Días Atraso de una columna de vencimientos dd/mm/yyyy.
+
+    Returns:
+        DataFrame con "Días Restantes" y "Días Atraso" (Int64, nulos si la fecha no es válida)
+    """
+    hoy = pd.Timestamp(hoy or datetime.now()).normalize()
+    dias_restantes = (parsear_fechas_dmy(fechas_vencimiento) - hoy).dt.days.astype("Int64")
+    return pd.DataFrame({
+        "Días Restantes": dias_restantes,
+        "Días Atraso": (-dias_restantes).clip(lower=0),
+    }, index=fechas_vencimiento.index)
+
+
+def actualizar_estatus(df_cobranza, hoy=None):
+    """
+    Recalcula Estatus (Pendiente/Vencido), Días Restantes y Días Atraso de los recibos abiertos.
+
+    Args:
+        df_cobranza: DataFrame de cobranza (se modifica en sitio)
+        hoy: Fecha de referencia; por defecto hoy
+
+    Returns:
+        (df_cobranza, celdas): DataFrame actualizado y lista de pares (índice, columna) que cambiaron
+    """
+    if df_cobranza.empty or "Fecha Vencimiento" not in df_cobranza.columns:
+        return df_cobranza, []
+
+    abiertos = df_cobranza["Estatus"].isin(ESTATUS_ABIERTOS)
+    antiguedad = calcular_antiguedad(df_cobranza.loc[abiertos, "Fecha Vencimiento"], hoy)
+    antiguedad = antiguedad[antiguedad["Días Restantes"].notna()]
+    antiguedad["Estatus"] = "Pendiente"
+    antiguedad.loc[antiguedad["Días Restantes"] < 0, "Estatus"] = "Vencido"
+
+    celdas = []
+    for columna in ["Estatus", "Días Restantes", "Días Atraso"]:
+        nuevo = antiguedad[columna]
+        if columna not in df_cobranza.columns:
+            df_cobranza[columna] = ""
+        actual = df_cobranza.loc[nuevo.index, columna]
+        if columna == "Estatus":
+            cambio = actual.astype(str) != nuevo
+        else:
+            cambio = (pd.to_numeric(actual, errors="coerce") != nuevo).fillna(True).astype(bool)
+        if cambio.any():
+            indices = nuevo.index[cambio.to_numpy()]
+            serie = df_cobranza[columna]
+            if isinstance(serie.dtype, pd.CategoricalDtype):
+                # Conserva el dtype category de tipar_catalogos(); sólo agrega las categorías que falten
+                faltantes = pd.Index(nuevo[indices].unique()).difference(serie.cat.categories)
+                df_cobranza[columna] = serie.cat.add_categories(faltantes)
+            else:
+                df_cobranza[columna] = serie.astype(object)
+            df_cobranza.loc[indices, columna] = nuevo[indices].astype(object)
+            celdas.extend((idx, columna) for idx in indices)
+    return df_cobranza, celdas
+
+
+def main(argv=None):
+    from cartera.almacenamiento import abrir_libro, actualizar_celdas, leer_hoja
+    from cartera.cache_compartido import CacheCompartido
+
+    parser = argparse.ArgumentParser(description="Actualiza estatus y antigüedad de los recibos abiertos")
+    parser.add_argument("--fecha", help="Fecha de referencia dd/mm/yyyy (por defecto hoy)")
+    parser.add_argument("--simular", action="store_true", help="Sólo reporta los cambios, no escribe en Sheets")
+    args = parser.parse_args(argv)
+
+    hoy = datetime.strptime(args.fecha, "%d/%m/%Y") if args.fecha else None
+    spreadsheet = abrir_libro()
+    df_cobranza = leer_hoja(spreadsheet, "Cobranza")
+    df_cobranza, celdas = actualizar_estatus(df_cobranza, hoy)
+
+    cambios_estatus = sum(1 for _, col in celdas if col == "Estatus")
+    print(f"Celdas modificadas: {len(celdas)} | cambios de estatus: {cambios_estatus}")
+    if args.simular or not celdas:
+        return 0
+
+    actualizar_celdas(spreadsheet, "Cobranza", df_cobranza, celdas, clave=CLAVE_POR_HOJA["Cobranza"])
+    CacheCompartido().publicar(["Cobranza"])
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,184 @@
+"""
+Motor de comisiones devengadas por recibo pagado.
+
+La comisión de un recibo es su Monto Pagado, llevado a prima neta con la
+proporción Prima Neta / Prima Total Emitida de la póliza, por el % Comisión
+de la póliza. El resultado se materializa en la hoja "Comisiones" (una fila
+por recibo): al registrar un pago sólo se agrega la fila de ese recibo, y
+el cierre de mes agrega las que falten.
+
+Uso (cierre de mes):
+    python -m cartera.comisiones --mes 2025-01
+    python -m cartera.comisiones --mes 2025-01 --simular --salida comisiones_2025_01.xlsx
+"""
+
+import argparse
+import os
+import sys
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from cartera.cobranza import parsear_fechas_dmy
+from cartera.esquema import COLUMNAS_COMISIONES, HOJA_COMISIONES
+from cartera.montos import a_centavos, a_pesos
+
+AGRUPACION = ["Clave de Emisión", "Aseguradora", "Mes", "Moneda"]
+
+
+def _ids_cobranza(df_recibos, no_poliza):
+    """ID_Cobranza de cada recibo; si falta se arma como en calcular_cobranza ({póliza}_R{recibo})"""
+    ids = df_recibos.get("ID_Cobranza", pd.Series("", index=df_recibos.index)).fillna("").astype(str).str.strip()
+    faltantes = ids == ""
+    if faltantes.any():
+        recibo = df_recibos.get("Recibo", pd.Series("", index=df_recibos.index)).astype(str)
+        ids[faltantes] = no_poliza[faltantes] + "_R" + recibo[faltantes]
+    return ids
+
+
+def comisiones_por_recibo(df_recibos, df_polizas, fecha_registro=None):
+    """
+    Comisión de cada recibo pagado de ``df_recibos``.
+
+    Las pólizas se unen por índice de No. Póliza (la última captura gana);
+    los recibos sin póliza se omiten.
+
+    Returns:
+        DataFrame con COLUMNAS_COMISIONES
+    """
+    if df_recibos.empty or df_polizas.empty or "Estatus" not in df_recibos.columns:
+        return pd.DataFrame(columns=COLUMNAS_COMISIONES)
+
+    pagados = df_recibos[df_recibos["Estatus"] == "Pagado"]
+    polizas = df_polizas.assign(**{"No. Póliza": df_polizas["No. Póliza"].astype(str).str.strip()})
+    polizas = polizas.drop_duplicates("No. Póliza", keep="last").set_index("No. Póliza")
+
+    no_poliza = pagados["No. Póliza"].astype(str).str.strip()
+    posiciones = polizas.index.get_indexer(no_poliza)
+    con_poliza = posiciones >= 0
+    pagados, no_poliza, posiciones = pagados[con_poliza], no_poliza[con_poliza], posiciones[con_poliza]
+    if pagados.empty:
+        return pd.DataFrame(columns=COLUMNAS_COMISIONES)
+    poliza = polizas.iloc[posiciones]
+    vacia = pd.Series("", index=poliza.index)
+
+    # Primas en centavos y % Comisión en centésimas de punto (10.5% -> 1050), todos enteros
+    porcentaje = a_centavos(poliza.get("% Comisión", vacia)).fillna(0).to_numpy(dtype="int64")
+    prima_neta = a_centavos(poliza.get("Prima Neta", vacia)).fillna(0).to_numpy(dtype="int64")
+    prima_total = a_centavos(poliza.get("Prima Total Emitida", vacia)).fillna(0).to_numpy(dtype="int64")
+    proporcion = np.where((prima_neta > 0) & (prima_total > 0), prima_neta / np.where(prima_total > 0, prima_total, 1), 1.0)
+
+    # Montos en centavos: base y comisión se redondean al centavo una sola vez cada una
+    monto_pagado = a_centavos(pagados["Monto Pagado"]).fillna(0).to_numpy(dtype="int64")
+    base = np.rint(monto_pagado * proporcion).astype("int64")
+    fecha_pago = parsear_fechas_dmy(pagados["Fecha Pago"])
+
+    clave = poliza.get("Clave de Emisión", vacia).fillna("").astype(str).to_numpy()
+    clave_recibo = pagados.get("Clave de Emisión", pd.Series("", index=pagados.index)).fillna("").astype(str).to_numpy()
+    moneda = pagados.get("Moneda", pd.Series("", index=pagados.index)).fillna("").astype(str).to_numpy()
+    moneda_poliza = poliza.get("Moneda", vacia).fillna("").astype(str).to_numpy()
+
+    return pd.DataFrame({
+        "ID_Cobranza": _ids_cobranza(pagados, no_poliza).to_numpy(),
+        "No. Póliza": no_poliza.to_numpy(),
+        "Recibo": pagados.get("Recibo", pd.Series("", index=pagados.index)).to_numpy(),
+        "Clave de Emisión": np.where(clave != "", clave, clave_recibo),
+        "Aseguradora": poliza.get("Aseguradora", vacia).fillna("").astype(str).to_numpy(),
+        "Moneda": np.where(moneda != "", moneda, moneda_poliza),
+        "Mes": fecha_pago.dt.strftime("%Y-%m").fillna("Sin fecha").to_numpy(),
+        "Fecha Pago": pagados["Fecha Pago"].to_numpy(),
+        "Monto Pagado": a_pesos(monto_pagado),
+        "Base Comisión": a_pesos(base),
+        "% Comisión": a_pesos(porcentaje),
+        "Comisión": a_pesos(np.rint(base * porcentaje / 10000)),
+        "Fecha Registro": fecha_registro or datetime.now().strftime("%d/%m/%Y"),
+    }, columns=COLUMNAS_COMISIONES)
+
+
+def comisiones_pendientes(df_recibos, df_polizas, df_comisiones):
+    """Comisiones de recibos pagados que aún no están en el libro de comisiones"""
+    nuevas = comisiones_por_recibo(df_recibos, df_polizas)
+    if nuevas.empty or df_comisiones.empty or "ID_Cobranza" not in df_comisiones.columns:
+        return nuevas
+    registradas = pd.Index(df_comisiones["ID_Cobranza"].astype(str).str.strip())
+    return nuevas[~nuevas["ID_Cobranza"].isin(registradas)].reset_index(drop=True)
+
+
+def resumir_comisiones(df_comisiones, mes=None, agrupacion=AGRUPACION):
+    """
+    Totales del libro de comisiones por Clave de Emisión, Aseguradora, mes y moneda.
+
+    Args:
+        mes: "yyyy-mm" para limitar a un mes
+    """
+    columnas = list(agrupacion) + ["Recibos", "Base Comisión", "Comisión"]
+    if df_comisiones.empty:
+        return pd.DataFrame(columns=columnas)
+    datos = df_comisiones
+    if mes:
+        datos = datos[datos["Mes"].astype(str) == mes]
+    datos = datos.assign(**{
+        "Base Comisión": a_centavos(datos["Base Comisión"]).fillna(0).astype("int64"),
+        "Comisión": a_centavos(datos["Comisión"]).fillna(0).astype("int64"),
+    })
+    resumen = datos.groupby(list(agrupacion), dropna=False).agg(
+        Recibos=("Comisión", "size"),
+        **{"Base Comisión": ("Base Comisión", "sum"), "Comisión": ("Comisión", "sum")}
+    ).reset_index()
+    resumen["Base Comisión"] = a_pesos(resumen["Base Comisión"])
+    resumen["Comisión"] = a_pesos(resumen["Comisión"])
+    return resumen[columnas]
+
+
+def main(argv=None):
+    from cartera.almacenamiento import abrir_libro, agregar_filas, leer_hoja
+    from cartera.cache_compartido import CacheCompartido
+    from cartera.exportacion import FORMATOS, exportar
+
+    parser = argparse.ArgumentParser(description="Cierre de mes de comisiones devengadas")
+    parser.add_argument("--mes", default=datetime.now().strftime("%Y-%m"), help="Mes a cerrar (yyyy-mm)")
+    parser.add_argument("--simular", action="store_true", help="No agrega las comisiones pendientes a la hoja")
+    parser.add_argument("--salida", help="Archivo CSV, XLSX o Parquet con el resumen del mes")
+    args = parser.parse_args(argv)
+
+    # Validar todo antes de tocar la hoja: un error después de agregar_filas dejaría el cierre a medias
+    try:
+        datetime.strptime(args.mes, "%Y-%m")
+    except ValueError:
+        parser.error(f"Mes inválido: {args.mes} (use yyyy-mm)")
+    if args.salida:
+        formato = os.path.splitext(args.salida)[1].lstrip(".").lower()
+        if formato not in FORMATOS:
+            parser.error(f"Extensión no soportada: {formato} (use {', '.join(FORMATOS)})")
+        directorio = os.path.dirname(os.path.abspath(args.salida))
+        if not os.path.isdir(directorio) or not os.access(directorio, os.W_OK):
+            parser.error(f"No se puede escribir en el directorio de salida: {directorio}")
+
+    spreadsheet = abrir_libro()
+    df_polizas = leer_hoja(spreadsheet, "Polizas")
+    df_cobranza = leer_hoja(spreadsheet, "Cobranza")
+    df_comisiones = leer_hoja(spreadsheet, HOJA_COMISIONES, COLUMNAS_COMISIONES)
+
+    pendientes = comisiones_pendientes(df_cobranza, df_polizas, df_comisiones)
+    print(f"Recibos pagados sin comisión registrada: {len(pendientes)}")
+    if not pendientes.empty and not args.simular:
+        agregar_filas(spreadsheet, HOJA_COMISIONES, pendientes)
+        CacheCompartido().publicar([HOJA_COMISIONES])
+    df_comisiones = pd.concat([df_comisiones, pendientes], ignore_index=True)
+
+    resumen = resumir_comisiones(df_comisiones, args.mes)
+    if resumen.empty:
+        print(f"Sin comisiones en {args.mes}")
+    else:
+        print(resumen.to_string(index=False))
+
+    if args.salida:
+        with open(args.salida, "wb") as destino:
+            exportar(resumen, destino, formato, nombre_hoja=f"Comisiones {args.mes}")
+        print(f"Resumen exportado a {args.salida}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,256 @@
+"""
+Conciliación bancaria: empareja movimientos de un estado de cuenta (CSV u OFX)
+con los recibos abiertos de Cobranza.
+
+Los candidatos de cada movimiento salen de dos índices construidos una sola
+vez: un índice hash por número de póliza (para referencias que lo incluyen)
+y un índice ordenado por monto en centavos (búsqueda con searchsorted).
+"""
+
+import io
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+from cartera.busqueda import normalizar_texto
+from cartera.cobranza import ESTATUS_ABIERTOS, parsear_fechas_dmy
+from cartera.importacion import parsear_montos
+from cartera.montos import a_centavos
+
+TOLERANCIA_MONTO = 1.0
+DIAS_TOLERANCIA = 15
+PUNTAJE_CONFIRMACION = 2
+COLUMNAS_PAGO = ["Monto Pagado", "Fecha Pago", "Estatus", "Días Atraso", "Comentario"]
+
+# Encabezados reconocidos en estados de cuenta CSV (sin acentos, en minúsculas)
+ENCABEZADOS = {
+    "Fecha": ["fecha", "fecha operacion", "fecha movimiento", "date", "posted date"],
+    "Monto": ["abono", "abonos", "deposito", "depositos", "monto", "importe", "amount", "credit"],
+    "Referencia": ["referencia", "concepto", "descripcion", "description", "memo", "detalle"],
+}
+
+
+def _leer_ofx(contenido):
+    texto = contenido.decode("latin-1")
+    movimientos = []
+    for bloque in re.findall(r"<STMTTRN>(.*?)(?:</STMTTRN>|(?=<STMTTRN>)|</BANKTRANLIST>)", texto, re.S | re.I):
+        campos = dict(
+            (etiqueta.upper(), valor.strip())
+            for etiqueta, valor in re.findall(r"<(\w+)>([^<\r\n]*)", bloque)
+        )
+        movimientos.append({
+            "Fecha": campos.get("DTPOSTED", "")[:8],
+            "Monto": campos.get("TRNAMT", ""),
+            "Referencia": " ".join(filter(None, [campos.get("NAME"), campos.get("MEMO"), campos.get("CHECKNUM")])),
+        })
+    df = pd.DataFrame(movimientos, columns=["Fecha", "Monto", "Referencia"])
+    df["Fecha"] = pd.to_datetime(df["Fecha"], format="%Y%m%d", errors="coerce")
+    return df
+
+
+def _leer_csv(contenido):
+    df = pd.read_csv(io.BytesIO(contenido), sep=None, engine="python", dtype=str, encoding="utf-8-sig")
+    nombres = {normalizar_texto(col).lower(): col for col in df.columns}
+    seleccion = {}
+    for destino, opciones in ENCABEZADOS.items():
+        for opcion in opciones:
+            if opcion in nombres:
+                seleccion[destino] = nombres[opcion]
+                break
+    faltantes = [col for col in ENCABEZADOS if col not in seleccion]
+    if faltantes:
+        raise ValueError(f"No se encontraron columnas para: {', '.join(faltantes)}")
+
+    texto_fecha = df[seleccion["Fecha"]].astype(str).str.strip()
+    fecha = parsear_fechas_dmy(texto_fecha)
+    faltantes = fecha.isna()
+    fecha[faltantes] = pd.to_datetime(texto_fecha[faltantes], errors="coerce", dayfirst=True)
+    return pd.DataFrame({
+        "Fecha": fecha,
+        "Monto": df[seleccion["Monto"]],
+        "Referencia": df[seleccion["Referencia"]].fillna("").astype(str),
+    })
+
+
+def leer_estado_cuenta(archivo, nombre=None):
+    """
+    Lee un estado de cuenta CSV u OFX y deja sólo los abonos.
+
+    Args:
+        archivo: Ruta o archivo subido (con ``read`` y ``name``)
+        nombre: Nombre para deducir el formato si ``archivo`` no lo tiene
+
+    Returns:
+        DataFrame con Fecha (datetime), Monto (float) y Referencia
+    """
+    nombre = nombre or getattr(archivo, "name", archivo)
+    if hasattr(archivo, "read"):
+        contenido = archivo.read()
+    else:
+        with open(archivo, "rb") as f:
+            contenido = f.read()
+
+    extension = os.path.splitext(str(nombre))[1].lower()
+    if extension in (".ofx", ".qfx"):
+        df = _leer_ofx(contenido)
+    elif extension in (".csv", ".txt"):
+        df = _leer_csv(contenido)
+    else:
+        raise ValueError(f"Formato de estado de cuenta no soportado: {extension or nombre}")
+
+    df["Monto"] = parsear_montos(df["Monto"]).astype(float)
+    df = df[df["Fecha"].notna() & (df["Monto"] > 0)]
+    return df.reset_index(drop=True)
+
+
+class IndiceRecibos:
+    """Índices de los recibos abiertos para buscar candidatos por póliza o por monto"""
+
+    def __init__(self, df_cobranza):
+        abiertos = df_cobranza[df_cobranza["Estatus"].isin(ESTATUS_ABIERTOS)] if not df_cobranza.empty else df_cobranza
+        self.indices = abiertos.index.to_numpy()
+        self.polizas = abiertos["No. Póliza"].astype(str).str.strip().to_numpy() if len(abiertos) else np.array([], dtype=object)
+        self.nombres = (
+            abiertos.get("Nombre/Razón Social", pd.Series("", index=abiertos.index)).fillna("").map(normalizar_texto).to_numpy()
+        )
+        self.vencimientos = parsear_fechas_dmy(abiertos["Fecha Vencimiento"]).to_numpy() if len(abiertos) else np.array([], dtype="datetime64[ns]")
+        self.centavos = a_centavos(abiertos["Prima de Recibo"]).fillna(0).to_numpy(dtype="int64")
+
+        # Hash: póliza normalizada -> posiciones
+        self.por_poliza = {}
+        for posicion, poliza in enumerate(self.polizas):
+            self.por_poliza.setdefault(normalizar_texto(poliza).replace(" ", ""), []).append(posicion)
+
+        # Ordenado por monto
+        self.orden_monto = np.argsort(self.centavos, kind="stable")
+        self.centavos_ordenados = self.centavos[self.orden_monto]
+
+    def __len__(self):
+        return len(self.indices)
+
+    def por_monto(self, monto, tolerancia):
+        centavos = int(round(monto * 100))
+        margen = int(round(tolerancia * 100))
+        inicio = np.searchsorted(self.centavos_ordenados, centavos - margen, side="left")
+        fin = np.searchsorted(self.centavos_ordenados, centavos + margen, side="right")
+        return self.orden_monto[inicio:fin]
+
+    def por_referencia(self, referencia):
+        normalizada = normalizar_texto(referencia)
+        tokens = set(normalizada.split()) | {normalizada.replace(" ", "")}
+        posiciones = []
+        for token in tokens:
+            posiciones.extend(self.por_poliza.get(token, []))
+        return posiciones
+
+
+def conciliar(movimientos, df_cobranza, tolerancia_monto=TOLERANCIA_MONTO, dias=DIAS_TOLERANCIA):
+    """
+    Propone a lo más un recibo abierto por movimiento.
+
+    Puntaje: +2 si la referencia contiene el número de póliza, +1 si contiene
+    el nombre del cliente, +1 si el monto coincide y +1 si la fecha cae dentro
+    de ``dias`` del vencimiento. Se exige coincidencia de monto o de póliza.
+    La asignación es voraz por puntaje y cercanía de fecha, sin repetir recibos.
+
+    Returns:
+        DataFrame con una fila por movimiento emparejado (columna "Índice Recibo" = índice en df_cobranza)
+    """
+    columnas = ["Movimiento", "Fecha Movimiento", "Monto Movimiento", "Referencia", "Índice Recibo",
+                "No. Póliza", "Nombre/Razón Social", "Prima de Recibo", "Fecha Vencimiento",
+                "Diferencia Días", "Puntaje"]
+    if movimientos.empty or df_cobranza.empty or "Estatus" not in df_cobranza.columns:
+        return pd.DataFrame(columns=columnas)
+    indice = IndiceRecibos(df_cobranza)
+    if not len(indice):
+        return pd.DataFrame(columns=columnas)
+
+    limite_dias = np.timedelta64(dias, "D")
+    candidatos = []
+    for mov, fecha, monto, referencia in movimientos[["Fecha", "Monto", "Referencia"]].itertuples(name=None):
+        por_poliza = set(indice.por_referencia(referencia))
+        por_monto = set(indice.por_monto(monto, tolerancia_monto).tolist())
+        referencia_normalizada = f" {normalizar_texto(referencia)} "
+        fecha = np.datetime64(fecha)
+        for posicion in por_poliza | por_monto:
+            diferencia = abs(fecha - indice.vencimientos[posicion])
+            cerca = not np.isnat(diferencia) and diferencia <= limite_dias
+            nombre = indice.nombres[posicion]
+            puntaje = (
+                2 * (posicion in por_poliza)
+                + (bool(nombre) and f" {nombre} " in referencia_normalizada)
+                + (posicion in por_monto)
+                + cerca
+            )
+            dias_diferencia = diferencia / np.timedelta64(1, "D") if not np.isnat(diferencia) else np.inf
+            candidatos.append((mov, posicion, puntaje, dias_diferencia))
+
+    if not candidatos:
+        return pd.DataFrame(columns=columnas)
+
+    candidatos = pd.DataFrame(candidatos, columns=["Movimiento", "Posición", "Puntaje", "Diferencia Días"])
+    candidatos = candidatos.sort_values(["Puntaje", "Diferencia Días"], ascending=[False, True], kind="stable")
+
+    # Una sola pasada en orden: cada par se toma si ni el movimiento ni el recibo se usaron ya
+    movimientos_usados, posiciones_usadas, elegidos = set(), set(), []
+    for fila, (mov, posicion) in enumerate(zip(candidatos["Movimiento"].tolist(), candidatos["Posición"].tolist())):
+        if mov in movimientos_usados or posicion in posiciones_usadas:
+            continue
+        movimientos_usados.add(mov)
+        posiciones_usadas.add(posicion)
+        elegidos.append(fila)
+    candidatos = candidatos.iloc[elegidos]
+
+    recibos = df_cobranza.loc[indice.indices[candidatos["Posición"].to_numpy()]]
+    movs = movimientos.loc[candidatos["Movimiento"].to_numpy()]
+    resultado = pd.DataFrame({
+        "Movimiento": candidatos["Movimiento"].to_numpy(),
+        "Fecha Movimiento": movs["Fecha"].dt.strftime("%d/%m/%Y").to_numpy(),
+        "Monto Movimiento": movs["Monto"].to_numpy(),
+        "Referencia": movs["Referencia"].to_numpy(),
+        "Índice Recibo": recibos.index.to_numpy(),
+        "No. Póliza": recibos["No. Póliza"].to_numpy(),
+        "Nombre/Razón Social": recibos.get("Nombre/Razón Social", pd.Series("", index=recibos.index)).to_numpy(),
+        "Prima de Recibo": recibos["Prima de Recibo"].to_numpy(),
+        "Fecha Vencimiento": recibos["Fecha Vencimiento"].to_numpy(),
+        "Diferencia Días": candidatos["Diferencia Días"].replace(np.inf, np.nan).to_numpy(),
+        "Puntaje": candidatos["Puntaje"].to_numpy(),
+    }, columns=columnas)
+    return resultado.sort_values("Movimiento", ignore_index=True)
+
+
+def aplicar_pagos(df_cobranza, coincidencias):
+    """
+    Marca como pagados los recibos de ``coincidencias`` (salida de conciliar()).
+
+    Returns:
+        (df_cobranza, indices): DataFrame actualizado y los índices modificados
+    """
+    if coincidencias.empty:
+        return df_cobranza, []
+
+    indices = coincidencias["Índice Recibo"].tolist()
+    fecha_pago = parsear_fechas_dmy(coincidencias["Fecha Movimiento"])
+    vencimiento = parsear_fechas_dmy(coincidencias["Fecha Vencimiento"])
+    dias_atraso = (fecha_pago - vencimiento).dt.days.clip(lower=0).fillna(0).astype("int64")
+
+    for columna in COLUMNAS_PAGO:
+        if columna not in df_cobranza.columns:
+            df_cobranza[columna] = ""
+        if columna == "Estatus" and isinstance(df_cobranza[columna].dtype, pd.CategoricalDtype):
+            # Conserva el dtype category de tipar_catalogos()
+            if "Pagado" not in df_cobranza[columna].cat.categories:
+                df_cobranza[columna] = df_cobranza[columna].cat.add_categories(["Pagado"])
+        else:
+            df_cobranza[columna] = df_cobranza[columna].astype(object)
+
+    comentario_actual = df_cobranza.loc[indices, "Comentario"].fillna("").astype(str).to_numpy()
+    nota = ("Conciliación bancaria: " + coincidencias["Referencia"].astype(str)).to_numpy()
+    df_cobranza.loc[indices, "Comentario"] = np.where(comentario_actual != "", comentario_actual + " | " + nota, nota)
+    df_cobranza.loc[indices, "Monto Pagado"] = coincidencias["Monto Movimiento"].to_numpy()
+    df_cobranza.loc[indices, "Fecha Pago"] = coincidencias["Fecha Movimiento"].to_numpy()
+    df_cobranza.loc[indices, "Estatus"] = "Pagado"
+    df_cobranza.loc[indices, "Días Atraso"] = dias_atraso.to_numpy()
+    return df_cobranza, indices
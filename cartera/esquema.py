@@ -0,0 +1,122 @@
+"""
+Esquema de las hojas del libro base_polizas_ealc.
+
+Catálogos ``OPCIONES_*`` que usan los formularios, las columnas de cada
+hoja y qué columnas se cargan como categóricas con cada catálogo. Es la
+única fuente de verdad para la app, los importadores y las tareas batch.
+"""
+
+# Opciones
+OPCIONES_PROMOCION = ["Sí", "No"]
+OPCIONES_PRODUCTO = [
+    "AHORRO",
+    "API",
+    "APE",
+    "APC",
+    "AUTO",
+    "DAÑOS",
+    "EDUCACIONAL",
+    "FLOTILLA",
+    "GMMC",
+    "GMMI",
+    "HOGAR",
+    "OV",
+    "PENDIENTE",
+    "PPR",
+    "TEMPORAL",
+    "VG",
+    "VIAJERO",
+    "VPL"
+]
+OPCIONES_PAGO = ["CARGO TDC", "CARGO TDD","PAGO REFERENCIADO", "TRANSFERENCIA"]
+OPCIONES_ASEG = [ "ALLIANZ", "ATLAS", "AXA","BANORTE", "GNP", "HIR", "PREVEM", "QUALITAS", "SKANDIA", "THONA", "ZURICH"]
+OPCIONES_BANCO = ["NINGUNO", "AMERICAN EXPRESS", "BBVA", "BANAMEX", "BANCOMER", "BANREGIO", "HSBC", "SANTANDER"]
+OPCIONES_PERSONA = ["MORAL", "FÍSICA"]
+OPCIONES_MONEDA = ["MXN", "UDIS", "DLLS"]
+OPCIONES_ESTATUS_SEGUIMIENTO = ["Seguimiento", "Descartado", "Convertido"]
+OPCIONES_ESTADO_POLIZA = ["VIGENTE", "CANCELADO", "TERMINADO"]
+OPCIONES_CONCEPTO_OPERACION = [ "Contabilidad","Gasolina", "Impuestos","Papelería","Patrocinio","Pautas Publicitarias", "Promocionales","Promoción de Regalo", "Redes y Mercadotecnia", "Tarjetas"]
+OPCIONES_FORMA_PAGO_OPERACION = ["Efectivo", "TDC", "TDD", "Transferencia"]
+OPCIONES_DEDUCIBLE = ["Sí", "No"]
+OPCIONES_ESTATUS_COBRANZA = ["Pendiente", "Pagado", "Vencido", "Cancelado"]
+OPCIONES_PERIODICIDAD = ["CONTADO", "MENSUAL", "TRIMESTRAL", "SEMESTRAL"]
+OPCIONES_CLAVE_EMISION = ["Emilia Alcocer", "José Carlos Ibarra", "Suemy Alcocer"]
+
+# Columnas de cada hoja
+HOJAS = ["Prospectos", "Polizas", "Cobranza", "Seguimiento", "Operacion"]
+
+COLUMNAS_PROSPECTOS = [
+    "Tipo Persona", "Nombre/Razón Social", "Fecha Nacimiento", "RFC", "Teléfono",
+    "Correo", "Producto", "Fecha Registro", "Fecha Contacto", "Seguimiento",
+    "Representantes Legales", "Referenciador", "Estatus", "Notas", "Dirección"
+]
+COLUMNAS_POLIZAS = [
+    "Tipo Persona", "Nombre/Razón Social", "No. Póliza", "Producto", "Inicio Vigencia",
+    "Fin Vigencia", "RFC", "Forma de Pago", "Banco", "Periodicidad", "Prima Total Emitida",
+    "Prima Neta", "Primer Pago", "Pagos Subsecuentes", "Aseguradora", "% Comisión", "Estado", "Contacto", "Dirección",
+    "Teléfono", "Correo", "Fecha Nacimiento", "Moneda", "Referenciador", "Clave de Emisión", "Promoción"
+]
+COLUMNAS_COBRANZA = [
+    "No. Póliza", "Mes Cobranza", "Prima de Recibo", "Monto Pagado",
+    "Fecha Pago", "Estatus", "Días Atraso", "Fecha Vencimiento", "Nombre/Razón Social", "Días Restantes",
+    "Periodicidad", "Moneda", "Recibo", "Clave de Emisión", "Comentario", "ID_Cobranza"
+]
+COLUMNAS_SEGUIMIENTO = [
+    "Nombre/Razón Social", "Fecha Contacto", "Estatus", "Comentarios", "Fecha Registro"
+]
+COLUMNAS_OPERACION = [
+    "Fecha", "Concepto", "Proveedor", "Monto", "Forma de Pago",
+    "Banco", "Responsable del pago", "Finalidad", "Deducible"
+]
+
+# Libro de comisiones devengadas (una fila por recibo pagado); no forma parte de HOJAS
+HOJA_COMISIONES = "Comisiones"
+COLUMNAS_COMISIONES = [
+    "ID_Cobranza", "No. Póliza", "Recibo", "Clave de Emisión", "Aseguradora", "Moneda", "Mes",
+    "Fecha Pago", "Monto Pagado", "Base Comisión", "% Comisión", "Comisión", "Fecha Registro"
+]
+
+COLUMNAS_POR_HOJA = {
+    "Prospectos": COLUMNAS_PROSPECTOS,
+    "Polizas": COLUMNAS_POLIZAS,
+    "Cobranza": COLUMNAS_COBRANZA,
+    "Seguimiento": COLUMNAS_SEGUIMIENTO,
+    "Operacion": COLUMNAS_OPERACION,
+    HOJA_COMISIONES: COLUMNAS_COMISIONES,
+}
+
+# Columna que identifica cada fila; las escrituras por celda la comparan con Sheets antes de escribir
+CLAVE_POR_HOJA = {
+    "Polizas": "No. Póliza",
+    "Cobranza": "ID_Cobranza",
+}
+
+# Columnas de catálogo por hoja; almacenamiento.leer_hoja las carga como category
+CATALOGOS_POR_HOJA = {
+    # El Estatus de Prospectos es texto libre, no catálogo
+    "Prospectos": {
+        "Tipo Persona": OPCIONES_PERSONA,
+        "Producto": OPCIONES_PRODUCTO,
+    },
+    "Polizas": {
+        "Tipo Persona": OPCIONES_PERSONA,
+        "Producto": OPCIONES_PRODUCTO,
+        "Forma de Pago": OPCIONES_PAGO,
+        "Banco": OPCIONES_BANCO,
+        "Periodicidad": OPCIONES_PERIODICIDAD,
+        "Aseguradora": OPCIONES_ASEG,
+        "Estado": OPCIONES_ESTADO_POLIZA,
+        "Moneda": OPCIONES_MONEDA,
+        "Clave de Emisión": OPCIONES_CLAVE_EMISION,
+        "Promoción": OPCIONES_PROMOCION,
+    },
+    "Cobranza": {
+        "Estatus": OPCIONES_ESTATUS_COBRANZA,
+        "Periodicidad": OPCIONES_PERIODICIDAD,
+        "Moneda": OPCIONES_MONEDA,
+        "Clave de Emisión": OPCIONES_CLAVE_EMISION,
+    },
+    "Seguimiento": {
+        "Estatus": OPCIONES_ESTATUS_SEGUIMIENTO,
+    },
+}
@@ -0,0 +1,168 @@
+"""
+Exportación en bloques de hojas o vistas filtradas a CSV, XLSX o Parquet.
+
+Cada formato se escribe directamente al destino bloque por bloque (CSV en
+texto, XLSX con openpyxl en modo ``write_only`` y Parquet con un
+``ParquetWriter``), sin construir un DataFrame con estilos ni un segundo
+archivo completo en memoria.
+
+Uso:
+    python -m cartera.exportacion Cobranza cobranza.csv
+    python -m cartera.exportacion Cobranza pendientes.xlsx --filtro Estatus=Pendiente --filtro Estatus=Vencido
+    python -m cartera.exportacion Polizas cartera.parquet --filtro Estado=VIGENTE
+"""
+
+import argparse
+import io
+import os
+import sys
+import tempfile
+
+import pandas as pd
+
+TAMANO_BLOQUE = 5000
+MEMORIA_MAXIMA_TEMPORAL = 8 * 1024 * 1024  # Arriba de esto el archivo temporal pasa a disco
+
+FORMATOS = {
+    "csv": {"extension": "csv", "mime": "text/csv"},
+    "xlsx": {"extension": "xlsx", "mime": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"},
+    "parquet": {"extension": "parquet", "mime": "application/vnd.apache.parquet"},
+}
+
+
+def _bloques(df, tamano_bloque):
+    for inicio in range(0, len(df), tamano_bloque):
+        yield df.iloc[inicio:inicio + tamano_bloque]
+
+
+def _exportar_csv(df, destino, tamano_bloque):
+    # utf-8-sig para que Excel abra correctamente los acentos
+    texto = io.TextIOWrapper(destino, encoding="utf-8-sig", newline="")
+    df.iloc[:0].to_csv(texto, index=False)
+    for bloque in _bloques(df, tamano_bloque):
+        bloque.to_csv(texto, index=False, header=False)
+    texto.flush()
+    texto.detach()
+
+
+def _exportar_xlsx(df, destino, tamano_bloque, nombre_hoja):
+    from openpyxl import Workbook
+
+    libro = Workbook(write_only=True)
+    hoja = libro.create_sheet(title=nombre_hoja[:31])
+    hoja.append([str(col) for col in df.columns])
+    for bloque in _bloques(df, tamano_bloque):
+        # openpyxl no acepta NaN ni tipos de NumPy
+        valores = bloque.astype(object).where(bloque.notna(), None)
+        for fila in valores.itertuples(index=False, name=None):
+            hoja.append(fila)
+    libro.save(destino)
+
+
+def _exportar_parquet(df, destino, tamano_bloque):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError("La exportación a Parquet requiere pyarrow")
+
+    # Las hojas traen columnas con tipos mezclados; se exportan como texto
+    texto = [col for col in df.columns if df[col].dtype == object]
+    esquema = None
+    escritor = None
+    try:
+        for bloque in _bloques(df, tamano_bloque):
+            bloque = bloque.astype({col: str for col in texto})
+            tabla = pa.Table.from_pandas(bloque, schema=esquema, preserve_index=False)
+            if escritor is None:
+                esquema = tabla.schema
+                escritor = pq.ParquetWriter(destino, esquema)
+            escritor.write_table(tabla)
+        if escritor is None:
+            pq.write_table(pa.Table.from_pandas(df.astype({col: str for col in texto}), preserve_index=False), destino)
+    finally:
+        if escritor is not None:
+            escritor.close()
+
+
+def exportar(df, destino, formato, nombre_hoja="Datos", tamano_bloque=TAMANO_BLOQUE):
+    """
+    Escribe ``df`` en ``destino`` (archivo binario abierto) en el formato indicado.
+
+    Args:
+        df: Vista a exportar, con las columnas ya seleccionadas
+        destino: Objeto binario con ``write`` (archivo, BytesIO, temporal)
+        formato: "csv", "xlsx" o "parquet"
+        nombre_hoja: Nombre de la hoja para XLSX
+        tamano_bloque: Filas por bloque
+    """
+    if formato == "csv":
+        _exportar_csv(df, destino, tamano_bloque)
+    elif formato == "xlsx":
+        _exportar_xlsx(df, destino, tamano_bloque, nombre_hoja)
+    elif formato == "parquet":
+        _exportar_parquet(df, destino, tamano_bloque)
+    else:
+        raise ValueError(f"Formato de exportación desconocido: {formato}")
+
+
+def exportar_a_temporal(df, formato, nombre_hoja="Datos", tamano_bloque=TAMANO_BLOQUE):
+    """Exporta a un archivo temporal (en memoria hasta 8 MB, luego en disco) ya rebobinado"""
+    temporal = tempfile.SpooledTemporaryFile(max_size=MEMORIA_MAXIMA_TEMPORAL)
+    exportar(df, temporal, formato, nombre_hoja=nombre_hoja, tamano_bloque=tamano_bloque)
+    temporal.seek(0)
+    return temporal
+
+
+def filtrar(df, filtros):
+    """
+    Aplica filtros de igualdad por columna.
+
+    Args:
+        filtros: dict {columna: [valores aceptados]}; la comparación es como texto
+    """
+    mascara = pd.Series(True, index=df.index)
+    for columna, valores in filtros.items():
+        if columna not in df.columns:
+            raise ValueError(f"La columna '{columna}' no existe")
+        mascara &= df[columna].astype(str).str.strip().isin([str(v).strip() for v in valores])
+    return df[mascara]
+
+
+def _parsear_filtros(filtros):
+    resultado = {}
+    for filtro in filtros or []:
+        columna, _, valor = filtro.partition("=")
+        if not valor:
+            raise ValueError(f"Filtro inválido '{filtro}', use Columna=Valor")
+        resultado.setdefault(columna.strip(), []).append(valor)
+    return resultado
+
+
+def main(argv=None):
+    from cartera.almacenamiento import abrir_libro, leer_hoja
+
+    parser = argparse.ArgumentParser(description="Exporta una hoja (o parte de ella) a CSV, XLSX o Parquet")
+    parser.add_argument("hoja", help="Nombre de la hoja, p. ej. Polizas o Cobranza")
+    parser.add_argument("salida", help="Archivo destino; el formato se toma de la extensión")
+    parser.add_argument("--filtro", action="append", help="Columna=Valor (repetible; mismos campos se combinan con OR)")
+    parser.add_argument("--columnas", help="Lista de columnas separadas por coma")
+    args = parser.parse_args(argv)
+
+    formato = os.path.splitext(args.salida)[1].lstrip(".").lower()
+    if formato not in FORMATOS:
+        parser.error(f"Extensión no soportada: {formato} (use {', '.join(FORMATOS)})")
+
+    df = leer_hoja(abrir_libro(), args.hoja)
+    df = filtrar(df, _parsear_filtros(args.filtro))
+    if args.columnas:
+        df = df[[col.strip() for col in args.columnas.split(",")]]
+
+    with open(args.salida, "wb") as destino:
+        exportar(df, destino, formato, nombre_hoja=args.hoja)
+    print(f"{len(df)} filas exportadas a {args.salida}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,309 @@
+"""
+Importación masiva de pólizas y recibos de cobranza desde CSV o Excel.
+
+La validación se hace sobre el archivo completo con operaciones
+vectorizadas (fechas, montos, catálogos ``OPCIONES_*`` y duplicados de
+No. Póliza); las filas aceptadas se agregan a la hoja con una sola
+llamada ``append_rows`` y las rechazadas se devuelven con sus errores.
+
+Uso:
+    python -m cartera.importacion polizas cartera_agencia.xlsx
+    python -m cartera.importacion cobranza recibos.csv --reporte rechazos.csv
+    python -m cartera.importacion polizas cartera.csv --simular
+"""
+
+import argparse
+import os
+import sys
+from datetime import datetime
+
+import pandas as pd
+
+from cartera.esquema import CATALOGOS_POR_HOJA, COLUMNAS_POLIZAS, COLUMNAS_COBRANZA
+
+PATRON_FECHA = r"^\d{1,2}/\d{1,2}/\d{4}$"
+PATRON_FECHA_ISO = r"^\d{4}-\d{2}-\d{2}"
+
+OBLIGATORIAS_POLIZAS = [
+    "No. Póliza", "Nombre/Razón Social", "Inicio Vigencia", "Fin Vigencia",
+    "Periodicidad", "Moneda", "Primer Pago", "Aseguradora", "Estado"
+]
+OBLIGATORIAS_COBRANZA = [
+    "No. Póliza", "Recibo", "Fecha Vencimiento", "Prima de Recibo", "Estatus"
+]
+
+CATALOGOS_POLIZAS = CATALOGOS_POR_HOJA["Polizas"]
+CATALOGOS_COBRANZA = CATALOGOS_POR_HOJA["Cobranza"]
+MONTOS_POLIZAS = ["Prima Total Emitida", "Prima Neta", "Primer Pago", "Pagos Subsecuentes", "% Comisión"]
+MONTOS_COBRANZA = ["Prima de Recibo", "Monto Pagado"]
+
+
+def leer_archivo(archivo, nombre=None):
+    """Lee un CSV o Excel como texto, con encabezados y celdas sin espacios sobrantes"""
+    nombre = (nombre or getattr(archivo, "name", None) or str(archivo)).lower()
+    if nombre.endswith((".xlsx", ".xlsm", ".xls")):
+        df = pd.read_excel(archivo, dtype=str)
+    else:
+        df = pd.read_csv(archivo, dtype=str, keep_default_na=False, encoding="utf-8-sig")
+
+    df.columns = [str(col).strip() for col in df.columns]
+    df = df.fillna("").astype(str)
+    for col in df.columns:
+        df[col] = df[col].str.strip()
+    return df
+
+
+def parsear_fechas(serie):
+    """Convierte una columna dd/mm/yyyy (o ISO de Excel) a datetime; NaT si no es válida"""
+    texto = serie.astype(str).str.strip()
+    dmy = pd.to_datetime(texto.where(texto.str.match(PATRON_FECHA)), format="%d/%m/%Y", errors="coerce")
+    iso = pd.to_datetime(texto.where(texto.str.match(PATRON_FECHA_ISO)).str[:10], format="%Y-%m-%d", errors="coerce")
+    return dmy.fillna(iso)
+
+
+def parsear_montos(serie):
+    """Convierte montos como "$1,234.50" a float; NaN si no es un número"""
+    limpio = serie.astype(str).str.replace(r"[$,\s]", "", regex=True)
+    return pd.to_numeric(limpio, errors="coerce")
+
+
+def claves_recibo(serie):
+    """Número de recibo como texto entero (1, 1.0 y "1" -> "1"); el texto original si no es un entero"""
+    texto = serie.astype(str).str.strip()
+    numero = pd.to_numeric(texto, errors="coerce")
+    entero = numero.where(numero % 1 == 0)
+    return entero.astype("Int64").astype(str).where(entero.notna(), texto)
+
+
+def normalizar_catalogo(serie, opciones):
+    """Mapea cada valor a su forma canónica en ``opciones`` sin importar mayúsculas; NaN si no existe"""
+    mapa = {str(opcion).strip().upper(): opcion for opcion in opciones}
+    return serie.astype(str).str.strip().str.upper().map(mapa)
+
+
+def columnas_desconocidas(df, tipo):
+    """Columnas del archivo que no pertenecen a la hoja destino (se ignoran al importar)"""
+    conocidas = COLUMNAS_POLIZAS if tipo == "polizas" else COLUMNAS_COBRANZA
+    return [col for col in df.columns if col not in conocidas]
+
+
+class _Errores:
+    """Acumula mensajes de error por fila a partir de máscaras booleanas"""
+
+    def __init__(self, index):
+        self.mensajes = pd.Series("", index=index, dtype=object)
+
+    def agregar(self, mascara, mensaje):
+        mascara = mascara.fillna(False).astype(bool)
+        self.mensajes = self.mensajes.mask(mascara, self.mensajes + mensaje + "; ")
+
+    def rechazadas(self):
+        return self.mensajes != ""
+
+
+def _validar_obligatorias(df, obligatorias):
+    faltantes = [col for col in obligatorias if col not in df.columns]
+    if faltantes:
+        raise ValueError(f"Faltan columnas obligatorias: {', '.join(faltantes)}")
+
+
+def _validar_comunes(df, errores, obligatorias, catalogos, montos, fechas_obligatorias, fechas_opcionales):
+    """Reglas compartidas por pólizas y recibos; normaliza ``df`` en sitio"""
+    for col in obligatorias:
+        errores.agregar(df[col] == "", f"{col} es obligatorio")
+
+    for col in fechas_obligatorias + fechas_opcionales:
+        if col not in df.columns:
+            continue
+        fechas = parsear_fechas(df[col])
+        errores.agregar((df[col] != "") & fechas.isna(), f"{col}: use dd/mm/yyyy")
+        df[col] = fechas.dt.strftime("%d/%m/%Y").fillna(df[col])
+
+    for col in montos:
+        if col not in df.columns:
+            continue
+        valores = parsear_montos(df[col])
+        errores.agregar((df[col] != "") & valores.isna(), f"{col} debe ser un número válido")
+        errores.agregar(valores < 0, f"{col} no puede ser negativo")
+        df[col] = valores.where(df[col] != "", "")
+
+    for col, opciones in catalogos.items():
+        if col not in df.columns:
+            continue
+        canonicos = normalizar_catalogo(df[col], opciones)
+        errores.agregar((df[col] != "") & canonicos.isna(), f"{col} no está en el catálogo")
+        df[col] = canonicos.fillna(df[col])
+
+
+def _separar(df, errores, columnas):
+    rechazadas = errores.rechazadas()
+    aceptadas = df.loc[~rechazadas, [col for col in columnas if col in df.columns]].reset_index(drop=True)
+    reporte = df.loc[rechazadas].copy()
+    # Fila 1 es el encabezado en el archivo original
+    reporte.insert(0, "Fila", reporte.index + 2)
+    reporte.insert(1, "Errores", errores.mensajes[rechazadas].str.rstrip("; "))
+    return aceptadas, reporte.reset_index(drop=True)
+
+
+def validar_polizas(df, df_polizas):
+    """
+    Valida un lote de pólizas contra los catálogos y las pólizas existentes.
+
+    Args:
+        df: DataFrame leído con ``leer_archivo``
+        df_polizas: Pólizas ya registradas (para detectar duplicados)
+
+    Returns:
+        (aceptadas, rechazadas): filas normalizadas listas para agregar y
+        reporte de rechazos con columnas "Fila" y "Errores"
+    """
+    _validar_obligatorias(df, OBLIGATORIAS_POLIZAS)
+    df = df.copy()
+    errores = _Errores(df.index)
+
+    _validar_comunes(
+        df, errores, OBLIGATORIAS_POLIZAS, CATALOGOS_POLIZAS, MONTOS_POLIZAS,
+        fechas_obligatorias=["Inicio Vigencia", "Fin Vigencia"],
+        fechas_opcionales=["Fecha Nacimiento"]
+    )
+
+    inicio = parsear_fechas(df["Inicio Vigencia"])
+    fin = parsear_fechas(df["Fin Vigencia"])
+    errores.agregar(fin < inicio, "Fin Vigencia es anterior a Inicio Vigencia")
+
+    no_poliza = df["No. Póliza"].str.strip()
+    existentes = set()
+    if not df_polizas.empty and "No. Póliza" in df_polizas.columns:
+        existentes = set(df_polizas["No. Póliza"].astype(str).str.strip())
+    errores.agregar(no_poliza.isin(existentes), "No. Póliza ya existe")
+    errores.agregar((no_poliza != "") & no_poliza.duplicated(keep=False), "No. Póliza duplicado en el archivo")
+
+    return _separar(df, errores, COLUMNAS_POLIZAS)
+
+
+def validar_cobranza(df, df_polizas, df_cobranza, hoy=None):
+    """
+    Valida un lote de recibos y completa los campos derivados de la póliza.
+
+    Args:
+        df: DataFrame leído con ``leer_archivo``
+        df_polizas: Pólizas registradas (cada recibo debe pertenecer a una)
+        df_cobranza: Recibos ya registrados (para detectar duplicados)
+        hoy: Fecha de referencia para Días Restantes/Días Atraso
+
+    Returns:
+        (aceptadas, rechazadas) igual que ``validar_polizas``
+    """
+    _validar_obligatorias(df, OBLIGATORIAS_COBRANZA)
+    df = df.copy()
+    errores = _Errores(df.index)
+    hoy = pd.Timestamp((hoy or datetime.now()).date())
+
+    _validar_comunes(
+        df, errores, OBLIGATORIAS_COBRANZA, CATALOGOS_COBRANZA, MONTOS_COBRANZA,
+        fechas_obligatorias=["Fecha Vencimiento"],
+        fechas_opcionales=["Fecha Pago"]
+    )
+
+    recibo = pd.to_numeric(df["Recibo"], errors="coerce")
+    recibo = recibo.where((recibo > 0) & (recibo % 1 == 0))
+    errores.agregar((df["Recibo"] != "") & recibo.isna(), "Recibo debe ser un entero positivo")
+    df["Recibo"] = recibo.astype("Int64").astype(object).where(recibo.notna(), df["Recibo"])
+
+    if "Fecha Pago" in df.columns:
+        errores.agregar((df["Estatus"] == "Pagado") & (df["Fecha Pago"] == ""), "Un recibo Pagado requiere Fecha Pago")
+
+    # Completar con los datos de la póliza mediante un índice por No. Póliza
+    no_poliza = df["No. Póliza"].str.strip()
+    df["No. Póliza"] = no_poliza
+    if not df_polizas.empty and "No. Póliza" in df_polizas.columns:
+        polizas = df_polizas.assign(**{"No. Póliza": df_polizas["No. Póliza"].astype(str).str.strip()})
+        polizas = polizas.drop_duplicates("No. Póliza", keep="last").set_index("No. Póliza")
+    else:
+        polizas = pd.DataFrame(index=pd.Index([], name="No. Póliza"))
+    errores.agregar((no_poliza != "") & ~no_poliza.isin(polizas.index), "No. Póliza no existe en Polizas")
+
+    for col in ["Nombre/Razón Social", "Moneda", "Periodicidad", "Clave de Emisión"]:
+        desde_poliza = no_poliza.map(polizas[col]) if col in polizas.columns else pd.Series("", index=df.index)
+        actual = df[col] if col in df.columns else pd.Series("", index=df.index)
+        df[col] = actual.where(actual != "", desde_poliza.fillna(""))
+
+    # Ambos lados con el mismo formato de recibo: una columna numerizada como float daría "1.0"
+    id_cobranza = no_poliza + "_R" + claves_recibo(df["Recibo"])
+    existentes = set()
+    if not df_cobranza.empty and {"No. Póliza", "Recibo"}.issubset(df_cobranza.columns):
+        existentes = set(
+            df_cobranza["No. Póliza"].astype(str).str.strip() + "_R" + claves_recibo(df_cobranza["Recibo"])
+        )
+    errores.agregar(id_cobranza.isin(existentes), "El recibo ya existe en Cobranza")
+    errores.agregar(id_cobranza.duplicated(keep=False), "Recibo duplicado en el archivo")
+
+    vencimiento = parsear_fechas(df["Fecha Vencimiento"])
+    dias_restantes = (vencimiento - hoy).dt.days
+    abierto = df["Estatus"].isin(["Pendiente", "Vencido"])
+    df["ID_Cobranza"] = id_cobranza
+    df["Mes Cobranza"] = vencimiento.dt.strftime("%m/%Y").fillna("")
+    df["Días Restantes"] = dias_restantes.where(abierto, 0)
+    df["Días Atraso"] = (-dias_restantes).clip(lower=0).where(abierto, 0)
+    if "Monto Pagado" not in df.columns:
+        df["Monto Pagado"] = 0
+    df["Monto Pagado"] = df["Monto Pagado"].replace("", 0)
+    for col in ["Fecha Pago", "Comentario"]:
+        if col not in df.columns:
+            df[col] = ""
+
+    return _separar(df, errores, COLUMNAS_COBRANZA)
+
+
+def validar(tipo, df, df_polizas, df_cobranza):
+    """Despacha la validación según el tipo de importación ("polizas" o "cobranza")"""
+    if tipo == "polizas":
+        return validar_polizas(df, df_polizas)
+    if tipo == "cobranza":
+        return validar_cobranza(df, df_polizas, df_cobranza)
+    raise ValueError(f"Tipo de importación desconocido: {tipo}")
+
+
+HOJA_DESTINO = {"polizas": "Polizas", "cobranza": "Cobranza"}
+
+
+def main(argv=None):
+    from cartera.almacenamiento import abrir_libro, agregar_filas, leer_hoja
+    from cartera.cache_compartido import CacheCompartido
+
+    parser = argparse.ArgumentParser(description="Importación masiva de pólizas o recibos")
+    parser.add_argument("tipo", choices=sorted(HOJA_DESTINO))
+    parser.add_argument("archivo", help="CSV o Excel con encabezados iguales a la hoja destino")
+    parser.add_argument("--reporte", help="CSV de filas rechazadas (por defecto <archivo>_rechazos.csv)")
+    parser.add_argument("--simular", action="store_true", help="Sólo valida, no escribe en Sheets")
+    args = parser.parse_args(argv)
+
+    df = leer_archivo(args.archivo)
+    ignoradas = columnas_desconocidas(df, args.tipo)
+    if ignoradas:
+        print(f"Columnas ignoradas: {', '.join(ignoradas)}")
+
+    spreadsheet = abrir_libro()
+    df_polizas = leer_hoja(spreadsheet, "Polizas", COLUMNAS_POLIZAS)
+    df_cobranza = leer_hoja(spreadsheet, "Cobranza", COLUMNAS_COBRANZA) if args.tipo == "cobranza" else pd.DataFrame()
+
+    aceptadas, rechazadas = validar(args.tipo, df, df_polizas, df_cobranza)
+    print(f"Filas aceptadas: {len(aceptadas)} | rechazadas: {len(rechazadas)}")
+
+    if not rechazadas.empty:
+        ruta_reporte = args.reporte or f"{os.path.splitext(args.archivo)[0]}_rechazos.csv"
+        rechazadas.to_csv(ruta_reporte, index=False, encoding="utf-8-sig")
+        print(f"Reporte de rechazos: {ruta_reporte}")
+
+    if args.simular or aceptadas.empty:
+        return 0
+
+    hoja = HOJA_DESTINO[args.tipo]
+    agregadas = agregar_filas(spreadsheet, hoja, aceptadas)
+    CacheCompartido().publicar([hoja])
+    print(f"{agregadas} filas agregadas a '{hoja}'")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,237 @@
+"""
+Trazas de tiempo por ejecución de la app y conteo de llamadas a Google Sheets.
+
+Una traza cubre una ejecución completa del script (un rerun). Dentro de
+ella, ``span`` registra tramos con nombre, duración y las llamadas a la
+API de Sheets hechas durante el tramo. Las llamadas se cuentan en
+ClienteHTTPInstrumentado, el cliente HTTP que usa ``autorizar``, así que
+cualquier método de gspread queda incluido (bytes enviados y recibidos).
+El mismo cliente alimenta las métricas de cartera.metricas y reintenta las
+respuestas 429 (cuota agotada) con espera exponencial acotada a ESPERA_TOTAL_CUOTA.
+
+La traza activa vive en un ContextVar: cada sesión de Streamlit corre en
+su propio hilo y los tramos no se mezclan entre sesiones. Fuera de una
+traza (CLIs, tareas batch) ``span`` no hace nada.
+
+RegistroTrazas conserva las últimas trazas en memoria para el panel de
+administración y las agrega a una bitácora JSON lines para análisis
+fuera de línea.
+"""
+
+import contextvars
+import functools
+import json
+import os
+import random
+import re
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+from urllib.parse import unquote, urlparse
+
+from gspread.exceptions import APIError
+from gspread.http_client import HTTPClient
+
+from cartera.cache_compartido import DIRECTORIO_PRIVADO, preparar_archivo_privado
+from cartera.metricas import DURACION_EJECUCION, LATENCIA_SHEETS, LLAMADAS_SHEETS, REINTENTOS_429
+
+RUTA_BITACORA = os.environ.get(
+    "RIZKORA_TRAZAS",
+    os.path.join(DIRECTORIO_PRIVADO, "trazas.jsonl")
+)
+TRAZAS_EN_MEMORIA = 50
+TAMAÑO_MAXIMO_BITACORA = 10 * 1024 * 1024  # Al rebasarlo se rota a <ruta>.1
+REINTENTOS_CUOTA = 5
+ESPERA_MAXIMA_CUOTA = 8  # Segundos por reintento
+ESPERA_TOTAL_CUOTA = 15  # Segundos por llamada; después se entrega el error para no congelar la ejecución
+
+_traza_actual = contextvars.ContextVar("traza_actual", default=None)
+
+
+class Traza:
+    """Tramos y contadores de una ejecución"""
+
+    def __init__(self, nombre, **atributos):
+        self.nombre = nombre
+        self.atributos = atributos
+        self.fecha = datetime.now().isoformat(timespec="seconds")
+        self.spans = []
+        self.llamadas = 0
+        self.bytes_enviados = 0
+        self.bytes_recibidos = 0
+        self.duracion_ms = None
+        self._inicio = time.perf_counter()
+        self._profundidad = 0
+
+    def a_dict(self):
+        return {
+            "fecha": self.fecha,
+            "nombre": self.nombre,
+            **self.atributos,
+            "duracion_ms": self.duracion_ms,
+            "llamadas": self.llamadas,
+            "bytes_enviados": self.bytes_enviados,
+            "bytes_recibidos": self.bytes_recibidos,
+            "spans": self.spans,
+        }
+
+
+def traza_actual():
+    return _traza_actual.get()
+
+
+@contextmanager
+def span(nombre, **atributos):
+    """
+    Cronometra un tramo de la traza activa.
+
+    Entrega el dict del tramo para agregar atributos al vuelo (por ejemplo
+    si un dato vino de caché). Las excepciones se registran y se relanzan.
+    """
+    traza = _traza_actual.get()
+    if traza is None:
+        yield {}
+        return
+
+    registro = {
+        "nombre": nombre,
+        "profundidad": traza._profundidad,
+        "inicio_ms": round((time.perf_counter() - traza._inicio) * 1000, 1),
+        **atributos,
+    }
+    traza.spans.append(registro)
+    llamadas, enviados, recibidos = traza.llamadas, traza.bytes_enviados, traza.bytes_recibidos
+    traza._profundidad += 1
+    inicio = time.perf_counter()
+    try:
+        yield registro
+    except BaseException as e:
+        registro["error"] = type(e).__name__
+        raise
+    finally:
+        traza._profundidad -= 1
+        registro["duracion_ms"] = round((time.perf_counter() - inicio) * 1000, 1)
+        registro["llamadas"] = traza.llamadas - llamadas
+        registro["bytes"] = (traza.bytes_enviados - enviados) + (traza.bytes_recibidos - recibidos)
+
+
+def trazado(funcion):
+    """Decorador: cada llamada a ``funcion`` es un tramo con su nombre"""
+    @functools.wraps(funcion)
+    def envoltura(*args, **kwargs):
+        with span(funcion.__name__):
+            return funcion(*args, **kwargs)
+    return envoltura
+
+
+def _recurso(endpoint):
+    """Parte de la URL después del id del libro ("/values/'Cobranza'", ":batchUpdate"...)"""
+    ruta = unquote(urlparse(endpoint).path)
+    return re.sub(r"^.*/spreadsheets/[^/:]+", "", ruta) or "/"
+
+
+def _hoja(endpoint, json_body=None):
+    """Título de la hoja a la que va la llamada ("" para metadatos del libro)"""
+    ruta = unquote(urlparse(endpoint).path)
+    rango = ruta.split("/values/", 1)[1] if "/values/" in ruta else ""
+    if not rango and json_body and json_body.get("data"):
+        rango = json_body["data"][0].get("range", "")
+    titulo = re.match(r"'((?:[^']|'')+)'|([^!:]+)", rango)
+    if titulo is None:
+        return ""
+    return titulo.group(1).replace("''", "'") if titulo.group(1) is not None else titulo.group(2)
+
+
+def _tamaño_solicitud(data=None, json_body=None):
+    if data is not None:
+        return len(data)
+    if json_body is not None:
+        return len(json.dumps(json_body, ensure_ascii=False).encode("utf-8"))
+    return 0
+
+
+class ClienteHTTPInstrumentado(HTTPClient):
+    """HTTPClient de gspread que registra cada llamada como tramo de la traza activa"""
+
+    def request(self, method, endpoint, params=None, data=None, json=None, files=None, headers=None):
+        hoja = _hoja(endpoint, json)
+        tipo = "lectura" if method.upper() == "GET" else "escritura"
+        esperado = 0.0
+        for intento in range(REINTENTOS_CUOTA + 1):
+            try:
+                return self._llamada(method, endpoint, hoja, tipo, params, data, json, files, headers)
+            except APIError as e:
+                espera = min(2 ** intento, ESPERA_MAXIMA_CUOTA) + random.random()
+                if e.code != 429 or intento == REINTENTOS_CUOTA or esperado + espera > ESPERA_TOTAL_CUOTA:
+                    raise
+                REINTENTOS_429.incrementar(hoja=hoja)
+                esperado += espera
+                time.sleep(espera)
+
+    def _llamada(self, method, endpoint, hoja, tipo, params, data, json, files, headers):
+        traza = _traza_actual.get()
+        inicio = time.perf_counter()
+        estado = "error"
+        with span(f"sheets {method.upper()}", recurso=_recurso(endpoint)) as registro:
+            if traza is not None:
+                traza.llamadas += 1
+                traza.bytes_enviados += _tamaño_solicitud(data, json)
+            try:
+                respuesta = super().request(
+                    method, endpoint, params=params, data=data, json=json, files=files, headers=headers
+                )
+                estado = str(respuesta.status_code)
+            except APIError as e:
+                estado = str(e.code)
+                raise
+            finally:
+                LLAMADAS_SHEETS.incrementar(hoja=hoja, tipo=tipo, estado=estado)
+                LATENCIA_SHEETS.observar(time.perf_counter() - inicio, hoja=hoja, tipo=tipo)
+                registro["estado"] = estado
+            if traza is not None:
+                traza.bytes_recibidos += len(respuesta.content)
+            return respuesta
+
+
+class RegistroTrazas:
+    """Últimas trazas en memoria y bitácora JSON lines (compartido por las sesiones del proceso)"""
+
+    def __init__(self, ruta=None, maximo=TRAZAS_EN_MEMORIA):
+        self.ruta = ruta or RUTA_BITACORA
+        self.trazas = deque(maxlen=maximo)
+        self._candado = threading.Lock()
+
+    @contextmanager
+    def traza(self, nombre, **atributos):
+        """Activa una traza nueva mientras dura el bloque y la registra al terminar"""
+        traza = Traza(nombre, **atributos)
+        token = _traza_actual.set(traza)
+        try:
+            yield traza
+        finally:
+            _traza_actual.reset(token)
+            traza.duracion_ms = round((time.perf_counter() - traza._inicio) * 1000, 1)
+            DURACION_EJECUCION.observar(traza.duracion_ms / 1000, seccion=traza.nombre)
+            self.registrar(traza)
+
+    def registrar(self, traza):
+        linea = json.dumps(traza.a_dict(), ensure_ascii=False, default=str)
+        with self._candado:
+            self.trazas.append(traza)
+            try:
+                if os.path.exists(self.ruta) and os.path.getsize(self.ruta) > TAMAÑO_MAXIMO_BITACORA:
+                    os.replace(self.ruta, self.ruta + ".1")
+                # Mismo directorio privado y verificación de dueño que la caché compartida
+                preparar_archivo_privado(self.ruta)
+                with open(self.ruta, "a", encoding="utf-8") as f:
+                    f.write(linea + "\n")
+            except OSError:
+                # La bitácora es auxiliar; sin disco escribible (o con una ruta ajena) se conservan las trazas en memoria
+                pass
+
+    def ultimas(self, n=TRAZAS_EN_MEMORIA):
+        """Las ``n`` trazas más recientes, la más nueva primero"""
+        with self._candado:
+            return list(self.trazas)[::-1][:n]
@@ -0,0 +1,196 @@
+"""
+Métricas estilo Prometheus para alertar sobre cuota y latencia de Sheets.
+
+Contadores e histogramas con etiquetas en un registro por proceso, que se
+exponen en el formato de texto de Prometheus de dos maneras:
+
+- archivo: ``escribir_archivo`` lo reescribe de forma atómica (para el
+  textfile collector de node_exporter); la app lo hace al final de cada
+  ejecución si RIZKORA_METRICAS_ARCHIVO está definida. Cada réplica
+  necesita su propio archivo: la ruta admite ``{host}`` y ``{pid}``, que
+  se reemplazan por el nombre del host y el PID del proceso;
+- HTTP: ``servir`` levanta /metrics en un hilo; la app lo inicia una vez
+  por proceso si RIZKORA_METRICAS_PUERTO está definida. El endpoint no
+  tiene autenticación, así que escucha sólo en 127.0.0.1 salvo que
+  RIZKORA_METRICAS_DIRECCION indique otra interfaz (p. ej. 0.0.0.0).
+
+Cada réplica expone sólo sus propios valores; la suma entre réplicas se
+hace en Prometheus.
+"""
+
+import os
+import socket
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PUERTO = os.environ.get("RIZKORA_METRICAS_PUERTO")
+DIRECCION = os.environ.get("RIZKORA_METRICAS_DIRECCION", "127.0.0.1")
+
+CUBETAS_LATENCIA = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+CUBETAS_FILAS = (1, 10, 100, 1000, 10000, 100000)
+CUBETAS_EJECUCION = (0.1, 0.25, 0.5, 1, 2, 5, 10, 30)
+
+
+def _ruta_replica(ruta):
+    """Reemplaza {host} y {pid} en la ruta del archivo de métricas"""
+    if not ruta:
+        return ruta
+    return ruta.replace("{host}", socket.gethostname()).replace("{pid}", str(os.getpid()))
+
+
+RUTA_ARCHIVO = _ruta_replica(os.environ.get("RIZKORA_METRICAS_ARCHIVO"))
+
+
+def _escapar(valor):
+    return str(valor).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _formatear(numero):
+    if numero == float("inf"):
+        return "+Inf"
+    return repr(float(numero)) if isinstance(numero, float) and not numero.is_integer() else str(int(numero))
+
+
+class _Metrica:
+    tipo = None
+
+    def __init__(self, nombre, ayuda, etiquetas=()):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = tuple(etiquetas)
+        self._valores = {}
+        self._candado = threading.Lock()
+
+    def _clave(self, etiquetas):
+        if set(etiquetas) != set(self.etiquetas):
+            raise ValueError(f"{self.nombre} espera las etiquetas {', '.join(self.etiquetas)}")
+        return tuple(str(etiquetas[nombre]) for nombre in self.etiquetas)
+
+    def _etiquetas_texto(self, clave, extra=None):
+        pares = list(zip(self.etiquetas, clave)) + ([extra] if extra else [])
+        if not pares:
+            return ""
+        return "{" + ",".join(f'{nombre}="{_escapar(valor)}"' for nombre, valor in pares) + "}"
+
+    def exposicion(self):
+        lineas = [f"# HELP {self.nombre} {self.ayuda}", f"# TYPE {self.nombre} {self.tipo}"]
+        with self._candado:
+            valores = sorted(self._valores.items())
+        for clave, valor in valores:
+            lineas.extend(self._lineas(clave, valor))
+        return lineas
+
+
+class Contador(_Metrica):
+    tipo = "counter"
+
+    def incrementar(self, cantidad=1, **etiquetas):
+        clave = self._clave(etiquetas)
+        with self._candado:
+            self._valores[clave] = self._valores.get(clave, 0) + cantidad
+
+    def valor(self, **etiquetas):
+        with self._candado:
+            return self._valores.get(self._clave(etiquetas), 0)
+
+    def _lineas(self, clave, valor):
+        return [f"{self.nombre}{self._etiquetas_texto(clave)} {_formatear(valor)}"]
+
+
+class Histograma(_Metrica):
+    tipo = "histogram"
+
+    def __init__(self, nombre, ayuda, etiquetas=(), cubetas=CUBETAS_LATENCIA):
+        super().__init__(nombre, ayuda, etiquetas)
+        self.cubetas = tuple(sorted(cubetas)) + (float("inf"),)
+
+    def observar(self, valor, **etiquetas):
+        clave = self._clave(etiquetas)
+        with self._candado:
+            conteos, suma = self._valores.get(clave, ([0] * len(self.cubetas), 0))
+            for i, limite in enumerate(self.cubetas):
+                if valor <= limite:
+                    conteos[i] += 1
+            self._valores[clave] = (conteos, suma + valor)
+
+    def _lineas(self, clave, valor):
+        conteos, suma = valor
+        lineas = [
+            f"{self.nombre}_bucket{self._etiquetas_texto(clave, ('le', _formatear(limite)))} {conteo}"
+            for limite, conteo in zip(self.cubetas, conteos)
+        ]
+        lineas.append(f"{self.nombre}_sum{self._etiquetas_texto(clave)} {_formatear(suma)}")
+        lineas.append(f"{self.nombre}_count{self._etiquetas_texto(clave)} {conteos[-1]}")
+        return lineas
+
+
+class RegistroMetricas:
+    """Conjunto de métricas de un proceso"""
+
+    def __init__(self):
+        self.metricas = {}
+
+    def _agregar(self, metrica):
+        if metrica.nombre in self.metricas:
+            raise ValueError(f"La métrica {metrica.nombre} ya está registrada")
+        self.metricas[metrica.nombre] = metrica
+        return metrica
+
+    def contador(self, nombre, ayuda, etiquetas=()):
+        return self._agregar(Contador(nombre, ayuda, etiquetas))
+
+    def histograma(self, nombre, ayuda, etiquetas=(), cubetas=CUBETAS_LATENCIA):
+        return self._agregar(Histograma(nombre, ayuda, etiquetas, cubetas))
+
+    def exposicion(self):
+        """Todas las métricas en formato de texto de Prometheus"""
+        lineas = []
+        for metrica in self.metricas.values():
+            lineas.extend(metrica.exposicion())
+        return "\n".join(lineas) + "\n"
+
+
+REGISTRO = RegistroMetricas()
+
+LLAMADAS_SHEETS = REGISTRO.contador(
+    "rizkora_sheets_llamadas_total", "Llamadas a la API de Google Sheets", ("hoja", "tipo", "estado"))
+LATENCIA_SHEETS = REGISTRO.histograma(
+    "rizkora_sheets_latencia_segundos", "Duración de las llamadas a la API de Google Sheets", ("hoja", "tipo"))
+REINTENTOS_429 = REGISTRO.contador(
+    "rizkora_sheets_reintentos_429_total", "Reintentos por respuesta 429 (cuota de Sheets agotada)", ("hoja",))
+CONSULTAS_CACHE = REGISTRO.contador(
+    "rizkora_cache_consultas_total", "Consultas a los cachés de carga de datos", ("cache", "resultado"))
+FILAS_ESCRITAS = REGISTRO.histograma(
+    "rizkora_filas_escritas", "Filas escritas por guardado", ("hoja", "modo"), CUBETAS_FILAS)
+DURACION_EJECUCION = REGISTRO.histograma(
+    "rizkora_ejecucion_segundos", "Duración de cada ejecución de la app por sección", ("seccion",), CUBETAS_EJECUCION)
+
+
+def escribir_archivo(ruta, registro=REGISTRO):
+    """Reescribe ``ruta`` con la exposición actual (vía archivo temporal y os.replace)"""
+    temporal = f"{ruta}.{os.getpid()}.tmp"
+    with open(temporal, "w", encoding="utf-8") as f:
+        f.write(registro.exposicion())
+    os.replace(temporal, ruta)
+
+
+def servir(puerto, direccion=None, registro=REGISTRO):
+    """Expone GET /metrics en un hilo daemon (en DIRECCION si no se indica ``direccion``); devuelve el servidor"""
+    class Manejador(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] not in ("/", "/metrics"):
+                self.send_error(404)
+                return
+            cuerpo = registro.exposicion().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(cuerpo)))
+            self.end_headers()
+            self.wfile.write(cuerpo)
+
+        def log_message(self, *args):
+            pass
+
+    servidor = ThreadingHTTPServer((direccion or DIRECCION, int(puerto)), Manejador)
+    threading.Thread(target=servidor.serve_forever, daemon=True, name="metricas").start()
+    return servidor
@@ -0,0 +1,72 @@
+"""
+Montos de punto fijo: centavos en int64.
+
+Las hojas guardan los montos como texto ("$1,234.50", "1234.5") o como
+número si gspread los numerizó. ``a_centavos`` convierte una columna
+completa a centavos Int64 (str.replace + to_numeric, sin llamadas de
+Python por celda) y ``formatear_centavos`` hace lo inverso para mostrar.
+El texto se lee como float y se redondea al centavo con ``np.rint``; para
+montos con dos decimales y menos de 2**53 centavos ese redondeo es exacto.
+Sumas, comisiones y conciliaciones se hacen sobre los enteros, así que son
+exactas; sólo se pasa a pesos (``a_pesos``) al escribir o graficar.
+"""
+
+import numpy as np
+import pandas as pd
+
+CARACTERES_NO_NUMERICOS = r"[$,\s]"
+
+
+def a_centavos(serie):
+    """Montos ("$1,234.50", 1234.5, "") a centavos Int64; <NA> si no es un número"""
+    if not isinstance(serie, pd.Series):
+        serie = pd.Series(serie)
+    if pd.api.types.is_numeric_dtype(serie):
+        numeros = serie.astype(float)
+    else:
+        limpio = serie.astype(str).str.replace(CARACTERES_NO_NUMERICOS, "", regex=True)
+        numeros = pd.to_numeric(limpio, errors="coerce")
+    centavos = np.rint(numeros.to_numpy(dtype=float) * 100)
+    return pd.Series(centavos, index=serie.index).astype("Int64")
+
+
+def monto_a_centavos(valor):
+    """a_centavos() para un solo valor (campos de formulario); None si no es un número"""
+    centavos = a_centavos(pd.Series([valor], dtype=object)).iloc[0]
+    return None if pd.isna(centavos) else int(centavos)
+
+
+def a_pesos(centavos):
+    """Centavos a float en pesos (NaN donde no hay monto)"""
+    if isinstance(centavos, pd.Series):
+        return centavos.astype("Float64").astype(float) / 100
+    return np.asarray(centavos, dtype=float) / 100
+
+
+def formatear_centavos(centavos, simbolo="", vacio="0.00"):
+    """
+    Centavos a texto "1,234.50" (con ``simbolo`` antes del número) para toda la columna.
+
+    Args:
+        vacio: Texto para los <NA>; None los deja como NaN
+    """
+    nulos = centavos.isna().to_numpy()
+    valores = centavos.fillna(0).to_numpy(dtype="int64")
+    absolutos = np.abs(valores)
+    enteros = pd.Series(absolutos // 100, index=centavos.index).astype(str)
+    enteros = enteros.str.replace(r"\B(?=(\d{3})+$)", ",", regex=True)
+    decimales = pd.Series(absolutos % 100, index=centavos.index).astype(str).str.zfill(2)
+    signo = pd.Series(np.where(valores < 0, "-", ""), index=centavos.index)
+    texto = (signo + simbolo + enteros + "." + decimales).astype(object)
+    texto[nulos] = vacio if vacio is not None else np.nan
+    return texto
+
+
+def formatear_montos(serie, simbolo="", vacio="0.00"):
+    """Montos de una hoja (texto o número) formateados como "1,234.50" tras redondearlos al centavo"""
+    return formatear_centavos(a_centavos(serie), simbolo=simbolo, vacio=vacio)
+
+
+def formatear_monto(valor, simbolo="", vacio="0.00"):
+    """formatear_montos() para un solo valor (tarjetas y descripciones)"""
+    return formatear_montos(pd.Series([valor], dtype=object), simbolo=simbolo, vacio=vacio).iloc[0]
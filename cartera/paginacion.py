@@ -0,0 +1,66 @@
+"""
+Paginación del lado del servidor para tablas grandes.
+
+El filtro, el orden y el corte se resuelven sobre el DataFrame completo y
+a la interfaz sólo llega la página visible, así que lo que se envía al
+navegador no crece con el número de filas de la hoja.
+"""
+
+import numpy as np
+import pandas as pd
+
+from cartera.cobranza import parsear_fechas_dmy
+
+TAMAÑOS_PAGINA = [25, 50, 100, 250]
+TAMAÑO_POR_DEFECTO = 50
+
+
+def clave_orden(serie):
+    """
+    Valores para ordenar una columna de la hoja: números si todo lo capturado
+    es numérico (admite "$1,234.50"), fechas si todo es dd/mm/yyyy y, si no,
+    el texto en minúsculas.
+    """
+    if pd.api.types.is_numeric_dtype(serie) or pd.api.types.is_datetime64_any_dtype(serie):
+        return serie
+    texto = serie.fillna("").astype(str).str.strip()
+    capturados = texto != ""
+    if not capturados.any():
+        return texto
+    numeros = pd.to_numeric(texto.str.replace(r"[,$\s]", "", regex=True), errors="coerce")
+    if numeros[capturados].notna().all():
+        return numeros
+    fechas = parsear_fechas_dmy(texto)
+    if fechas[capturados].notna().all():
+        return fechas
+    return texto.str.lower().where(capturados)
+
+
+def filtrar_ordenar(df, filtro="", orden=None, ascendente=True):
+    """
+    Filas de ``df`` que contienen ``filtro`` en alguna columna (sin distinguir
+    mayúsculas), ordenadas por la columna ``orden`` con los vacíos al final.
+    """
+    filtro = str(filtro or "").strip().lower()
+    if filtro and not df.empty:
+        mascara = np.zeros(len(df), dtype=bool)
+        for columna in df.columns:
+            mascara |= df[columna].astype(str).str.lower().str.contains(filtro, regex=False, na=False).to_numpy()
+        df = df[mascara]
+
+    if orden in df.columns and len(df) > 1:
+        clave = clave_orden(df[orden]).reset_index(drop=True)
+        posiciones = clave.sort_values(ascending=ascendente, kind="stable", na_position="last").index
+        df = df.iloc[posiciones.to_numpy()]
+    return df
+
+
+def total_paginas(filas, tamaño=TAMAÑO_POR_DEFECTO):
+    return max(1, -(-filas // tamaño))
+
+
+def cortar_pagina(df, pagina=1, tamaño=TAMAÑO_POR_DEFECTO):
+    """Página ``pagina`` (desde 1, ajustada al rango válido) de ``df``"""
+    pagina = min(max(int(pagina), 1), total_paginas(len(df), tamaño))
+    inicio = (pagina - 1) * tamaño
+    return df.iloc[inicio:inicio + tamaño]
@@ -0,0 +1,88 @@
+"""
+Pronóstico de flujo de cobranza: primas esperadas por mes, moneda y aseguradora.
+
+Usa el mismo programa de recibos que calcular_cobranza (periodicidad,
+Primer Pago / Pagos Subsecuentes, máximo MAX_RECIBOS) pero evaluado con
+NumPy para todas las pólizas vigentes a la vez.
+"""
+
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from cartera.cobranza import ESTATUS_CERRADOS, MAX_RECIBOS, programa_recibos
+from cartera.montos import a_pesos
+
+HORIZONTE_POR_DEFECTO = 12
+
+
+def _mes_absoluto(fechas):
+    return fechas.dt.year.to_numpy(dtype="int64") * 12 + fechas.dt.month.to_numpy(dtype="int64") - 1
+
+
+def pronosticar_cobranza(df_polizas, meses=HORIZONTE_POR_DEFECTO, desde=None, df_cobranza=None, tipos_cambio=None):
+    """
+    Primas esperadas de las pólizas vigentes en los próximos ``meses`` meses.
+
+    Args:
+        df_polizas: DataFrame de pólizas
+        meses: Horizonte en meses, comenzando en el mes de ``desde``
+        desde: Fecha de inicio del pronóstico; por defecto hoy
+        df_cobranza: Si se indica, se excluyen los recibos ya pagados o cancelados
+        tipos_cambio: TablaTiposCambio opcional; agrega "Monto MXN" con la última tasa disponible
+
+    Returns:
+        DataFrame con Mes (yyyy-mm), Moneda, Aseguradora, Recibos y Monto (+ "Monto MXN")
+    """
+    columnas = ["Mes", "Moneda", "Aseguradora", "Recibos", "Monto"]
+    programa = programa_recibos(df_polizas)
+    if programa.empty or meses <= 0:
+        return pd.DataFrame(columns=columnas)
+
+    inicio_pronostico = pd.Timestamp(desde or datetime.now())
+    mes_base = inicio_pronostico.year * 12 + inicio_pronostico.month - 1
+
+    # k = meses transcurridos desde el primer recibo; hay recibo si k es múltiplo de la periodicidad
+    k = (mes_base + np.arange(meses))[None, :] - _mes_absoluto(programa["Inicio"])[:, None]
+    paso = programa["Meses"].to_numpy()[:, None]
+    recibo = k // paso + 1
+    vence = (k >= 0) & (k % paso == 0) & (recibo <= MAX_RECIBOS)
+
+    if df_cobranza is not None and not df_cobranza.empty and {"Estatus", "Recibo"} <= set(df_cobranza.columns):
+        cerrados = df_cobranza[df_cobranza["Estatus"].isin(ESTATUS_CERRADOS)]
+        fila = pd.Index(programa["No. Póliza"]).get_indexer(cerrados["No. Póliza"].astype(str).str.strip())
+        num_recibo = pd.to_numeric(cerrados["Recibo"], errors="coerce").to_numpy()
+        validos = (fila >= 0) & ~np.isnan(num_recibo)
+        claves_cerradas = fila[validos] * (MAX_RECIBOS + 1) + num_recibo[validos].astype("int64")
+        claves = np.arange(len(programa))[:, None] * (MAX_RECIBOS + 1) + recibo
+        vence &= ~np.isin(claves, claves_cerradas)
+
+    filas, columnas_mes = np.nonzero(vence)
+    montos = np.where(
+        recibo[filas, columnas_mes] == 1,
+        programa["Primer Pago"].to_numpy()[filas],
+        programa["Pagos Subsecuentes"].to_numpy()[filas],
+    )
+
+    codigos, grupos = pd.factorize(pd.MultiIndex.from_frame(programa[["Moneda", "Aseguradora"]]))
+    celda = codigos[filas] * meses + columnas_mes
+    total_celdas = len(grupos) * meses
+    recibos = np.bincount(celda, minlength=total_celdas)
+    # Los pesos son centavos enteros: la suma en float64 es exacta hasta 2**53
+    centavos = np.bincount(celda, weights=montos, minlength=total_celdas)
+
+    con_datos = np.nonzero(recibos)[0]
+    grupo, mes = np.divmod(con_datos, meses)
+    etiquetas_mes = pd.period_range(inicio_pronostico.to_period("M"), periods=meses, freq="M").strftime("%Y-%m")
+    resultado = pd.DataFrame({
+        "Mes": np.asarray(etiquetas_mes)[mes],
+        "Moneda": grupos.get_level_values(0)[grupo],
+        "Aseguradora": grupos.get_level_values(1)[grupo],
+        "Recibos": recibos[con_datos],
+        "Monto": a_pesos(centavos[con_datos]),
+    }, columns=columnas).sort_values(["Mes", "Moneda", "Aseguradora"], ignore_index=True)
+    if tipos_cambio is not None:
+        # Las tasas futuras no se conocen: se usa la más reciente
+        resultado["Monto MXN"] = tipos_cambio.a_mxn(resultado["Monto"], resultado["Moneda"])
+    return resultado
@@ -0,0 +1,147 @@
+"""
+Registros compactos de pólizas y recibos para cuando se necesita un objeto por fila.
+
+Poliza y Recibo son dataclasses con ``__slots__``: sin ``__dict__`` por
+instancia y con acceso por atributo, en lugar de filas de pandas (cada una
+con su propio índice) o dicts de 16 llaves. Se construyen en bloque con
+``desde_dataframe`` (una conversión por columna y un solo zip) y vuelven a
+la forma de la hoja con ``a_dataframe``. Los montos se guardan en centavos
+(cartera.montos) y ``indice`` es la etiqueta de la fila de origen, para
+escribir de regreso con ``df.loc``.
+"""
+
+from dataclasses import dataclass
+from typing import ClassVar
+
+import pandas as pd
+
+from cartera.montos import a_centavos, a_pesos
+
+
+def _columna(df, columna, montos):
+    if columna not in df.columns:
+        return [0] * len(df) if montos else [""] * len(df)
+    if montos:
+        return a_centavos(df[columna]).fillna(0).to_numpy(dtype="int64").tolist()
+    serie = df[columna].astype(object)
+    return serie.where(serie.notna(), "").tolist()
+
+
+class _Registro:
+    """Conversión en bloque entre DataFrame y registros; COLUMNAS mapea campo -> columna de la hoja"""
+
+    __slots__ = ()
+    COLUMNAS = {}
+    MONTOS = ()
+
+    @classmethod
+    def desde_dataframe(cls, df):
+        columnas = [_columna(df, columna, campo in cls.MONTOS) for campo, columna in cls.COLUMNAS.items()]
+        return [cls(indice, *valores) for indice, *valores in zip(df.index.tolist(), *columnas)]
+
+    @classmethod
+    def a_dataframe(cls, registros):
+        datos = {
+            columna: [getattr(registro, campo) for registro in registros]
+            for campo, columna in cls.COLUMNAS.items()
+        }
+        for campo in cls.MONTOS:
+            datos[cls.COLUMNAS[campo]] = a_pesos(datos[cls.COLUMNAS[campo]])
+        return pd.DataFrame(datos, index=[registro.indice for registro in registros], columns=list(cls.COLUMNAS.values()))
+
+    def a_dict(self):
+        """Fila con los nombres de columna de la hoja (montos en pesos)"""
+        return {
+            columna: getattr(self, campo) / 100 if campo in self.MONTOS else getattr(self, campo)
+            for campo, columna in self.COLUMNAS.items()
+        }
+
+
+@dataclass(slots=True)
+class Recibo(_Registro):
+    indice: object
+    no_poliza: str
+    recibo: object
+    nombre: str
+    mes_cobranza: str
+    fecha_vencimiento: str
+    prima_recibo: int
+    monto_pagado: int
+    fecha_pago: str
+    estatus: str
+    dias_atraso: object
+    periodicidad: str
+    moneda: str
+    clave_emision: str
+    comentario: str
+    id_cobranza: str
+
+    COLUMNAS: ClassVar[dict] = {
+        "no_poliza": "No. Póliza",
+        "recibo": "Recibo",
+        "nombre": "Nombre/Razón Social",
+        "mes_cobranza": "Mes Cobranza",
+        "fecha_vencimiento": "Fecha Vencimiento",
+        "prima_recibo": "Prima de Recibo",
+        "monto_pagado": "Monto Pagado",
+        "fecha_pago": "Fecha Pago",
+        "estatus": "Estatus",
+        "dias_atraso": "Días Atraso",
+        "periodicidad": "Periodicidad",
+        "moneda": "Moneda",
+        "clave_emision": "Clave de Emisión",
+        "comentario": "Comentario",
+        "id_cobranza": "ID_Cobranza",
+    }
+    MONTOS: ClassVar[tuple] = ("prima_recibo", "monto_pagado")
+
+    def __post_init__(self):
+        if not self.id_cobranza:
+            self.id_cobranza = f"{self.no_poliza}_R{self.recibo}"
+
+
+@dataclass(slots=True)
+class Poliza(_Registro):
+    indice: object
+    no_poliza: str
+    nombre: str
+    producto: str
+    aseguradora: str
+    estado: str
+    inicio_vigencia: str
+    fin_vigencia: str
+    periodicidad: str
+    forma_pago: str
+    moneda: str
+    prima_total_emitida: int
+    prima_neta: int
+    primer_pago: int
+    pagos_subsecuentes: int
+    comision: object
+    clave_emision: str
+    contacto: str
+    telefono: str
+    correo: str
+
+    COLUMNAS: ClassVar[dict] = {
+        "no_poliza": "No. Póliza",
+        "nombre": "Nombre/Razón Social",
+        "producto": "Producto",
+        "aseguradora": "Aseguradora",
+        "estado": "Estado",
+        "inicio_vigencia": "Inicio Vigencia",
+        "fin_vigencia": "Fin Vigencia",
+        "periodicidad": "Periodicidad",
+        "forma_pago": "Forma de Pago",
+        "moneda": "Moneda",
+        "prima_total_emitida": "Prima Total Emitida",
+        "prima_neta": "Prima Neta",
+        "primer_pago": "Primer Pago",
+        "pagos_subsecuentes": "Pagos Subsecuentes",
+        "comision": "% Comisión",
+        "clave_emision": "Clave de Emisión",
+        "contacto": "Contacto",
+        "telefono": "Teléfono",
+        "correo": "Correo",
+    }
+    MONTOS: ClassVar[tuple] = ("prima_total_emitida", "prima_neta", "primer_pago", "pagos_subsecuentes")
@@ -0,0 +1,147 @@
+"""
+Índice de vencimientos de pólizas vigentes para consultar ventanas de renovación.
+
+Las fechas de Fin Vigencia se convierten una sola vez y se guardan
+ordenadas; cualquier ventana de días (0–30, 45–60, 90–120, ...) es un
+corte con searchsorted.
+"""
+
+import numpy as np
+import pandas as pd
+
+# Formatos que se han capturado en Fin Vigencia; al final se intenta con dayfirst
+FORMATOS_FIN_VIGENCIA = ("%d/%m/%Y", "%Y-%m-%d", "%d-%m-%Y", "%m/%d/%Y", "%Y/%m/%d")
+
+VENTANAS = {
+    "0–30 días": (0, 30),
+    "45–60 días": (45, 60),
+    "90–120 días": (90, 120),
+}
+VENTANA_POR_DEFECTO = "45–60 días"
+
+
+def parsear_fin_vigencia(serie):
+    """Convierte Fin Vigencia a datetime64 probando cada formato sólo en lo que aún no se pudo leer"""
+    texto = serie.fillna("").astype(str).str.strip()
+    fechas = pd.Series(pd.NaT, index=serie.index, dtype="datetime64[ns]")
+    for formato in FORMATOS_FIN_VIGENCIA:
+        faltantes = fechas.isna() & (texto != "")
+        if not faltantes.any():
+            return fechas
+        fechas[faltantes] = pd.to_datetime(texto[faltantes], format=formato, errors="coerce")
+    faltantes = fechas.isna() & (texto != "")
+    if faltantes.any():
+        fechas[faltantes] = pd.to_datetime(texto[faltantes], dayfirst=True, errors="coerce", format="mixed")
+    return fechas
+
+
+def _hoy(hoy):
+    return np.datetime64(pd.Timestamp(hoy).normalize() if hoy is not None else pd.Timestamp.now().normalize(), "D")
+
+
+class IndiceVencimientos:
+    """Pólizas vigentes ordenadas por Fin Vigencia"""
+
+    def __init__(self, df_polizas):
+        if df_polizas.empty or "Fin Vigencia" not in df_polizas.columns:
+            self.polizas = df_polizas.iloc[0:0].assign(Fin_Vigencia_Date=pd.Series(dtype="datetime64[ns]"))
+            self.fechas = np.array([], dtype="datetime64[D]")
+            return
+
+        fin_vigencia = parsear_fin_vigencia(df_polizas["Fin Vigencia"])
+        vigentes = fin_vigencia.notna()
+        if "Estado" in df_polizas.columns:
+            vigentes &= df_polizas["Estado"] == "VIGENTE"
+
+        polizas = df_polizas[vigentes].assign(Fin_Vigencia_Date=fin_vigencia[vigentes])
+        self.polizas = polizas.sort_values("Fin_Vigencia_Date", kind="stable").reset_index(drop=True)
+        self.fechas = self.polizas["Fin_Vigencia_Date"].to_numpy(dtype="datetime64[D]")
+
+    def __len__(self):
+        return len(self.fechas)
+
+    def _posiciones(self, desde_dias, hasta_dias, hoy):
+        hoy = _hoy(hoy)
+        inicio = 0 if desde_dias is None else np.searchsorted(self.fechas, hoy + np.timedelta64(desde_dias, "D"), side="left")
+        fin = len(self.fechas) if hasta_dias is None else np.searchsorted(self.fechas, hoy + np.timedelta64(hasta_dias, "D"), side="right")
+        return inicio, max(inicio, fin)
+
+    def contar(self, desde_dias=None, hasta_dias=None, hoy=None):
+        """Pólizas que vencen entre ``desde_dias`` y ``hasta_dias`` días a partir de hoy (None = sin límite)"""
+        inicio, fin = self._posiciones(desde_dias, hasta_dias, hoy)
+        return int(fin - inicio)
+
+    def ventana(self, desde_dias, hasta_dias, hoy=None):
+        """
+        Pólizas que vencen en la ventana, con Fin_Vigencia_Date y Dias_Restantes.
+        """
+        inicio, fin = self._posiciones(desde_dias, hasta_dias, hoy)
+        resultado = self.polizas.iloc[inicio:fin].copy()
+        resultado["Dias_Restantes"] = (self.fechas[inicio:fin] - _hoy(hoy)).astype("int64")
+        return resultado
+
+
+DIMENSIONES_CALENDARIO = ["Clave de Emisión", "Aseguradora", "Producto"]
+FRECUENCIAS_CALENDARIO = {"Semana": "W-SUN", "Mes": "M"}
+
+
+class CalendarioRenovaciones:
+    """
+    Histogramas semanales y mensuales de vencimientos futuros por dimensión.
+
+    Se construye una vez a partir del IndiceVencimientos: como las pólizas ya
+    están ordenadas por fecha, cada periodo es un tramo contiguo y el detalle
+    de un periodo es un corte, sin volver a filtrar.
+    """
+
+    def __init__(self, indice, hoy=None):
+        self.indice = indice
+        hoy = _hoy(hoy)
+        self.histogramas = {}
+        self.tramos = {}
+
+        for nombre, frecuencia in FRECUENCIAS_CALENDARIO.items():
+            inicio_periodo = pd.Timestamp(hoy).to_period(frecuencia).start_time
+            primero = np.searchsorted(indice.fechas, np.datetime64(inicio_periodo, "D"), side="left")
+            polizas = indice.polizas.iloc[primero:]
+            periodos = polizas["Fin_Vigencia_Date"].dt.to_period(frecuencia)
+
+            # Todos los periodos desde el actual hasta el último vencimiento, aunque no tengan pólizas
+            etiquetas = pd.period_range(inicio_periodo, periods=0, freq=frecuencia)
+            if len(polizas):
+                etiquetas = pd.period_range(inicio_periodo, polizas["Fin_Vigencia_Date"].iloc[-1], freq=frecuencia)
+            codigos = np.asarray(periodos.array.asi8 - etiquetas[0].ordinal if len(etiquetas) else [], dtype="int64")
+            nombres_periodo = [self._etiqueta(periodo, nombre) for periodo in etiquetas]
+
+            # Tramo [inicio, fin) de cada periodo dentro del índice ordenado
+            limites = np.searchsorted(codigos, np.arange(len(etiquetas) + 1), side="left") + primero
+            self.tramos[nombre] = {
+                etiqueta: (int(limites[i]), int(limites[i + 1])) for i, etiqueta in enumerate(nombres_periodo)
+            }
+
+            for dimension in DIMENSIONES_CALENDARIO:
+                valores = polizas.get(dimension, pd.Series("", index=polizas.index)).fillna("").astype(str).replace("", "Sin dato")
+                tabla = pd.crosstab(codigos, valores.to_numpy()) if len(polizas) else pd.DataFrame()
+                tabla = tabla.reindex(range(len(etiquetas)), fill_value=0)
+                tabla.index = pd.Index(nombres_periodo, name=nombre)
+                tabla.columns.name = dimension
+                self.histogramas[(nombre, dimension)] = tabla
+
+    @staticmethod
+    def _etiqueta(periodo, frecuencia):
+        if frecuencia == "Semana":
+            return f"{periodo.start_time:%d/%m/%Y} - {periodo.end_time:%d/%m/%Y}"
+        return periodo.strftime("%Y-%m")
+
+    def periodos(self, frecuencia):
+        return list(self.tramos[frecuencia])
+
+    def histograma(self, frecuencia, dimension, periodos=None):
+        """Pólizas por periodo (filas) y valor de la dimensión (columnas); ``periodos`` limita a los primeros N"""
+        tabla = self.histogramas[(frecuencia, dimension)]
+        return tabla if periodos is None else tabla.iloc[:periodos]
+
+    def detalle(self, frecuencia, periodo):
+        """Pólizas que vencen en un periodo del calendario"""
+        inicio, fin = self.tramos[frecuencia].get(periodo, (0, 0))
+        return self.indice.polizas.iloc[inicio:fin]
@@ -0,0 +1,181 @@
+"""
+Tipos de cambio locales (dólar y UDI) para expresar montos en MXN.
+
+Las tasas viven en un CSV versionado junto al código (Fecha, Moneda, Valor
+en MXN por unidad). Cada tasa vale desde su fecha hasta la siguiente de la
+misma moneda; esos intervalos se guardan como arreglos ordenados y la
+conversión de una columna completa se resuelve con searchsorted. El archivo
+se distribuye sin tasas: hasta cargarlas (p. ej. la serie FIX y UDIS de
+Banxico con ``importar``) los montos en DLLS y UDIS quedan fuera de los
+totales en MXN, y tanto la interfaz como este comando lo advierten.
+
+Uso:
+    python -m cartera.tipos_cambio
+    python -m cartera.tipos_cambio agregar DLLS 02/01/2025 20.5148
+    python -m cartera.tipos_cambio importar tasas_banxico.csv
+"""
+
+import argparse
+import hashlib
+import itertools
+import os
+import sys
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+RUTA_POR_DEFECTO = os.environ.get(
+    "RIZKORA_TIPOS_CAMBIO", os.path.join(os.path.dirname(os.path.abspath(__file__)), "tipos_cambio.csv")
+)
+MONEDA_BASE = "MXN"
+COLUMNAS = ["Fecha", "Moneda", "Valor"]
+MONEDAS_CONVERTIBLES = ["DLLS", "UDIS"]
+COMENTARIO = "# Tipos de cambio en MXN por unidad; actualizar con: python -m cartera.tipos_cambio agregar|importar\n"
+
+# Variantes con que se capturan las monedas en las hojas
+ALIAS_MONEDA = {"MXN": "MXN", "PESOS": "MXN", "MN": "MXN", "": "MXN",
+                "DLLS": "DLLS", "USD": "DLLS", "DOLARES": "DLLS", "DÓLARES": "DLLS",
+                "UDIS": "UDIS", "UDI": "UDIS"}
+
+
+def normalizar_moneda(serie):
+    """Mapea las variantes de captura a MXN, DLLS o UDIS; deja las desconocidas tal cual"""
+    texto = serie.fillna("").astype(str).str.strip().str.upper()
+    return texto.map(ALIAS_MONEDA).fillna(texto)
+
+
+def _leer_archivo(ruta):
+    df = pd.read_csv(ruta, dtype=str, comment="#").reindex(columns=COLUMNAS)
+    df["Fecha"] = pd.to_datetime(df["Fecha"].str.strip(), format="%Y-%m-%d", errors="coerce")
+    df["Moneda"] = normalizar_moneda(df["Moneda"])
+    df["Valor"] = pd.to_numeric(df["Valor"], errors="coerce")
+    return df.dropna().sort_values(["Moneda", "Fecha"]).drop_duplicates(["Moneda", "Fecha"], keep="last")
+
+
+class TablaTiposCambio:
+    """Tasas por moneda como intervalos [fecha_i, fecha_i+1) en arreglos ordenados"""
+
+    def __init__(self, tasas, version=""):
+        self.version = version
+        self._fechas = {}
+        self._valores = {}
+        for moneda, grupo in tasas.groupby("Moneda"):
+            self._fechas[moneda] = grupo["Fecha"].to_numpy(dtype="datetime64[D]")
+            self._valores[moneda] = grupo["Valor"].to_numpy(dtype="float64")
+
+    @classmethod
+    def desde_archivo(cls, ruta=None):
+        ruta = ruta or RUTA_POR_DEFECTO
+        if not os.path.exists(ruta):
+            return cls(pd.DataFrame(columns=COLUMNAS), version="")
+        with open(ruta, "rb") as f:
+            version = hashlib.sha1(f.read()).hexdigest()[:12]
+        return cls(_leer_archivo(ruta), version=version)
+
+    @property
+    def monedas(self):
+        return [MONEDA_BASE] + sorted(self._fechas)
+
+    def tasa(self, moneda, fechas):
+        """
+        Valor en MXN de una unidad de ``moneda`` en cada fecha (NaN si no hay tasas de esa moneda).
+
+        Antes de la primera tasa registrada se usa la primera.
+        """
+        fechas = np.asarray(fechas, dtype="datetime64[D]")
+        if moneda == MONEDA_BASE:
+            return np.ones(fechas.shape)
+        if moneda not in self._fechas:
+            return np.full(fechas.shape, np.nan)
+        posicion = np.searchsorted(self._fechas[moneda], fechas, side="right") - 1
+        tasas = self._valores[moneda][np.clip(posicion, 0, None)]
+        return np.where(np.isnat(fechas), self._valores[moneda][-1], tasas)
+
+    def a_mxn(self, montos, monedas, fechas=None):
+        """
+        Convierte una columna de montos a MXN.
+
+        Args:
+            montos: Serie numérica
+            monedas: Serie con la moneda de cada monto
+            fechas: Serie datetime, una fecha única o None (última tasa disponible)
+
+        Returns:
+            Serie float alineada con ``montos``; NaN si la moneda no tiene tasas
+        """
+        montos = pd.to_numeric(montos, errors="coerce").astype(float)
+        monedas = normalizar_moneda(pd.Series(monedas, index=montos.index))
+        if fechas is None:
+            fechas = np.datetime64(datetime.now(), "D")
+        if isinstance(fechas, pd.Series):
+            fechas = fechas.to_numpy(dtype="datetime64[D]")
+        else:
+            fechas = np.full(len(montos), np.datetime64(pd.Timestamp(fechas), "D"))
+
+        codigos, unicas = pd.factorize(monedas)
+        tasas = np.empty(len(montos))
+        for codigo, moneda in enumerate(unicas):
+            seleccion = codigos == codigo
+            tasas[seleccion] = self.tasa(moneda, fechas[seleccion])
+        return montos * tasas
+
+    def monedas_sin_tasa(self, monedas):
+        """Monedas presentes en ``monedas`` que no se pueden convertir"""
+        return sorted(set(normalizar_moneda(pd.Series(monedas))) - set(self.monedas))
+
+
+def _comentarios(ruta):
+    """Líneas ``#`` al inicio del archivo, para conservarlas al reescribirlo"""
+    if not os.path.exists(ruta):
+        return COMENTARIO
+    with open(ruta, encoding="utf-8") as f:
+        return "".join(itertools.takewhile(lambda linea: linea.startswith("#"), f))
+
+
+def _guardar(tasas, ruta):
+    comentarios = _comentarios(ruta)
+    salida = tasas.sort_values(["Fecha", "Moneda"]).copy()
+    salida["Fecha"] = salida["Fecha"].dt.strftime("%Y-%m-%d")
+    with open(ruta, "w", encoding="utf-8", newline="") as f:
+        f.write(comentarios)
+        salida.to_csv(f, index=False, columns=COLUMNAS, lineterminator="\n")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Consulta o actualiza el archivo local de tipos de cambio")
+    parser.add_argument("--archivo", default=RUTA_POR_DEFECTO)
+    sub = parser.add_subparsers(dest="accion")
+    agregar = sub.add_parser("agregar", help="Registra la tasa de una moneda en una fecha")
+    agregar.add_argument("moneda")
+    agregar.add_argument("fecha", help="dd/mm/yyyy")
+    agregar.add_argument("valor", type=float, help="MXN por unidad")
+    importar = sub.add_parser("importar", help="Agrega las tasas de un CSV con columnas Fecha (yyyy-mm-dd), Moneda y Valor")
+    importar.add_argument("csv")
+    args = parser.parse_args(argv)
+
+    tasas = _leer_archivo(args.archivo) if os.path.exists(args.archivo) else pd.DataFrame(columns=COLUMNAS)
+    if args.accion == "agregar":
+        nueva = pd.DataFrame({
+            "Fecha": [datetime.strptime(args.fecha, "%d/%m/%Y")],
+            "Moneda": normalizar_moneda(pd.Series([args.moneda])),
+            "Valor": [args.valor],
+        })
+        tasas = pd.concat([tasas, nueva]).drop_duplicates(["Moneda", "Fecha"], keep="last")
+        _guardar(tasas, args.archivo)
+    elif args.accion == "importar":
+        tasas = pd.concat([tasas, _leer_archivo(args.csv)]).drop_duplicates(["Moneda", "Fecha"], keep="last")
+        _guardar(tasas, args.archivo)
+
+    tabla = TablaTiposCambio.desde_archivo(args.archivo)
+    for moneda in tabla.monedas[1:]:
+        print(f"{moneda}: {len(tabla._fechas[moneda])} tasas, última {tabla._fechas[moneda][-1]} = {tabla._valores[moneda][-1]}")
+    sin_tasa = [moneda for moneda in MONEDAS_CONVERTIBLES if moneda not in tabla.monedas]
+    if sin_tasa:
+        print(f"Sin tasas para: {', '.join(sin_tasa)}; sus montos quedan fuera de los totales en MXN")
+    print(f"Versión: {tabla.version or 'sin archivo'}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -13,38 +13,48 @@ Updated full version with:
 
 import streamlit as st
 import pandas as pd
-import gspread
-from google.oauth2.service_account import Credentials
-from datetime import datetime, timedelta
+from datetime import datetime
 import re
-from dateutil.relativedelta import relativedelta
 import numpy as np
-import io
-import matplotlib.pyplot as plt
 import warnings
-from reportlab.lib.pagesizes import letter
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, Image
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import inch
-from reportlab.lib import colors
 import tempfile
+import os
+import threading
+from cartera.cache_compartido import CacheCompartido
+from cartera.esquema import (
+    OPCIONES_PROMOCION, OPCIONES_PRODUCTO, OPCIONES_PAGO, OPCIONES_ASEG, OPCIONES_BANCO,
+    OPCIONES_PERSONA, OPCIONES_MONEDA, OPCIONES_ESTATUS_SEGUIMIENTO, OPCIONES_ESTADO_POLIZA,
+    OPCIONES_CONCEPTO_OPERACION, OPCIONES_FORMA_PAGO_OPERACION, OPCIONES_DEDUCIBLE,
+    HOJAS, COLUMNAS_PROSPECTOS, COLUMNAS_POLIZAS,
+    COLUMNAS_COBRANZA, COLUMNAS_SEGUIMIENTO, COLUMNAS_OPERACION, COLUMNAS_POR_HOJA, HOJA_COMISIONES, COLUMNAS_COMISIONES,
+    CLAVE_POR_HOJA
+)
+from cartera.almacenamiento import (NOMBRE_LIBRO, autorizar, leer_hoja, reemplazar_hoja, agregar_filas, actualizar_filas,
+                                    admitir_categorias, HojaDesalineada)
+from cartera.cobranza import (cancelar_recibos_polizas, calcular_antiguedad, claves_emision_por_poliza, generar_recibos,
+                              MAX_RECIBOS)
+from cartera.pronostico import pronosticar_cobranza, HORIZONTE_POR_DEFECTO
+from cartera.tipos_cambio import TablaTiposCambio, RUTA_POR_DEFECTO as RUTA_TIPOS_CAMBIO
+from cartera.renovaciones import (IndiceVencimientos, CalendarioRenovaciones, DIMENSIONES_CALENDARIO,
+                                  FRECUENCIAS_CALENDARIO, VENTANAS as VENTANAS_RENOVACION,
+                                  VENTANA_POR_DEFECTO as VENTANA_RENOVACION_POR_DEFECTO)
+from cartera.comisiones import comisiones_pendientes, resumir_comisiones
+from cartera.paginacion import filtrar_ordenar, cortar_pagina, total_paginas, TAMAÑOS_PAGINA, TAMAÑO_POR_DEFECTO
+from cartera.busqueda import IndiceBusqueda, RESULTADOS_POR_DEFECTO
+from cartera.conciliacion import (leer_estado_cuenta, conciliar, aplicar_pagos, COLUMNAS_PAGO,
+                                  DIAS_TOLERANCIA, TOLERANCIA_MONTO, PUNTAJE_CONFIRMACION)
+from cartera.asesoria import (metricas_financieras, grafico_pastel_gastos, grafico_barras_metas, grafico_ahorro,
+                              reporte_excel, reporte_pdf, pyplot)
+from cartera.antiguedad import cubo_antiguedad, resumen_antiguedad, DIMENSIONES as DIMENSIONES_ANTIGUEDAD, RANGOS as RANGOS_ANTIGUEDAD
+from cartera.montos import a_centavos, formatear_centavos, formatear_monto, formatear_montos, monto_a_centavos
+from cartera.registros import Poliza, Recibo
+from cartera.importacion import leer_archivo, columnas_desconocidas, validar as validar_importacion, HOJA_DESTINO
+from cartera.exportacion import FORMATOS as FORMATOS_EXPORTACION, exportar_a_temporal, filtrar as filtrar_exportacion
+from cartera.instrumentacion import RegistroTrazas, span, trazado
+from cartera.metricas import (CONSULTAS_CACHE, PUERTO as PUERTO_METRICAS, RUTA_ARCHIVO as ARCHIVO_METRICAS,
+                              escribir_archivo as escribir_metricas, servir as servir_metricas)
 warnings.filterwarnings('ignore')
 
-# ================================
-# CONFIGURACIÓN DE COLORES Rizkora
-# ================================
-COLORES_AXA = {
-    'azul_principal': '#064c78',      # Mayor uso
-    'verde_oscuro': '#00796b',
-    'verde_agua': '#00bfa5',
-    'azul_claro': '#90caf9',
-    'amarillo': '#fff59d',
-    'gris': '#e0e0e0',
-    'lila': '#b39ddb',
-    'azul_gris': '#7986cb',
-    'morado': '#c95ef5'
-}
-
 # Configuración de la página
 st.set_page_config(
     page_title="Gestor de Cartera Rizkora",
@@ -714,6 +724,7 @@ def login():
                 and password_input == st.secrets["password"]
             ):
                 st.session_state.authenticated = True
+                st.session_state.usuario = usuario_input
                 st.success("Acceso concedido")
                 st.rerun()
             else:
@@ -730,40 +741,6 @@ if st.sidebar.button("Cerrar sesión"):
     st.session_state.authenticated = False
     st.rerun()
 
-# Opciones
-OPCIONES_PROMOCION = ["Sí", "No"]
-OPCIONES_PRODUCTO = [
-    "AHORRO",
-    "API",
-    "APE",
-    "APC",
-    "AUTO",
-    "DAÑOS",
-    "EDUCACIONAL",
-    "FLOTILLA",
-    "GMMC",
-    "GMMI",
-    "HOGAR",
-    "OV",
-    "PENDIENTE",
-    "PPR",
-    "TEMPORAL",
-    "VG",
-    "VIAJERO",
-    "VPL"
-]
-OPCIONES_PAGO = ["CARGO TDC", "CARGO TDD","PAGO REFERENCIADO", "TRANSFERENCIA"]
-OPCIONES_ASEG = [ "ALLIANZ", "ATLAS", "AXA","BANORTE", "GNP", "HIR", "PREVEM", "QUALITAS", "SKANDIA", "THONA", "ZURICH"]
-OPCIONES_BANCO = ["NINGUNO", "AMERICAN EXPRESS", "BBVA", "BANAMEX", "BANCOMER", "BANREGIO", "HSBC", "SANTANDER"]
-OPCIONES_PERSONA = ["MORAL", "FÍSICA"]
-OPCIONES_MONEDA = ["MXN", "UDIS", "DLLS"]
-OPCIONES_ESTATUS_SEGUIMIENTO = ["Seguimiento", "Descartado", "Convertido"]
-OPCIONES_ESTADO_POLIZA = ["VIGENTE", "CANCELADO", "TERMINADO"]
-OPCIONES_CONCEPTO_OPERACION = [ "Contabilidad","Gasolina", "Impuestos","Papelería","Patrocinio","Pautas Publicitarias", "Promocionales","Promoción de Regalo", "Redes y Mercadotecnia", "Tarjetas"]
-OPCIONES_FORMA_PAGO_OPERACION = ["Efectivo", "TDC", "TDD", "Transferencia"]
-OPCIONES_DEDUCIBLE = ["Sí", "No"]
-OPCIONES_ESTATUS_COBRANZA = ["Pendiente", "Pagado", "Vencido", "Cancelado"]
-
 # Función auxiliar para obtener índices de selectbox
 def obtener_indice_selectbox(valor, opciones):
     """Obtiene el índice correcto para selectbox considerando el valor vacío"""
@@ -835,14 +812,7 @@ def init_google_sheets():
             st.error("❌ No se encontró 'google_service_account' en los secrets de Streamlit")
             return None
 
-        creds = Credentials.from_service_account_info(
-            st.secrets["google_service_account"],
-            scopes=["https://www.googleapis.com/auth/spreadsheets",
-                    "https://www.googleapis.com/auth/drive"]
-        )
-
-        client = gspread.authorize(creds)
-        return client
+        return autorizar(dict(st.secrets["google_service_account"]))
 
     except Exception as e:
         st.error(f"❌ Error al autenticar con Google Sheets: {str(e)}")
@@ -857,74 +827,143 @@ if client is None:
 def conectar_google_sheets():
     """Conectar a la hoja base_polizas_ealc"""
     try:
-        spreadsheet = client.open("base_polizas_ealc")
+        spreadsheet = client.open(NOMBRE_LIBRO)
         return spreadsheet
     except Exception as e:
         st.error(f"❌ Error al conectar con la hoja 'base_polizas_ealc': {str(e)}")
         st.info("ℹ️ Asegúrate de que la hoja 'base_polizas_ealc' exista y esté compartida con el service account")
         return None
 
-# Función para cargar datos con cache
-@st.cache_data(ttl=300)
-def cargar_datos():
-    """Cargar datos desde Google Sheets"""
+@st.cache_resource
+def obtener_cache_compartido():
+    """Caché de hojas compartida por todos los workers y sesiones"""
+    return CacheCompartido()
+
+@st.cache_resource
+def obtener_registro_trazas():
+    """Últimas trazas de ejecución de este proceso y bitácora JSON lines"""
+    return RegistroTrazas()
+
+@st.cache_resource
+def iniciar_servidor_metricas():
+    """Servidor /metrics de este proceso si RIZKORA_METRICAS_PUERTO está definida"""
+    if not PUERTO_METRICAS:
+        return None
     try:
+        return servir_metricas(PUERTO_METRICAS)
+    except OSError as e:
+        # Otra réplica en el mismo host ya tiene el puerto
+        st.warning(f"⚠️ No se pudo exponer métricas en el puerto {PUERTO_METRICAS}: {e}")
+        return None
+
+def es_administrador():
+    """El usuario de la sesión está en la lista ``administradores`` de los secrets"""
+    return st.session_state.get("usuario") in st.secrets.get("administradores", [])
+
+def invalidar_cache(hojas=HOJAS):
+    """Publica nuevas revisiones de las hojas para todos los workers y limpia el cache local"""
+    try:
+        obtener_cache_compartido().publicar(hojas)
+    except Exception as e:
+        st.warning(f"⚠️ No se pudo invalidar la caché compartida: {e}")
+    st.cache_data.clear()
+
+def _cache_compartido_opcional():
+    """Caché compartida o None si no se puede abrir (permisos, base bloqueada, volumen no disponible)"""
+    try:
+        return obtener_cache_compartido()
+    except Exception:
+        return None
+
+def leer_hoja_con_cache(nombre_hoja, revision, preparar=None):
+    """
+    Lee una hoja desde la caché compartida y, si no está vigente, desde Google Sheets.
+
+    La caché es opcional: si falla al abrir, leer o escribir, la hoja se lee
+    directo de Sheets en lugar de reemplazarse por un DataFrame vacío.
+    """
+    with span("cargar_datos", hoja=nombre_hoja) as tramo:
+        cache = _cache_compartido_opcional()
+        df = None
+        if cache is not None:
+            try:
+                df = cache.leer(nombre_hoja, revision)
+            except Exception:
+                cache = None
+        if df is not None:
+            tramo["fuente"] = "caché compartida"
+            return df
+
+        tramo["fuente"] = "Google Sheets"
         spreadsheet = conectar_google_sheets()
         if not spreadsheet:
-            return pd.DataFrame(), pd.DataFrame(), pd.DataFrame(), pd.DataFrame(), pd.DataFrame()
+            raise RuntimeError("Sin conexión con Google Sheets")
+        df = leer_hoja(spreadsheet, nombre_hoja, COLUMNAS_POR_HOJA.get(nombre_hoja))
+        if preparar is not None:
+            df = preparar(df)
+        if cache is not None:
+            try:
+                cache.escribir(nombre_hoja, revision, df)
+            except Exception:
+                pass
+        return df
+
+def _preparar_polizas(df_polizas):
+    if not df_polizas.empty and "No. Póliza" in df_polizas.columns:
+        df_polizas["No. Póliza"] = df_polizas["No. Póliza"].astype(str).str.strip()
+    return df_polizas
+
+def firma_datos():
+    """Revisiones vigentes de las hojas; identifica la versión de los datos para los caches derivados"""
+    try:
+        return obtener_cache_compartido().firma(HOJAS)
+    except Exception:
+        # Sin caché compartida se comporta como un cache local por proceso
+        return None
+
+# Función para cargar datos con cache
+_carga_en_curso = threading.local()
+
+def cargar_datos():
+    """Cargar datos desde la caché compartida o Google Sheets según la revisión vigente"""
+    _carga_en_curso.fallo = False
+    datos = _cargar_datos_revision(firma_datos())
+    CONSULTAS_CACHE.incrementar(cache="cargar_datos", resultado="fallo" if _carga_en_curso.fallo else "acierto")
+    return datos
 
+@st.cache_data(ttl=300)
+def _cargar_datos_revision(firma):
+    """Cargar las cinco hojas para una firma de revisiones de la caché compartida"""
+    _carga_en_curso.fallo = True
+    revisiones = dict(zip(HOJAS, firma or (0,) * len(HOJAS)))
+    try:
         # Cargar hojas existentes
         try:
-            worksheet_prospectos = spreadsheet.worksheet("Prospectos")
-            df_prospectos = pd.DataFrame(worksheet_prospectos.get_all_records())
+            df_prospectos = leer_hoja_con_cache("Prospectos", revisiones["Prospectos"])
         except Exception as e:
             st.error(f"❌ Error al cargar hoja 'Prospectos': {e}")
-            df_prospectos = pd.DataFrame(columns=[
-                "Tipo Persona", "Nombre/Razón Social", "Fecha Nacimiento", "RFC", "Teléfono",
-                "Correo", "Producto", "Fecha Registro", "Fecha Contacto", "Seguimiento",
-                "Representantes Legales", "Referenciador", "Estatus", "Notas", "Dirección"
-            ])
+            df_prospectos = pd.DataFrame(columns=COLUMNAS_PROSPECTOS)
 
         try:
-            worksheet_polizas = spreadsheet.worksheet("Polizas")
-            df_polizas = pd.DataFrame(worksheet_polizas.get_all_records())
-            if not df_polizas.empty and "No. Póliza" in df_polizas.columns:
-                df_polizas["No. Póliza"] = df_polizas["No. Póliza"].astype(str).str.strip()
+            df_polizas = leer_hoja_con_cache("Polizas", revisiones["Polizas"], preparar=_preparar_polizas)
         except Exception as e:
             st.error(f"❌ Error al cargar hoja 'Polizas': {e}")
-            df_polizas = pd.DataFrame(columns=[
-                "Tipo Persona", "Nombre/Razón Social", "No. Póliza", "Producto", "Inicio Vigencia",
-                "Fin Vigencia", "RFC", "Forma de Pago", "Banco", "Periodicidad", "Prima Total Emitida",
-                "Prima Neta", "Primer Pago", "Pagos Subsecuentes", "Aseguradora", "% Comisión", "Estado", "Contacto", "Dirección",
-                "Teléfono", "Correo", "Fecha Nacimiento", "Moneda", "Referenciador", "Clave de Emisión"
-            ])
+            df_polizas = pd.DataFrame(columns=COLUMNAS_POLIZAS)
 
         try:
-            worksheet_cobranza = spreadsheet.worksheet("Cobranza")
-            df_cobranza = pd.DataFrame(worksheet_cobranza.get_all_records())
+            df_cobranza = leer_hoja_con_cache("Cobranza", revisiones["Cobranza"])
         except Exception as e:
-            df_cobranza = pd.DataFrame(columns=[
-                "No. Póliza", "Mes Cobranza", "Prima de Recibo", "Monto Pagado",
-                "Fecha Pago", "Estatus", "Días Atraso", "Fecha Vencimiento", "Nombre/Razón Social", "Días Restantes",
-                "Periodicidad", "Moneda", "Recibo", "Clave de Emisión", "Comentario"
-            ])
+            df_cobranza = pd.DataFrame(columns=COLUMNAS_COBRANZA)
  
         try:
-            worksheet_seguimiento = spreadsheet.worksheet("Seguimiento")
-            df_seguimiento = pd.DataFrame(worksheet_seguimiento.get_all_records())
+            df_seguimiento = leer_hoja_con_cache("Seguimiento", revisiones["Seguimiento"])
         except Exception as e:
-            df_seguimiento = pd.DataFrame(columns=[
-                "Nombre/Razón Social", "Fecha Contacto", "Estatus", "Comentarios", "Fecha Registro"
-            ])
+            df_seguimiento = pd.DataFrame(columns=COLUMNAS_SEGUIMIENTO)
 
         try:
-            worksheet_operacion = spreadsheet.worksheet("Operacion")
-            df_operacion = pd.DataFrame(worksheet_operacion.get_all_records())
+            df_operacion = leer_hoja_con_cache("Operacion", revisiones["Operacion"])
         except Exception as e:
-            df_operacion = pd.DataFrame(columns=[
-                "Fecha", "Concepto", "Proveedor", "Monto", "Forma de Pago", 
-                "Banco", "Responsable del pago", "Finalidad", "Deducible"
-            ])
+            df_operacion = pd.DataFrame(columns=COLUMNAS_OPERACION)
  
         return df_prospectos, df_polizas, df_cobranza, df_seguimiento, df_operacion
 
@@ -932,99 +971,88 @@ def cargar_datos():
         st.error(f"Error cargando datos: {e}")
         return pd.DataFrame(), pd.DataFrame(), pd.DataFrame(), pd.DataFrame(), pd.DataFrame()
 
+# TTL igual al de cargar_datos: sin caché compartida la firma es None y no cambia al guardar
+@st.cache_resource(max_entries=4, ttl=300)
+def _indice_busqueda_revision(firma, hoja):
+    """Índice de búsqueda de clientes o prospectos para una versión de los datos"""
+    df_prospectos, df_polizas, _, _, _ = _cargar_datos_revision(firma)
+    return IndiceBusqueda(df_prospectos if hoja == "Prospectos" else df_polizas)
+
+def selector_busqueda(etiqueta, hoja, key, limite=RESULTADOS_POR_DEFECTO):
+    """Selectbox de nombres filtrado por una búsqueda aproximada (nombre, RFC, teléfono, correo o póliza)"""
+    indice = _indice_busqueda_revision(firma_datos(), hoja)
+    consulta = st.text_input(
+        f"Buscar {etiqueta.lower().replace('seleccionar ', '')}",
+        key=f"{key}_consulta",
+        placeholder="Nombre, RFC, teléfono, correo o No. Póliza"
+    ).strip()
+    opciones = indice.buscar(consulta, limite) if consulta else indice.primeros(limite)
+    # Conservar la selección actual aunque ya no esté entre los resultados
+    actual = st.session_state.get(key)
+    if actual and actual not in opciones:
+        opciones = [actual] + opciones
+    if consulta and not opciones:
+        st.caption("Sin coincidencias")
+    return st.selectbox(etiqueta, [""] + opciones, key=key)
+
 # Función para guardar datos (invalida el cache)
 def guardar_datos(df_prospectos=None, df_polizas=None, df_cobranza=None, df_seguimiento=None, df_operacion=None):
     """Guardar datos en Google Sheets e invalidar cache"""
+    por_hoja = {
+        hoja: df for hoja, df in zip(HOJAS, [df_prospectos, df_polizas, df_cobranza, df_seguimiento, df_operacion])
+        if df is not None
+    }
     try:
         spreadsheet = conectar_google_sheets()
         if not spreadsheet:
             return False
 
-        # Actualizar hoja de Prospectos si se proporciona
-        if df_prospectos is not None:
-            try:
-                worksheet_prospectos = spreadsheet.worksheet("Prospectos")
-                worksheet_prospectos.clear()
-                if not df_prospectos.empty:
-                    data = [df_prospectos.columns.values.tolist()] + df_prospectos.fillna('').values.tolist()
-                    worksheet_prospectos.update(data, value_input_option='USER_ENTERED')
-            except Exception as e:
-                st.error(f"❌ Error al actualizar hoja 'Prospectos': {e}")
-                return False
-
-        # Actualizar hoja de Pólizas si se proporciona
-        if df_polizas is not None:
+        for hoja, df in por_hoja.items():
             try:
-                worksheet_polizas = spreadsheet.worksheet("Polizas")
-                worksheet_polizas.clear()
-                if not df_polizas.empty:
-                    data = [df_polizas.columns.values.tolist()] + df_polizas.fillna('').values.tolist()
-                    worksheet_polizas.update(data, value_input_option='USER_ENTERED')
+                with span("guardar_datos", hoja=hoja, filas=len(df)):
+                    reemplazar_hoja(spreadsheet, hoja, df)
             except Exception as e:
-                st.error(f"❌ Error al actualizar hoja 'Polizas': {e}")
+                st.error(f"❌ Error al actualizar hoja '{hoja}': {e}")
                 return False
 
-        # Actualizar hoja de Cobranza si se proporciona
-        if df_cobranza is not None:
-           try:
-              worksheet_cobranza = spreadsheet.worksheet("Cobranza")
-              worksheet_cobranza.clear()
-              if not df_cobranza.empty:
-                  data = [df_cobranza.columns.values.tolist()] + df_cobranza.fillna('').values.tolist()
-                  worksheet_cobranza.update(data, value_input_option='USER_ENTERED')
-           except:
-              # Crear hoja si no existe
-              try:
-                  worksheet_cobranza = spreadsheet.add_worksheet(title="Cobranza", rows=1000, cols=20)
-                  if not df_cobranza.empty:
-                      data = [df_cobranza.columns.values.tolist()] + df_cobranza.fillna('').values.tolist()
-                      worksheet_cobranza.update(data, value_input_option='USER_ENTERED')
-              except Exception as e:
-                  st.error(f"❌ Error al crear/actualizar hoja 'Cobranza': {e}")
-
-        # Actualizar hoja de Seguimiento si se proporciona
-        if df_seguimiento is not None:
-            try:
-                worksheet_seguimiento = spreadsheet.worksheet("Seguimiento")
-                worksheet_seguimiento.clear()
-                if not df_seguimiento.empty:
-                    data = [df_seguimiento.columns.values.tolist()] + df_seguimiento.fillna('').values.tolist()
-                    worksheet_seguimiento.update(data, value_input_option='USER_ENTERED')
-            except:
-                # Crear hoja si no existe
-                try:
-                    worksheet_seguimiento = spreadsheet.add_worksheet(title="Seguimiento", rows=1000, cols=20)
-                    if not df_seguimiento.empty:
-                        data = [df_seguimiento.columns.values.tolist()] + df_seguimiento.fillna('').values.tolist()
-                        worksheet_seguimiento.update(data, value_input_option='USER_ENTERED')
-                except Exception as e:
-                    st.error(f"❌ Error al crear/actualizar hoja 'Seguimiento': {e}")
-
-        # Actualizar hoja de Operación si se proporciona
-        if df_operacion is not None:
-            try:
-                worksheet_operacion = spreadsheet.worksheet("Operacion")
-                worksheet_operacion.clear()
-                if not df_operacion.empty:
-                    data = [df_operacion.columns.values.tolist()] + df_operacion.fillna('').values.tolist()
-                    worksheet_operacion.update(data, value_input_option='USER_ENTERED')
-            except:
-                # Crear hoja si no existe
-                try:
-                    worksheet_operacion = spreadsheet.add_worksheet(title="Operacion", rows=1000, cols=20)
-                    if not df_operacion.empty:
-                        data = [df_operacion.columns.values.tolist()] + df_operacion.fillna('').values.tolist()
-                        worksheet_operacion.update(data, value_input_option='USER_ENTERED')
-                except Exception as e:
-                    st.error(f"❌ Error al crear/actualizar hoja 'Operacion': {e}")
-
-        # Invalidar cache para forzar recarga
-        st.cache_data.clear()
         return True
 
     except Exception as e:
         st.error(f"Error guardando datos: {e}")
         return False
+    finally:
+        # Invalidar cache (local y compartida) aunque la escritura haya sido parcial
+        invalidar_cache(list(por_hoja))
+
+# Guardado dirigido: sólo las celdas modificadas
+def guardar_cambios(nombre_hoja, df, indices, columnas):
+    """
+    Escribe sólo las celdas ``columnas`` de las filas ``indices`` de una hoja.
+
+    ``df`` debe ser la hoja tal como la devolvió cargar_datos(). Si la hoja
+    cambió desde entonces no se escribe nada: se recargan los datos y el
+    usuario debe repetir el cambio sobre la versión vigente.
+    """
+    if not indices:
+        return True
+    try:
+        spreadsheet = conectar_google_sheets()
+        if not spreadsheet:
+            return False
+        with span("guardar_cambios", hoja=nombre_hoja, filas=len(indices)):
+            actualizar_filas(spreadsheet, nombre_hoja, df, indices, columnas, clave=CLAVE_POR_HOJA[nombre_hoja])
+        invalidar_cache([nombre_hoja])
+        return True
+    except HojaDesalineada as e:
+        # Guardar la hoja completa borraría los cambios concurrentes que causaron el desfase
+        st.error(f"❌ La hoja '{nombre_hoja}' cambió desde la última lectura; no se guardó nada. "
+                 f"Se recargaron los datos, repite el cambio. ({e})")
+        invalidar_cache([nombre_hoja])
+        return False
+    except Exception as e:
+        st.error(f"❌ Error al actualizar hoja '{nombre_hoja}': {e}")
+        invalidar_cache([nombre_hoja])
+        return False
 
 # Función para validar formato de fecha
 def validar_fecha(fecha_str):
@@ -1049,141 +1077,76 @@ def validar_fecha(fecha_str):
 def fecha_actual():
     return datetime.now().strftime("%d/%m/%Y")
 
+# Botones de descarga generados en bloques sólo al hacer clic
+def botones_exportacion(df, nombre_base, key, nombre_hoja="Datos"):
+    """Muestra un botón de descarga por formato; el archivo se escribe en bloques al hacer clic"""
+    columnas = st.columns(len(FORMATOS_EXPORTACION))
+    for columna, (formato, info) in zip(columnas, FORMATOS_EXPORTACION.items()):
+        with columna:
+            st.download_button(
+                f"⬇️ {formato.upper()}",
+                data=lambda formato=formato: exportar_a_temporal(df, formato, nombre_hoja=nombre_hoja),
+                file_name=f"{nombre_base}.{info['extension']}",
+                mime=info["mime"],
+                on_click="ignore",
+                use_container_width=True,
+                key=f"{key}_{formato}"
+            )
+
+def tabla_paginada(df, key, estilo=None, hide_index=True):
+    """
+    Muestra ``df`` por páginas. Filtro, orden y corte se hacen en el servidor
+    y sólo la página visible se envía al navegador; ``estilo`` (página -> Styler)
+    se aplica únicamente a esa página.
+    """
+    if df.empty:
+        st.dataframe(df, use_container_width=True, hide_index=hide_index)
+        return
+
+    col_filtro, col_orden, col_sentido, col_tamaño = st.columns([3, 2, 1, 1])
+    with col_filtro:
+        filtro = st.text_input("Filtrar", key=f"{key}_filtro", placeholder="Texto en cualquier columna")
+    with col_orden:
+        orden = st.selectbox("Ordenar por", ["(sin orden)"] + list(df.columns), key=f"{key}_orden")
+    with col_sentido:
+        descendente = st.checkbox("Descendente", key=f"{key}_descendente")
+    with col_tamaño:
+        tamaño = st.selectbox("Filas por página", TAMAÑOS_PAGINA,
+                              index=TAMAÑOS_PAGINA.index(TAMAÑO_POR_DEFECTO), key=f"{key}_tamaño")
+
+    vista = filtrar_ordenar(df, filtro, orden, not descendente)
+    paginas = total_paginas(len(vista), tamaño)
+    # Ajustar la página guardada si el filtro dejó menos páginas
+    if st.session_state.get(f"{key}_pagina", 1) > paginas:
+        st.session_state[f"{key}_pagina"] = paginas
+
+    col_pagina, col_info = st.columns([1, 3])
+    with col_pagina:
+        pagina = st.number_input("Página", min_value=1, max_value=paginas, step=1, key=f"{key}_pagina")
+    with col_info:
+        inicio = (pagina - 1) * tamaño
+        st.caption(f"Filas {min(inicio + 1, len(vista))}–{min(inicio + tamaño, len(vista))} de {len(vista)}"
+                   + (f" (filtradas de {len(df)})" if len(vista) != len(df) else ""))
+
+    pagina_df = cortar_pagina(vista, pagina, tamaño)
+    with span("tabla_paginada", tabla=key, filas=len(pagina_df)):
+        try:
+            datos = estilo(pagina_df) if estilo is not None else pagina_df
+        except Exception:
+            datos = pagina_df
+        st.dataframe(datos, use_container_width=True, hide_index=hide_index)
+
 # =========================
 # 🔧 FUNCIÓN CALCULAR_COBRANZA
 # =========================
-def calcular_cobranza():
+@trazado
+def calcular_cobranza(df_polizas, df_cobranza):
     """
     Calcula los registros de cobranza basándose en las pólizas vigentes.
     MODIFICADO: Excluye pólizas canceladas y verifica fecha de cancelación
     """
     try:
-        _, df_polizas, df_cobranza, _, _ = cargar_datos()
-
-        if df_polizas.empty:
-            return pd.DataFrame()
-
-        # Filtrar SOLO pólizas vigentes (excluir canceladas)
-        df_vigentes = df_polizas[df_polizas["Estado"].astype(str).str.upper() == "VIGENTE"]
-        if df_vigentes.empty:
-            return pd.DataFrame()
-
-        hoy = datetime.now()
-        fecha_limite = hoy + timedelta(days=60)
-        cobranza_mes = []
-
-        def parse_monto(valor):
-            if pd.isna(valor) or str(valor).strip() == "":
-                return 0.0
-            valor = str(valor).replace('$', '').replace(',', '').replace(' ', '').strip()
-            try:
-                return float(valor)
-            except:
-                return 0.0
-
-        def safe_date_convert(date_str):
-            if pd.isna(date_str) or not date_str:
-                return None
-            for fmt in ("%d/%m/%Y", "%Y-%m-%d", "%d-%m-%Y"):
-                try:
-                    return datetime.strptime(str(date_str).strip(), fmt)
-                except ValueError:
-                    continue
-            return None
-
-        for _, poliza in df_vigentes.iterrows():
-            no_poliza = str(poliza.get("No. Póliza", "")).strip()
-            periodicidad = str(poliza.get("Periodicidad", "")).upper().strip()
-            moneda = poliza.get("Moneda", "MXN")
-            
-            primer_pago = parse_monto(poliza.get("Primer Pago", 0))
-            pagos_subsecuentes = parse_monto(poliza.get("Pagos Subsecuentes", 0))
-            
-            if pagos_subsecuentes == 0:
-                pagos_subsecuentes = primer_pago
-
-            inicio_vigencia_str = poliza.get("Inicio Vigencia", "")
-            if not no_poliza or not inicio_vigencia_str:
-                continue
-
-            inicio_vigencia = safe_date_convert(inicio_vigencia_str)
-            if inicio_vigencia is None:
-                continue
-
-            fecha_actual_calc = inicio_vigencia
-            num_recibo = 1
-            max_recibos = 36
-
-            while num_recibo <= max_recibos and fecha_actual_calc <= fecha_limite:
-                mes_cobranza = fecha_actual_calc.strftime("%m/%Y")
-                fecha_vencimiento = fecha_actual_calc.strftime("%d/%m/%Y")
-
-                existe_registro = False
-                if not df_cobranza.empty and "No. Póliza" in df_cobranza.columns and "Recibo" in df_cobranza.columns:
-                    existe_registro = (
-                        (df_cobranza["No. Póliza"].astype(str).str.strip() == no_poliza) &
-                        (df_cobranza["Recibo"] == num_recibo)
-                    ).any()
-
-                if not existe_registro:
-                    if num_recibo == 1:
-                        monto_prima = primer_pago
-                    else:
-                        monto_prima = pagos_subsecuentes
-
-                    if fecha_actual_calc.date() < hoy.date():
-                        estatus = "Vencido"
-                        comentario = "Cobranza vencida - registro tardío"
-                        dias_restantes = (fecha_actual_calc - hoy).days
-                        dias_atraso = abs(dias_restantes)
-                    else:
-                        estatus = "Pendiente"
-                        comentario = ""
-                        dias_restantes = (fecha_actual_calc - hoy).days
-                        dias_atraso = 0
-
-                    cobranza_mes.append({
-                        "No. Póliza": no_poliza,
-                        "Nombre/Razón Social": poliza.get("Nombre/Razón Social", ""),
-                        "Mes Cobranza": mes_cobranza,
-                        "Fecha Vencimiento": fecha_vencimiento,
-                        "Prima de Recibo": monto_prima,
-                        "Monto Pagado": 0,
-                        "Fecha Pago": "",
-                        "Estatus": estatus,
-                        "Días Restantes": dias_restantes,
-                        "Días Atraso": dias_atraso,
-                        "Periodicidad": periodicidad,
-                        "Moneda": moneda,
-                        "Recibo": num_recibo,
-                        "Clave de Emisión": poliza.get("Clave de Emisión", ""),
-                        "Comentario": comentario,
-                        "ID_Cobranza": f"{no_poliza}_R{num_recibo}"
-                    })
-
-                if periodicidad == "CONTADO":
-                    fecha_actual_calc += relativedelta(years=1)
-                elif periodicidad == "TRIMESTRAL":
-                    fecha_actual_calc += relativedelta(months=3)
-                elif periodicidad == "SEMESTRAL":
-                    fecha_actual_calc += relativedelta(months=6)
-                elif periodicidad == "MENSUAL":
-                    fecha_actual_calc += relativedelta(months=1)
-                else:
-                    fecha_actual_calc += relativedelta(months=1)
-
-                num_recibo += 1
-
-        df_resultado = pd.DataFrame(cobranza_mes)
-        if df_resultado.empty:
-            return df_resultado
-
-        df_resultado = df_resultado.drop_duplicates(
-            subset=["ID_Cobranza"], 
-            keep="last"
-        )
-
-        return df_resultado
+        return generar_recibos(df_polizas, df_cobranza)
 
     except Exception as e:
         st.error(f"Error al calcular cobranza: {e}")
@@ -1204,42 +1167,18 @@ def cancelar_recibos_poliza(no_poliza, fecha_cancelacion, df_cobranza):
         if df_cobranza.empty:
             return df_cobranza
         
-        # Convertir fecha de cancelación
         try:
-            fecha_cancel_dt = datetime.strptime(fecha_cancelacion, "%d/%m/%Y")
-        except:
+            df_cobranza, _ = cancelar_recibos_polizas([(no_poliza, fecha_cancelacion)], df_cobranza)
+        except ValueError:
             st.warning("No se pudo procesar la fecha de cancelación para actualizar recibos")
-            return df_cobranza
-        
-        # Filtrar recibos de esta póliza
-        mask_poliza = df_cobranza["No. Póliza"].astype(str).str.strip() == str(no_poliza).strip()
-        
-        # Para cada recibo de esta póliza
-        for idx in df_cobranza[mask_poliza].index:
-            fecha_vencimiento_str = df_cobranza.loc[idx, "Fecha Vencimiento"]
-            estatus_actual = df_cobranza.loc[idx, "Estatus"]
-            
-            # Solo procesar recibos pendientes o vencidos
-            if estatus_actual not in ["Pendiente", "Vencido"]:
-                continue
-            
-            try:
-                fecha_venc_dt = datetime.strptime(str(fecha_vencimiento_str), "%d/%m/%Y")
-                
-                # Si el vencimiento es posterior a la cancelación, cancelar el recibo
-                if fecha_venc_dt > fecha_cancel_dt:
-                    df_cobranza.loc[idx, "Estatus"] = "Cancelado"
-                    df_cobranza.loc[idx, "Comentario"] = f"Cancelado automáticamente - Póliza cancelada el {fecha_cancelacion}"
-                    df_cobranza.loc[idx, "Prima de Recibo"] = 0
-                    df_cobranza.loc[idx, "Monto Pagado"] = 0
-            except:
-                continue
         
         return df_cobranza
         
     except Exception as e:
         st.error(f"Error al cancelar recibos: {e}")
         return df_cobranza
+@st.fragment
+@trazado
 def mostrar_gestion_recibos(df_cobranza):
     """
     Permite gestionar (eliminar/cancelar) recibos de cobranza individualmente
@@ -1257,39 +1196,34 @@ def mostrar_gestion_recibos(df_cobranza):
         st.success("No hay recibos pendientes o vencidos para gestionar")
         return df_cobranza
     
-    # Crear lista de recibos
-    opciones_recibos = []
-    for idx, row in df_gestionables.iterrows():
-        descripcion = f"{row['No. Póliza']} - Recibo {row['Recibo']} - {row.get('Nombre/Razón Social', '')} - Vence: {row.get('Fecha Vencimiento', '')} - {row.get('Estatus', '')}"
-        opciones_recibos.append({
-            'descripcion': descripcion,
-            'id_cobranza': f"{row['No. Póliza']}_R{row['Recibo']}",
-            'index': idx,
-            'datos': row
-        })
+    # Crear lista de recibos (descripción -> Recibo)
+    opciones_recibos = {
+        f"{recibo.no_poliza} - Recibo {recibo.recibo} - {recibo.nombre} - Vence: {recibo.fecha_vencimiento} - {recibo.estatus}": recibo
+        for recibo in Recibo.desde_dataframe(df_gestionables)
+    }
     
     # Selector
     recibo_seleccionado = st.selectbox(
         "Seleccionar Recibo para Cancelar/Eliminar",
-        options=[""] + [r['descripcion'] for r in opciones_recibos],
+        options=[""] + list(opciones_recibos),
         key="select_eliminar_recibo"
     )
     
     if recibo_seleccionado:
-        recibo_data = next((r for r in opciones_recibos if r['descripcion'] == recibo_seleccionado), None)
+        recibo_data = opciones_recibos.get(recibo_seleccionado)
         
         if recibo_data:
-            st.warning(f"**⚠️ Atención:** Está por cancelar el recibo #{recibo_data['datos']['Recibo']}")
+            st.warning(f"**⚠️ Atención:** Está por cancelar el recibo #{recibo_data.recibo}")
             
             col1, col2 = st.columns(2)
             with col1:
-                st.write(f"**Póliza:** {recibo_data['datos']['No. Póliza']}")
-                st.write(f"**Cliente:** {recibo_data['datos'].get('Nombre/Razón Social', '')}")
-                st.write(f"**Prima:** ${recibo_data['datos'].get('Prima de Recibo', 0):,.2f}")
+                st.write(f"**Póliza:** {recibo_data.no_poliza}")
+                st.write(f"**Cliente:** {recibo_data.nombre}")
+                st.write(f"**Prima:** ${recibo_data.prima_recibo / 100:,.2f}")
             
             with col2:
-                st.write(f"**Vencimiento:** {recibo_data['datos'].get('Fecha Vencimiento', '')}")
-                st.write(f"**Estatus:** {recibo_data['datos'].get('Estatus', '')}")
+                st.write(f"**Vencimiento:** {recibo_data.fecha_vencimiento}")
+                st.write(f"**Estatus:** {recibo_data.estatus}")
             
             motivo = st.text_area(
                 "Motivo de la Cancelación*",
@@ -1302,7 +1236,7 @@ def mostrar_gestion_recibos(df_cobranza):
                     st.warning("Debe proporcionar un motivo para la cancelación")
                 else:
                     # Actualizar el recibo
-                    idx = recibo_data['index']
+                    idx = recibo_data.indice
                     df_cobranza.loc[idx, 'Estatus'] = 'Cancelado'
                     df_cobranza.loc[idx, 'Prima de Recibo'] = 0
                     df_cobranza.loc[idx, 'Monto Pagado'] = 0
@@ -1315,9 +1249,279 @@ def mostrar_gestion_recibos(df_cobranza):
                         st.error("❌ Error al cancelar el recibo")
     
     return df_cobranza
+@trazado
+def mostrar_cancelacion_masiva(df_polizas, df_cobranza):
+    """
+    Cancela de una vez las pólizas vigentes de una aseguradora (y productos) junto con sus recibos futuros
+
+    Recibe las hojas tal como las devolvió cargar_datos() para poder guardar sólo las celdas modificadas.
+    """
+    with st.expander("🚫 Cancelación Masiva por Aseguradora / Producto"):
+        if df_polizas.empty or "Aseguradora" not in df_polizas.columns:
+            st.info("No hay pólizas registradas")
+            return
+
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            aseguradora = st.selectbox("Aseguradora*", [""] + OPCIONES_ASEG, key="masiva_aseguradora")
+        with col2:
+            productos = st.multiselect("Productos (vacío = todos)", OPCIONES_PRODUCTO, key="masiva_productos")
+        with col3:
+            fecha_cancelacion = st.text_input("Fecha de Cancelación (dd/mm/yyyy)*", value=fecha_actual(), key="masiva_fecha")
+
+        if not aseguradora:
+            return
+
+        mask = (
+            (df_polizas["Estado"] == "VIGENTE") &
+            (df_polizas["Aseguradora"] == aseguradora)
+        )
+        if productos and "Producto" in df_polizas.columns:
+            mask &= df_polizas["Producto"].isin(productos)
+        polizas_afectadas = df_polizas[mask]
+
+        st.write(f"**Pólizas vigentes afectadas:** {len(polizas_afectadas)}")
+        if polizas_afectadas.empty:
+            return
+
+        if st.button("🚫 Confirmar Cancelación Masiva", type="primary", key="btn_cancelacion_masiva"):
+            valido, error = validar_fecha(fecha_cancelacion)
+            if not fecha_cancelacion or not valido:
+                st.error(f"Fecha de cancelación: {error or 'es obligatoria'}")
+                return
+
+            # Copias: si el guardado falla, el resto de la página sigue viendo las hojas como se leyeron
+            df_polizas, df_cobranza = df_polizas.copy(), df_cobranza.copy()
+            df_polizas.loc[polizas_afectadas.index, "Estado"] = "CANCELADO"
+            pares = [(no_poliza, fecha_cancelacion.strip()) for no_poliza in polizas_afectadas["No. Póliza"]]
+            df_cobranza, recibos_cancelados = cancelar_recibos_polizas(pares, df_cobranza)
+
+            # Primero los recibos: si fallan, las pólizas siguen VIGENTE y no queda nada a medias
+            if not guardar_cambios("Cobranza", df_cobranza, recibos_cancelados,
+                                   ["Estatus", "Comentario", "Prima de Recibo", "Monto Pagado"]):
+                st.error("❌ Error en la cancelación masiva: no se modificó ninguna hoja")
+            elif guardar_cambios("Polizas", df_polizas, polizas_afectadas.index.tolist(), ["Estado"]):
+                st.success(f"✅ {len(polizas_afectadas)} pólizas canceladas y {len(recibos_cancelados)} recibos cancelados")
+                st.rerun()
+            else:
+                st.error(f"❌ Cancelación incompleta: {len(recibos_cancelados)} recibos quedaron cancelados en 'Cobranza' "
+                         f"pero las pólizas siguen VIGENTE en 'Polizas'. Repite la cancelación para completarla.")
+
+@st.cache_resource
+def _tipos_cambio_version(marca):
+    return TablaTiposCambio.desde_archivo()
+
+def obtener_tipos_cambio():
+    """Tabla de tipos de cambio local; se recarga cuando cambia el archivo"""
+    try:
+        marca = os.path.getmtime(RUTA_TIPOS_CAMBIO)
+    except OSError:
+        marca = None
+    return _tipos_cambio_version(marca)
+
+def aviso_monedas_sin_tasa(monedas):
+    """Advierte qué monedas quedaron fuera de los montos en MXN"""
+    faltantes = obtener_tipos_cambio().monedas_sin_tasa(monedas)
+    if faltantes:
+        st.warning(f"⚠️ Sin tipo de cambio registrado para: {', '.join(faltantes)}. "
+                   "Sus montos no se incluyen en los totales en MXN; registre las tasas con "
+                   "`python -m cartera.tipos_cambio importar` o `agregar`.")
+
+@st.cache_data(ttl=300)
+def _cubo_antiguedad_revision(firma, hoy, version_tipos_cambio):
+    """Cubo de antigüedad de saldos para una versión de los datos, de los tipos de cambio y un día"""
+    _, df_polizas, df_cobranza, _, _ = _cargar_datos_revision(firma)
+    return cubo_antiguedad(df_cobranza, df_polizas, pd.Timestamp(hoy), obtener_tipos_cambio())
+
+@trazado
+def mostrar_antiguedad_saldos():
+    """
+    Resumen de la exposición de cobranza por rango de atraso
+    """
+    with st.expander("📊 Antigüedad de Saldos"):
+        cubo = _cubo_antiguedad_revision(firma_datos(), datetime.now().strftime("%Y-%m-%d"),
+                                         obtener_tipos_cambio().version)
+        if cubo.empty:
+            st.info("No hay recibos pendientes o vencidos registrados")
+            return
+
+        col1, col2 = st.columns([3, 1])
+        with col1:
+            dimensiones = st.multiselect("Agrupar por", DIMENSIONES_ANTIGUEDAD, default=["Clave de Emisión"],
+                                         key="antiguedad_dimensiones")
+        with col2:
+            valor = st.radio("Mostrar", ["Monto MXN", "Monto", "Recibos"], horizontal=True, key="antiguedad_valor")
+
+        # No se suman montos de distintas monedas sin convertir
+        if valor == "Monto" and "Moneda" not in dimensiones:
+            dimensiones = dimensiones + ["Moneda"]
+        if valor == "Monto MXN":
+            aviso_monedas_sin_tasa(cubo["Moneda"])
+
+        tabla = resumen_antiguedad(cubo, dimensiones, valor)
+        formato = "%d" if valor == "Recibos" else "%.2f"
+        st.dataframe(
+            tabla, use_container_width=True, hide_index=True,
+            column_config={col: st.column_config.NumberColumn(col, format=formato) for col in RANGOS_ANTIGUEDAD + ["Total"]}
+        )
+        st.caption("Sólo recibos guardados en la hoja de Cobranza con estatus Pendiente o Vencido")
+        botones_exportacion(tabla, "antiguedad_saldos", key="exportar_antiguedad", nombre_hoja="Antigüedad")
+
+@st.cache_data(ttl=300)
+def _pronostico_revision(firma, meses, mes_inicio, version_tipos_cambio):
+    """Pronóstico de cobranza para una versión de los datos y de los tipos de cambio, horizonte y mes de inicio"""
+    _, df_polizas, df_cobranza, _, _ = _cargar_datos_revision(firma)
+    return pronosticar_cobranza(df_polizas, meses, pd.Timestamp(mes_inicio), df_cobranza, obtener_tipos_cambio())
+
+@trazado
+def mostrar_pronostico_cobranza():
+    """
+    Primas esperadas por mes de las pólizas vigentes
+    """
+    with st.expander("📈 Pronóstico de Cobranza"):
+        col1, col2 = st.columns(2)
+        with col1:
+            meses = st.slider("Horizonte (meses)", 1, MAX_RECIBOS, HORIZONTE_POR_DEFECTO, key="pronostico_meses")
+
+        pronostico = _pronostico_revision(firma_datos(), meses, datetime.now().strftime("%Y-%m-01"),
+                                          obtener_tipos_cambio().version)
+        if pronostico.empty:
+            st.info("No hay pólizas vigentes con recibos en el horizonte seleccionado")
+            return
+
+        with col2:
+            monedas = sorted(pronostico["Moneda"].unique())
+            moneda = st.selectbox("Moneda", ["Todas (en MXN)"] + monedas, key="pronostico_moneda")
+
+        if moneda in monedas:
+            por_moneda, columna_monto = pronostico[pronostico["Moneda"] == moneda], "Monto"
+        else:
+            aviso_monedas_sin_tasa(pronostico["Moneda"])
+            por_moneda, columna_monto = pronostico, "Monto MXN"
+        tabla = por_moneda.pivot_table(index="Mes", columns="Aseguradora", values=columna_monto, aggfunc="sum", fill_value=0)
+        st.bar_chart(tabla)
+        tabla["Total"] = tabla.sum(axis=1)
+        st.dataframe(
+            tabla.reset_index(), use_container_width=True, hide_index=True,
+            column_config={col: st.column_config.NumberColumn(col, format="%.2f") for col in tabla.columns}
+        )
+        st.caption("Excluye recibos ya pagados o cancelados en la hoja de Cobranza")
+        botones_exportacion(pronostico, "pronostico_cobranza", key="exportar_pronostico", nombre_hoja="Pronóstico")
+
+def cargar_comisiones():
+    """Libro de comisiones (hoja Comisiones) desde la caché compartida"""
+    try:
+        revision = obtener_cache_compartido().firma([HOJA_COMISIONES])[0]
+    except Exception:
+        revision = 0
+    try:
+        return leer_hoja_con_cache(HOJA_COMISIONES, revision)
+    except Exception:
+        return pd.DataFrame(columns=COLUMNAS_COMISIONES)
+
+def registrar_comisiones(df_recibos, df_polizas):
+    """Agrega al libro de comisiones sólo la contribución de los recibos indicados que aún no esté registrada"""
+    try:
+        nuevas = comisiones_pendientes(df_recibos, df_polizas, cargar_comisiones())
+        if nuevas.empty:
+            return 0
+        spreadsheet = conectar_google_sheets()
+        if not spreadsheet:
+            return 0
+        agregar_filas(spreadsheet, HOJA_COMISIONES, nuevas)
+        invalidar_cache([HOJA_COMISIONES])
+        return len(nuevas)
+    except Exception as e:
+        st.warning(f"⚠️ No se pudo registrar la comisión: {e}")
+        return 0
+
+@trazado
+def mostrar_comisiones(df_polizas, df_cobranza):
+    """
+    Comisiones devengadas por Clave de Emisión, Aseguradora y mes
+    """
+    with st.expander("💼 Comisiones Devengadas"):
+        df_comisiones = cargar_comisiones()
+
+        if st.button("🔄 Registrar comisiones pendientes", key="btn_comisiones_pendientes"):
+            registradas = registrar_comisiones(df_cobranza, df_polizas)
+            st.success(f"✅ {registradas} comisiones registradas")
+            df_comisiones = cargar_comisiones()
+
+        if df_comisiones.empty:
+            st.info("Aún no hay comisiones registradas")
+            return
+
+        meses = sorted(df_comisiones["Mes"].astype(str).unique(), reverse=True)
+        mes = st.selectbox("Mes", ["Todos"] + meses, key="comisiones_mes")
+        resumen = resumir_comisiones(df_comisiones, None if mes == "Todos" else mes)
+        st.dataframe(
+            resumen, use_container_width=True, hide_index=True,
+            column_config={col: st.column_config.NumberColumn(col, format="%.2f") for col in ["Base Comisión", "Comisión"]}
+        )
+        st.caption("Cierre de mes: `python -m cartera.comisiones --mes yyyy-mm`")
+        botones_exportacion(resumen, "comisiones", key="exportar_comisiones", nombre_hoja="Comisiones")
+
+@trazado
+def mostrar_conciliacion_bancaria(df_polizas, df_cobranza):
+    """
+    Empareja un estado de cuenta con los recibos abiertos y registra los pagos confirmados en una sola escritura
+
+    Recibe las hojas tal como las devolvió cargar_datos() para poder guardar sólo las celdas modificadas.
+    """
+    with st.expander("🏦 Conciliación Bancaria"):
+        col1, col2, col3 = st.columns([2, 1, 1])
+        with col1:
+            archivo = st.file_uploader("Estado de cuenta (CSV u OFX)", type=["csv", "ofx", "qfx"], key="conciliacion_archivo")
+        with col2:
+            dias = st.number_input("Tolerancia de fecha (días)", min_value=0, max_value=90,
+                                   value=DIAS_TOLERANCIA, key="conciliacion_dias")
+        with col3:
+            tolerancia = st.number_input("Tolerancia de monto", min_value=0.0, value=TOLERANCIA_MONTO,
+                                         step=0.5, key="conciliacion_tolerancia")
+        if archivo is None:
+            st.caption("Se concilian los recibos Pendientes y Vencidos guardados en la hoja de Cobranza")
+            return
+
+        try:
+            movimientos = leer_estado_cuenta(archivo)
+        except Exception as e:
+            st.error(f"❌ No se pudo leer el estado de cuenta: {e}")
+            return
+
+        coincidencias = conciliar(movimientos, df_cobranza, tolerancia_monto=tolerancia, dias=dias)
+        st.write(f"**Abonos leídos:** {len(movimientos)} | **Emparejados:** {len(coincidencias)}")
+        if coincidencias.empty:
+            st.info("No se encontraron recibos abiertos que coincidan con los movimientos")
+            return
+
+        coincidencias.insert(0, "Confirmar", coincidencias["Puntaje"] >= PUNTAJE_CONFIRMACION)
+        editadas = st.data_editor(
+            coincidencias.drop(columns=["Movimiento", "Índice Recibo"]),
+            use_container_width=True, hide_index=True, key="conciliacion_editor",
+            disabled=[col for col in coincidencias.columns if col != "Confirmar"],
+        )
+        confirmadas = coincidencias[editadas["Confirmar"].to_numpy(dtype=bool)]
+
+        sin_emparejar = movimientos.drop(index=coincidencias["Movimiento"])
+        if not sin_emparejar.empty:
+            st.write(f"**Movimientos sin recibo:** {len(sin_emparejar)}")
+            st.dataframe(sin_emparejar, use_container_width=True, hide_index=True)
+
+        if st.button(f"💾 Registrar {len(confirmadas)} pagos confirmados", type="primary",
+                     key="btn_conciliacion", disabled=confirmadas.empty):
+            df_cobranza, indices = aplicar_pagos(df_cobranza.copy(), confirmadas)
+            if guardar_cambios("Cobranza", df_cobranza, indices, COLUMNAS_PAGO):
+                registrar_comisiones(df_cobranza.loc[indices], df_polizas)
+                st.success(f"✅ {len(indices)} pagos registrados")
+                st.rerun()
+            else:
+                st.error("❌ Error al registrar los pagos")
+
 # ================================
 # 🆕 NUEVA PESTAÑA: ASESORÍA Rizkora
 # ================================
+@trazado
 def mostrar_asesoria_axa():
     st.header("📈 Asesoría Financiera Rizkora")
     st.markdown("### Detección de necesidades financieras para una asesoría ideal")
@@ -1684,6 +1888,8 @@ def mostrar_asesoria_axa():
                         # Mostrar gráficos
                         st.subheader("📊 Gráficos Financieros")
                         
+                        plt = pyplot()
+
                         # Gráfico 1: Distribución financiera actual
                         fig1 = crear_grafico_pastel_gastos(metricas)
                         if fig1:
@@ -1751,143 +1957,7 @@ def mostrar_asesoria_axa():
 def calcular_metricas_financieras():
     """Calcula métricas financieras basadas en los datos ingresados"""
     try:
-        datos = st.session_state.asesoria_data
-        
-        # Extraer datos básicos con valores por defecto seguros
-        ingreso_mensual = datos['informacion_financiera'].get('ingreso_mensual', 0)
-        gastos_mensuales = datos['informacion_financiera'].get('gastos_mensuales', 0)
-        ahorro_actual = datos['informacion_financiera'].get('ahorro_actual', 0)
-        edad = datos['informacion_familiar'].get('edad', 30)
-        
-        # Convertir a float si es necesario
-        if isinstance(ingreso_mensual, str):
-            try:
-                ingreso_mensual = float(ingreso_mensual)
-            except:
-                ingreso_mensual = 0.0
-        
-        if isinstance(gastos_mensuales, str):
-            try:
-                gastos_mensuales = float(gastos_mensuales)
-            except:
-                gastos_mensuales = 0.0
-        
-        if isinstance(ahorro_actual, str):
-            try:
-                ahorro_actual = float(ahorro_actual)
-            except:
-                ahorro_actual = 0.0
-        
-        if isinstance(edad, str):
-            try:
-                edad = int(edad)
-            except:
-                edad = 30
-        
-        # Cálculos básicos
-        ingreso_anual = ingreso_mensual * 12
-        gastos_anuales = gastos_mensuales * 12
-        ahorro_mensual = ingreso_mensual - gastos_mensuales
-        ahorro_anual = ahorro_mensual * 12
-        porcentaje_ahorro = (ahorro_mensual / ingreso_mensual * 100) if ingreso_mensual > 0 else 0
-        
-        # Fondo de emergencia recomendado (6 meses de gastos)
-        fondo_emergencia_recomendado = gastos_mensuales * 6
-        
-        # Necesidad de protección familiar
-        meses_proteccion = datos['objetivos'].get('meses_proteccion_familiar', 6)
-        if isinstance(meses_proteccion, str):
-            try:
-                meses_proteccion = int(meses_proteccion)
-            except:
-                meses_proteccion = 6
-        necesidad_proteccion = gastos_mensuales * meses_proteccion
-        
-        # Necesidad de retiro
-        edad_retiro_deseada = datos['objetivos'].get('edad_retiro_deseada', 65)
-        if isinstance(edad_retiro_deseada, str):
-            try:
-                edad_retiro_deseada = int(edad_retiro_deseada)
-            except:
-                edad_retiro_deseada = 65
-        
-        años_hasta_retiro = max(0, edad_retiro_deseada - edad) if edad_retiro_deseada > edad else 0
-        
-        ingreso_retiro_mensual = datos['objetivos'].get('ingreso_retiro_mensual', 0)
-        if isinstance(ingreso_retiro_mensual, str):
-            try:
-                ingreso_retiro_mensual = float(ingreso_retiro_mensual)
-            except:
-                ingreso_retiro_mensual = 0.0
-        
-        años_retiro = max(0, 80 - edad_retiro_deseada)  # Esperanza de vida 80 años
-        necesidad_retiro_total = ingreso_retiro_mensual * 12 * años_retiro
-        
-        # Necesidad educación
-        necesidad_educacion = 0
-        num_hijos = datos['informacion_familiar'].get('num_hijos', 0)
-        hijos = datos['informacion_familiar'].get('hijos', [])
-        costo_universidad = datos['objetivos'].get('costo_universidad_por_hijo', 0)
-        
-        if isinstance(costo_universidad, str):
-            try:
-                costo_universidad = float(costo_universidad)
-            except:
-                costo_universidad = 0.0
-        
-        for i in range(min(num_hijos, len(hijos))):
-            if hijos[i].get('edad'):
-                try:
-                    edad_hijo = int(hijos[i]['edad'])
-                    if edad_hijo < 18:
-                        necesidad_educacion += costo_universidad
-                except:
-                    necesidad_educacion += costo_universidad
-        
-        # Necesidad proyecto
-        necesidad_proyecto = datos['objetivos'].get('costo_proyecto', 0)
-        if isinstance(necesidad_proyecto, str):
-            try:
-                necesidad_proyecto = float(necesidad_proyecto)
-            except:
-                necesidad_proyecto = 0.0
-        
-        # Metas financieras
-        metas = {
-            'Protección': necesidad_proteccion,
-            'Retiro': necesidad_retiro_total,
-            'Educación': necesidad_educacion,
-            'Proyecto': necesidad_proyecto
-        }
-        
-        # Ahorro recomendado (10% del ingreso anual)
-        ahorro_recomendado_10 = ingreso_anual * 0.10
-        ahorro_recomendado_7 = ingreso_mensual * 0.07 * 12
-        
-        # Asegurarse de incluir TODAS las métricas necesarias
-        metricas = {
-            'ingreso_anual': ingreso_anual,
-            'gastos_anuales': gastos_anuales,
-            'ahorro_mensual': ahorro_mensual,
-            'ahorro_anual': ahorro_anual,
-            'porcentaje_ahorro': porcentaje_ahorro,
-            'fondo_emergencia_recomendado': fondo_emergencia_recomendado,
-            'años_hasta_retiro': años_hasta_retiro,
-            'necesidad_retiro_total': necesidad_retiro_total,
-            'necesidad_educacion': necesidad_educacion,
-            'necesidad_proteccion': necesidad_proteccion,
-            'necesidad_proyecto': necesidad_proyecto,  # ¡IMPORTANTE! Esta es la clave faltante
-            'ahorro_recomendado_10': ahorro_recomendado_10,
-            'ahorro_recomendado_7': ahorro_recomendado_7,
-            'metas': metas,
-            'datos_basicos': {
-                'ingreso_mensual': ingreso_mensual,
-                'gastos_mensuales': gastos_mensuales,
-                'ahorro_actual': ahorro_actual,
-                'deudas_totales': datos['informacion_financiera'].get('deudas_totales', 0)
-            }
-        }
-        
+        metricas = metricas_financieras(st.session_state.asesoria_data)
         # Guardar en session state para uso posterior
         st.session_state.metricas_financieras = metricas
         return metricas
@@ -1898,505 +1968,49 @@ def calcular_metricas_financieras():
         st.error(f"Detalle del error: {traceback.format_exc()}")
         return None
 
+@trazado
 def crear_grafico_pastel_gastos(metricas):
     """Crea gráfico de pastel para distribución de finanzas"""
     try:
-        fig, ax = plt.subplots(figsize=(8, 6))
-        
-        datos = metricas['datos_basicos']
-        labels = ['Gastos Mensuales', 'Ahorro Actual', 'Deudas Totales']
-        sizes = [
-            datos['gastos_mensuales'],
-            datos['ahorro_actual'],
-            datos.get('deudas_totales', 0)
-        ]
-        
-        # Filtrar valores cero
-        filtered_labels = []
-        filtered_sizes = []
-        colors = []
-        
-        for i, (label, size) in enumerate(zip(labels, sizes)):
-            if size > 0:
-                filtered_labels.append(label)
-                filtered_sizes.append(size)
-                colors.append(list(COLORES_AXA.values())[i % len(COLORES_AXA)])
-        
-        if filtered_sizes:
-            wedges, texts, autotexts = ax.pie(
-                filtered_sizes, 
-                labels=filtered_labels,
-                colors=colors,
-                autopct='%1.1f%%',
-                startangle=90,
-                textprops={'fontsize': 9}
-            )
-            
-            ax.set_title('Distribución Financiera Actual', 
-                        fontsize=14, 
-                        fontweight='bold',
-                        color=COLORES_AXA['azul_principal'])
-            
-            plt.tight_layout()
-            return fig
-        return None
-        
+        return grafico_pastel_gastos(metricas)
     except Exception as e:
         st.error(f"Error al crear gráfico de pastel: {str(e)}")
         return None
 
+@trazado
 def crear_grafico_barras_metas(metricas):
     """Crea gráfico de barras para metas financieras"""
     try:
-        fig, ax = plt.subplots(figsize=(10, 6))
-        
-        metas = metricas['metas']
-        labels = list(metas.keys())
-        valores = list(metas.values())
-        
-        # Filtrar metas con valor > 0
-        filtered_labels = []
-        filtered_valores = []
-        for label, valor in zip(labels, valores):
-            if valor > 0:
-                filtered_labels.append(label)
-                filtered_valores.append(valor)
-        
-        if filtered_valores:
-            bars = ax.bar(filtered_labels, filtered_valores, 
-                         color=[COLORES_AXA['azul_principal'],
-                               COLORES_AXA['verde_oscuro'],
-                               COLORES_AXA['verde_agua'],
-                               COLORES_AXA['azul_claro']][:len(filtered_labels)])
-            
-            # Agregar valores en las barras
-            for bar, valor in zip(bars, filtered_valores):
-                height = bar.get_height()
-                ax.text(bar.get_x() + bar.get_width()/2., height + height*0.01,
-                       f'${valor:,.0f}',
-                       ha='center', va='bottom',
-                       fontsize=9, fontweight='bold')
-            
-            ax.set_title('Metas Financieras por Categoría', 
-                        fontsize=14, 
-                        fontweight='bold',
-                        color=COLORES_AXA['azul_principal'])
-            ax.set_ylabel('Monto ($)', fontsize=12)
-            ax.grid(axis='y', alpha=0.3)
-            ax.set_axisbelow(True)
-            
-            # Formatear eje Y
-            ax.yaxis.set_major_formatter(plt.FuncFormatter(lambda x, p: f'${x:,.0f}'))
-            
-            plt.xticks(rotation=15)
-            plt.tight_layout()
-            return fig
-        return None
-        
+        return grafico_barras_metas(metricas)
     except Exception as e:
         st.error(f"Error al crear gráfico de barras: {str(e)}")
         return None
 
+@trazado
 def crear_grafico_ahorro(metricas):
     """Crea gráfico comparativo de ahorro"""
     try:
-        fig, ax = plt.subplots(figsize=(8, 6))
-        
-        datos = metricas['datos_basicos']
-        labels = ['Ahorro Actual', 'Ahorro Recomendado 10%', 'Ahorro Recomendado 7%']
-        valores = [
-            datos['ahorro_actual'],
-            metricas['ahorro_recomendado_10'],
-            metricas['ahorro_recomendado_7']
-        ]
-        
-        bars = ax.bar(labels, valores, 
-                     color=[COLORES_AXA['verde_agua'], 
-                           COLORES_AXA['azul_principal'], 
-                           COLORES_AXA['azul_claro']])
-        
-        # Agregar valores
-        for bar, valor in zip(bars, valores):
-            height = bar.get_height()
-            ax.text(bar.get_x() + bar.get_width()/2., height + height*0.01,
-                   f'${valor:,.0f}',
-                   ha='center', va='bottom',
-                   fontsize=9, fontweight='bold')
-        
-        ax.set_title('Comparación de Ahorro', 
-                    fontsize=14, 
-                    fontweight='bold',
-                    color=COLORES_AXA['azul_principal'])
-        ax.set_ylabel('Monto ($)', fontsize=12)
-        ax.grid(axis='y', alpha=0.3)
-        ax.set_axisbelow(True)
-        
-        ax.yaxis.set_major_formatter(plt.FuncFormatter(lambda x, p: f'${x:,.0f}'))
-        plt.xticks(rotation=15)
-        plt.tight_layout()
-        return fig
-        
+        return grafico_ahorro(metricas)
     except Exception as e:
         st.error(f"Error al crear gráfico de ahorro: {str(e)}")
         return None
 
+@trazado
 def generar_excel_reporte(metricas):
     """Genera archivo Excel con el reporte financiero"""
     try:
-        # Crear un buffer en memoria para el Excel
-        output = io.BytesIO()
-        
-        # Crear un Excel writer
-        with pd.ExcelWriter(output, engine='openpyxl') as writer:
-            # Hoja 1: Resumen Ejecutivo
-            datos_personales = st.session_state.asesoria_data['informacion_personal']
-            datos_familiares = st.session_state.asesoria_data['informacion_familiar']
-            
-            resumen_data = {
-                'SECCIÓN': [
-                    'INFORMACIÓN PERSONAL',
-                    'Nombre',
-                    'Teléfono',
-                    'Email',
-                    'Ocupación',
-                    'Agente',
-                    'Fecha Nacimiento',
-                    'Edad',
-                    'Estado Civil',
-                    '',
-                    'INFORMACIÓN FINANCIERA',
-                    'Ingreso Mensual',
-                    'Gastos Mensuales',
-                    'Ahorro Actual',
-                    'Deudas Totales',
-                    'Capacidad de Ahorro Mensual',
-                    'Porcentaje de Ahorro',
-                    '',
-                    'METAS FINANCIERAS',
-                    'Fondo Emergencia Recomendado',
-                    'Necesidad Protección Familiar',
-                    'Necesidad Retiro Total',
-                    'Necesidad Educación',
-                    'Ahorro Recomendado 10%',
-                    'Ahorro Recomendado 7%'
-                ],
-                'VALOR': [
-                    '',
-                    datos_personales.get('nombre', ''),
-                    datos_personales.get('telefono', ''),
-                    datos_personales.get('email', ''),
-                    datos_personales.get('ocupacion', ''),
-                    datos_personales.get('agente', ''),
-                    datos_familiares.get('fecha_nacimiento', ''),
-                    datos_familiares.get('edad', ''),
-                    datos_familiares.get('estado_civil', ''),
-                    '',
-                    '',
-                    f"${metricas['datos_basicos']['ingreso_mensual']:,.2f}",
-                    f"${metricas['datos_basicos']['gastos_mensuales']:,.2f}",
-                    f"${metricas['datos_basicos']['ahorro_actual']:,.2f}",
-                    f"${metricas['datos_basicos'].get('deudas_totales', 0):,.2f}",
-                    f"${metricas['ahorro_mensual']:,.2f}",
-                    f"{metricas['porcentaje_ahorro']:.1f}%",
-                    '',
-                    '',
-                    f"${metricas['fondo_emergencia_recomendado']:,.2f}",
-                    f"${metricas['necesidad_proteccion']:,.2f}",
-                    f"${metricas['necesidad_retiro_total']:,.2f}",
-                    f"${metricas['necesidad_educacion']:,.2f}",
-                    f"${metricas['ahorro_recomendado_10']:,.2f}",
-                    f"${metricas['ahorro_recomendado_7']:,.2f}"
-                ]
-            }
-            
-            df_resumen = pd.DataFrame(resumen_data)
-            df_resumen.to_excel(writer, sheet_name='RESUMEN EJECUTIVO', index=False)
-            
-            # Hoja 2: Detalle de Metas
-            metas_data = {
-                'Meta': ['Protección Familiar', 'Retiro', 'Educación', 'Proyecto Futuro'],
-                'Monto Requerido': [
-                    metricas['metas']['Protección'],
-                    metricas['metas']['Retiro'],
-                    metricas['metas']['Educación'],
-                    metricas['metas']['Proyecto']
-                ],
-                'Descripción': [
-                    f"{st.session_state.asesoria_data['objetivos'].get('meses_proteccion_familiar', 6)} meses de gastos",
-                    f"Ingreso mensual deseado: ${st.session_state.asesoria_data['objetivos'].get('ingreso_retiro_mensual', 0):,.2f}",
-                    f"Para {st.session_state.asesoria_data['informacion_familiar'].get('num_hijos', 0)} hijo(s)",
-                    st.session_state.asesoria_data['objetivos'].get('proyecto_futuro', 'No especificado')
-                ]
-            }
-            
-            df_metas = pd.DataFrame(metas_data)
-            df_metas.to_excel(writer, sheet_name='METAS DETALLADAS', index=False)
-            
-            # Hoja 3: Plan de Ahorro
-            plan_data = {
-                'Recomendación': [
-                    'Fondo de Emergencia',
-                    'Ahorro para Protección',
-                    'Ahorro para Retiro',
-                    'Ahorro para Educación',
-                    'Ahorro para Proyecto'
-                ],
-                'Monto Mensual Sugerido': [
-                    metricas['fondo_emergencia_recomendado'] / 12,
-                    metricas['metas']['Protección'] / 24 if metricas['metas']['Protección'] > 0 else 0,
-                    metricas['metas']['Retiro'] / (metricas['años_hasta_retiro'] * 12) if metricas['años_hasta_retiro'] > 0 else 0,
-                    metricas['metas']['Educación'] / 120 if metricas['metas']['Educación'] > 0 else 0,
-                    metricas['metas']['Proyecto'] / 60 if metricas['metas']['Proyecto'] > 0 else 0
-                ],
-                'Plazo (meses)': [12, 24, metricas['años_hasta_retiro'] * 12, 120, 60],
-                'Prioridad': ['Alta', 'Alta', 'Media', 'Media', 'Baja']
-            }
-            
-            df_plan = pd.DataFrame(plan_data)
-            df_plan.to_excel(writer, sheet_name='PLAN DE AHORRO', index=False)
-        
-        output.seek(0)
-        return output
-        
+        return reporte_excel(metricas, st.session_state.asesoria_data)
     except Exception as e:
         st.error(f"Error al generar Excel: {str(e)}")
         import traceback
         st.error(f"Detalle del error: {traceback.format_exc()}")
         return None
 
+@trazado
 def generar_pdf_reporte(metricas):
     """Genera un archivo PDF con el reporte financiero"""
     try:
-        # Verificar que todas las claves necesarias existan
-        keys_required = [
-            'necesidad_proyecto', 'necesidad_proteccion', 
-            'necesidad_retiro_total', 'necesidad_educacion'
-        ]
-        
-        for key in keys_required:
-            if key not in metricas:
-                metricas[key] = 0.0  # Valor por defecto
-        
-        # Verificar que 'metas' exista
-        if 'metas' not in metricas:
-            metricas['metas'] = {
-                'Protección': metricas.get('necesidad_proteccion', 0),
-                'Retiro': metricas.get('necesidad_retiro_total', 0),
-                'Educación': metricas.get('necesidad_educacion', 0),
-                'Proyecto': metricas.get('necesidad_proyecto', 0)
-            }
-        
-        # Crear un buffer en memoria para el PDF
-        buffer = io.BytesIO()
-        
-        # Crear el documento PDF
-        doc = SimpleDocTemplate(
-            buffer,
-            pagesize=letter,
-            rightMargin=72,
-            leftMargin=72,
-            topMargin=72,
-            bottomMargin=72
-        )
-        
-        # Estilos
-        styles = getSampleStyleSheet()
-        
-        # Crear estilos personalizados
-        title_style = ParagraphStyle(
-            'CustomTitle',
-            parent=styles['Heading1'],
-            fontSize=18,
-            textColor=colors.HexColor(COLORES_AXA['azul_principal']),
-            spaceAfter=30
-        )
-        
-        subtitle_style = ParagraphStyle(
-            'CustomSubtitle',
-            parent=styles['Heading2'],
-            fontSize=14,
-            textColor=colors.HexColor(COLORES_AXA['verde_oscuro']),
-            spaceAfter=15
-        )
-        
-        normal_style = styles['Normal']
-        
-        # Contenido del PDF
-        story = []
-        
-        # Título principal
-        nombre_cliente = st.session_state.asesoria_data['informacion_personal'].get('nombre', 'Cliente')
-        story.append(Paragraph(f"REPORTE FINANCIERO - {nombre_cliente.upper()}", title_style))
-        story.append(Paragraph(f"Fecha de generación: {datetime.now().strftime('%d/%m/%Y %H:%M')}", normal_style))
-        story.append(Spacer(1, 20))
-        
-        # Información Personal
-        story.append(Paragraph("INFORMACIÓN PERSONAL", subtitle_style))
-        
-        datos_personales = st.session_state.asesoria_data['informacion_personal']
-        datos_familiares = st.session_state.asesoria_data['informacion_familiar']
-        
-        personal_data = [
-            ["Nombre:", datos_personales.get('nombre', 'No especificado')],
-            ["Teléfono:", datos_personales.get('telefono', 'No especificado')],
-            ["Email:", datos_personales.get('email', 'No especificado')],
-            ["Ocupación:", datos_personales.get('ocupacion', 'No especificado')],
-            ["Agente:", datos_personales.get('agente', 'No especificado')],
-            ["Estado Civil:", datos_familiares.get('estado_civil', 'No especificado')],
-            ["Fecha Nacimiento:", datos_familiares.get('fecha_nacimiento', 'No especificado')],
-            ["Edad:", str(datos_familiares.get('edad', 'No especificado'))],
-            ["Hijos:", str(datos_familiares.get('num_hijos', 0))]
-        ]
-        
-        personal_table = Table(personal_data, colWidths=[2*inch, 4*inch])
-        personal_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (0, -1), colors.HexColor(COLORES_AXA['azul_claro'])),
-            ('TEXTCOLOR', (0, 0), (0, -1), colors.white),
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, -1), 10),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
-            ('TOPPADDING', (0, 0), (-1, -1), 6),
-            ('GRID', (0, 0), (-1, -1), 1, colors.grey)
-        ]))
-        
-        story.append(personal_table)
-        story.append(Spacer(1, 20))
-        
-        # Información Financiera
-        story.append(Paragraph("INFORMACIÓN FINANCIERA", subtitle_style))
-        
-        datos_financieros = st.session_state.asesoria_data['informacion_financiera']
-        financial_data = [
-            ["Ingreso Mensual Neto:", f"${datos_financieros.get('ingreso_mensual', 0):,.2f}"],
-            ["Gastos Mensuales Totales:", f"${datos_financieros.get('gastos_mensuales', 0):,.2f}"],
-            ["Ahorro Actual:", f"${datos_financieros.get('ahorro_actual', 0):,.2f}"],
-            ["Deudas Totales:", f"${datos_financieros.get('deudas_totales', 0):,.2f}"],
-            ["Capacidad de Ahorro Mensual:", f"${metricas.get('ahorro_mensual', 0):,.2f}"],
-            ["Porcentaje de Ahorro:", f"{metricas.get('porcentaje_ahorro', 0):.1f}%"],
-            ["Fondo Emergencia Recomendado:", f"${metricas.get('fondo_emergencia_recomendado', 0):,.2f}"]
-        ]
-        
-        financial_table = Table(financial_data, colWidths=[2.5*inch, 3.5*inch])
-        financial_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (0, -1), colors.HexColor(COLORES_AXA['verde_agua'])),
-            ('TEXTCOLOR', (0, 0), (0, -1), colors.white),
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, -1), 10),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
-            ('TOPPADDING', (0, 0), (-1, -1), 6),
-            ('GRID', (0, 0), (-1, -1), 1, colors.grey)
-        ]))
-        
-        story.append(financial_table)
-        story.append(Spacer(1, 20))
-        
-        # Metas Financieras - Usar metricas['metas'] en lugar de claves individuales
-        story.append(Paragraph("METAS FINANCIERAS", subtitle_style))
-        
-        objetivos = st.session_state.asesoria_data['objetivos']
-        metas_data = [
-            ["Categoría", "Monto Requerido", "Descripción"],
-            ["Protección Familiar", f"${metricas['metas']['Protección']:,.2f}", 
-             f"{objetivos.get('meses_proteccion_familiar', 6)} meses de gastos"],
-            ["Retiro", f"${metricas['metas']['Retiro']:,.2f}", 
-             f"Ingreso mensual deseado: ${objetivos.get('ingreso_retiro_mensual', 0):,.2f}"],
-            ["Educación", f"${metricas['metas']['Educación']:,.2f}", 
-             f"Para {datos_familiares.get('num_hijos', 0)} hijo(s)"],
-            ["Proyecto Futuro", f"${metricas['metas']['Proyecto']:,.2f}", 
-             objetivos.get('proyecto_futuro', 'No especificado')]
-        ]
-        
-        metas_table = Table(metas_data, colWidths=[1.5*inch, 2*inch, 3*inch])
-        metas_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor(COLORES_AXA['azul_principal'])),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, -1), 10),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
-            ('TOPPADDING', (0, 0), (-1, -1), 6),
-            ('GRID', (0, 0), (-1, -1), 1, colors.grey),
-            ('BACKGROUND', (0, 1), (0, -1), colors.HexColor(COLORES_AXA['azul_claro'])),
-            ('BACKGROUND', (1, 1), (1, -1), colors.HexColor(COLORES_AXA['verde_agua'])),
-            ('BACKGROUND', (2, 1), (2, -1), colors.HexColor('#f0f0f0'))
-        ]))
-        
-        story.append(metas_table)
-        story.append(Spacer(1, 20))
-        
-        # Plan de Ahorro - Usar claves individuales con valores por defecto
-        story.append(Paragraph("PLAN DE AHORRO RECOMENDADO", subtitle_style))
-        
-        años_hasta_retiro = metricas.get('años_hasta_retiro', 0)
-        plan_data = [
-            ["Recomendación", "Monto Mensual", "Plazo", "Prioridad"],
-            ["Fondo de Emergencia", f"${metricas.get('fondo_emergencia_recomendado', 0)/12:,.2f}", "12 meses", "Alta"],
-            ["Protección Familiar", f"${metricas.get('necesidad_proteccion', 0)/24:,.2f}" if metricas.get('necesidad_proteccion', 0) > 0 else "$0.00", "24 meses", "Alta"],
-            ["Retiro", f"${metricas.get('necesidad_retiro_total', 0)/(años_hasta_retiro*12):,.2f}" if años_hasta_retiro > 0 else "$0.00", f"{años_hasta_retiro*12} meses", "Media"],
-            ["Educación", f"${metricas.get('necesidad_educacion', 0)/120:,.2f}" if metricas.get('necesidad_educacion', 0) > 0 else "$0.00", "120 meses", "Media"],
-            ["Proyecto", f"${metricas.get('necesidad_proyecto', 0)/60:,.2f}" if metricas.get('necesidad_proyecto', 0) > 0 else "$0.00", "60 meses", "Baja"]
-        ]
-        
-        plan_table = Table(plan_data, colWidths=[1.5*inch, 1.5*inch, 1.2*inch, 1.2*inch])
-        plan_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor(COLORES_AXA['verde_oscuro'])),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, -1), 10),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
-            ('TOPPADDING', (0, 0), (-1, -1), 6),
-            ('GRID', (0, 0), (-1, -1), 1, colors.grey),
-            ('BACKGROUND', (3, 1), (3, 1), colors.HexColor('#ffcccc')),  # Alta - rojo claro
-            ('BACKGROUND', (3, 2), (3, 2), colors.HexColor('#ffcccc')),  # Alta - rojo claro
-            ('BACKGROUND', (3, 3), (3, 3), colors.HexColor('#ffffcc')),  # Media - amarillo claro
-            ('BACKGROUND', (3, 4), (3, 4), colors.HexColor('#ffffcc')),  # Media - amarillo claro
-            ('BACKGROUND', (3, 5), (3, 5), colors.HexColor('#ccffcc'))   # Baja - verde claro
-        ]))
-        
-        story.append(plan_table)
-        story.append(Spacer(1, 30))
-        
-        # Recomendaciones finales
-        story.append(Paragraph("RECOMENDACIONES GENERALES", subtitle_style))
-        
-        recomendaciones = [
-            "1. Establecer un fondo de emergencia equivalente a 6 meses de gastos",
-            "2. Considerar un seguro de vida para proteger a la familia",
-            "3. Iniciar un plan de ahorro para el retiro lo antes posible",
-            "4. Diversificar las inversiones para reducir riesgos",
-            "5. Revisar periódicamente el plan financiero (al menos cada 6 meses)",
-            "6. Considerar instrumentos de inversión acordes al perfil de riesgo"
-        ]
-        
-        for rec in recomendaciones:
-            story.append(Paragraph(rec, normal_style))
-            story.append(Spacer(1, 5))
-        
-        story.append(Spacer(1, 20))
-        
-        # Pie de página
-        footer = Paragraph(
-            f"Reporte generado por Sistema de Asesoría Financiera Rizkora • {datetime.now().strftime('%d/%m/%Y')} • Página 1 de 1",
-            ParagraphStyle(
-                'Footer',
-                parent=styles['Normal'],
-                fontSize=8,
-                textColor=colors.grey,
-                alignment=1
-            )
-        )
-        story.append(footer)
-        
-        # Construir el PDF
-        doc.build(story)
-        
-        # Obtener los datos del buffer
-        buffer.seek(0)
-        return buffer
-        
+        return reporte_pdf(metricas, st.session_state.asesoria_data)
     except Exception as e:
         st.error(f"Error al generar PDF: {str(e)}")
         import traceback
@@ -2404,6 +2018,7 @@ def generar_pdf_reporte(metricas):
         return None
 
 # ---- FUNCIONES PARA PESTAÑA OPERACIÓN ----
+@trazado
 def mostrar_operacion(df_operacion):
     st.header("💰 Operación - Gastos Operacionales RIZKORA")
 
@@ -2418,10 +2033,12 @@ def mostrar_operacion(df_operacion):
     # Mostrar estadísticas generales
     if not df_operacion.empty:
         col_stats1, col_stats2, col_stats3 = st.columns(3)
+        # Sumas en centavos para que los totales sean exactos
+        centavos_operacion = a_centavos(df_operacion['Monto']).fillna(0)
         
         with col_stats1:
             try:
-                total_gastos = df_operacion['Monto'].sum()
+                total_gastos = centavos_operacion.sum() / 100
                 st.metric("Total Gastos", f"${total_gastos:,.2f}")
             except:
                 st.metric("Total Gastos", "N/A")
@@ -2431,7 +2048,7 @@ def mostrar_operacion(df_operacion):
                 # Calcular gastos del mes actual
                 df_operacion['Fecha DT'] = pd.to_datetime(df_operacion['Fecha'], dayfirst=True, errors='coerce')
                 mes_actual = datetime.now().month
-                gastos_mes = df_operacion[df_operacion['Fecha DT'].dt.month == mes_actual]['Monto'].sum()
+                gastos_mes = centavos_operacion[df_operacion['Fecha DT'].dt.month == mes_actual].sum() / 100
                 st.metric("Gastos del Mes", f"${gastos_mes:,.2f}")
             except:
                 st.metric("Gastos del Mes", "N/A")
@@ -2439,7 +2056,7 @@ def mostrar_operacion(df_operacion):
         with col_stats3:
             try:
                 # Calcular gastos deducibles
-                gastos_deducibles = df_operacion[df_operacion['Deducible'] == 'Sí']['Monto'].sum()
+                gastos_deducibles = centavos_operacion[df_operacion['Deducible'] == 'Sí'].sum() / 100
                 st.metric("Gastos Deducibles", f"${gastos_deducibles:,.2f}")
             except:
                 st.metric("Gastos Deducibles", "N/A")
@@ -2535,7 +2152,7 @@ def mostrar_operacion(df_operacion):
             monto = st.number_input(
                 "Monto ($)*", 
                 min_value=0.0,
-                value=float(monto_val) if monto_val else 0.0,
+                value=(monto_a_centavos(monto_val) or 0) / 100,
                 step=0.01,
                 format="%.2f"
             )
@@ -2695,28 +2312,24 @@ def mostrar_operacion(df_operacion):
         except:
             pass
         
-        # Formatear montos para mejor visualización
-        def formatear_monto(monto):
-            try:
-                return f"${float(monto):,.2f}"
-            except:
-                return str(monto)
-        
-        df_mostrar['Monto Formateado'] = df_mostrar['Monto'].apply(formatear_monto)
+        # Formatear montos para mejor visualización (los que no son número se muestran tal cual)
+        df_mostrar['Monto Formateado'] = formatear_montos(df_mostrar['Monto'], simbolo="$", vacio=None).fillna(df_mostrar['Monto'].astype(str))
         
         # Columnas a mostrar
         columnas_mostrar = ['Fecha', 'Concepto', 'Proveedor', 'Monto Formateado', 'Forma de Pago', 'Deducible', 'Responsable del pago']
         columnas_disponibles = [col for col in columnas_mostrar if col in df_mostrar.columns]
         
         # Aplicar estilo para resaltar gastos deducibles
-        def style_deducible(val):
-            if val == 'Sí':
-                return 'background-color: #d4edda; color: #155724; font-weight: bold;'  # Verde
-            else:
-                return 'background-color: #f8d7da; color: #721c24;'  # Rojo
+        def style_deducible(columna):
+            # Una sola llamada para toda la columna
+            return np.where(
+                columna.astype(str).to_numpy() == 'Sí',
+                'background-color: #d4edda; color: #155724; font-weight: bold;',  # Verde
+                'background-color: #f8d7da; color: #721c24;'  # Rojo
+            )
         
         try:
-            styled_df = df_mostrar[columnas_disponibles].style.applymap(
+            styled_df = df_mostrar[columnas_disponibles].style.apply(
                 style_deducible, 
                 subset=['Deducible']
             )
@@ -2730,16 +2343,17 @@ def mostrar_operacion(df_operacion):
         try:
             # Estadísticas por concepto
             col_stats1, col_stats2 = st.columns(2)
+            centavos_operacion = a_centavos(df_operacion['Monto']).fillna(0)
             
             with col_stats1:
                 st.write("**Gastos por Concepto:**")
-                gastos_por_concepto = df_operacion.groupby('Concepto')['Monto'].sum().sort_values(ascending=False)
+                gastos_por_concepto = (centavos_operacion.groupby(df_operacion['Concepto']).sum() / 100).sort_values(ascending=False)
                 for concepto, total in gastos_por_concepto.items():
                     st.write(f"- {concepto}: ${total:,.2f}")
             
             with col_stats2:
                 st.write("**Gastos por Forma de Pago:**")
-                gastos_por_pago = df_operacion.groupby('Forma de Pago')['Monto'].sum().sort_values(ascending=False)
+                gastos_por_pago = (centavos_operacion.groupby(df_operacion['Forma de Pago']).sum() / 100).sort_values(ascending=False)
                 for forma_pago, total in gastos_por_pago.items():
                     st.write(f"- {forma_pago}: ${total:,.2f}")
             
@@ -2747,7 +2361,7 @@ def mostrar_operacion(df_operacion):
             st.write("**Gastos por Mes (Últimos 6 meses):**")
             try:
                 df_operacion['Mes'] = df_operacion['Fecha DT'].dt.strftime('%Y-%m')
-                ultimos_6_meses = df_operacion.groupby('Mes')['Monto'].sum().sort_index(ascending=False).head(6)
+                ultimos_6_meses = (centavos_operacion.groupby(df_operacion['Mes']).sum() / 100).sort_index(ascending=False).head(6)
                 for mes, total in ultimos_6_meses.items():
                     st.write(f"- {mes}: ${total:,.2f}")
             except:
@@ -2762,6 +2376,7 @@ def mostrar_operacion(df_operacion):
 # ---- Funciones para cada pestaña (completas) ----
 
 # 1. Prospectos - SOLUCIÓN DEFINITIVA
+@trazado
 def mostrar_prospectos(df_prospectos, df_polizas):
     st.header("👥 Gestión de Prospectos")
 
@@ -2778,11 +2393,8 @@ def mostrar_prospectos(df_prospectos, df_polizas):
 
     # --- Selector para editar prospecto existente ---
     if not df_prospectos.empty:
-        prospectos_lista = df_prospectos["Nombre/Razón Social"].dropna().tolist()
-        prospecto_seleccionado = st.selectbox(
-            "Seleccionar Prospecto para editar",
-            [""] + prospectos_lista,
-            key="select_editar_prospecto"
+        prospecto_seleccionado = selector_busqueda(
+            "Seleccionar Prospecto para editar", "Prospectos", key="select_editar_prospecto"
         )
 
         # Botones para cargar datos o limpiar selección
@@ -3052,6 +2664,7 @@ def mostrar_prospectos(df_prospectos, df_polizas):
                     # ACTUALIZAR prospecto existente
                     index = df_prospectos[df_prospectos["Nombre/Razón Social"] == st.session_state.prospecto_editando].index
                     if not index.empty:
+                        admitir_categorias(df_prospectos, nuevo_prospecto)
                         for key, value in nuevo_prospecto.items():
                             df_prospectos.loc[index, key] = value
                         mensaje = "✅ Prospecto actualizado correctamente"
@@ -3088,10 +2701,7 @@ def mostrar_prospectos(df_prospectos, df_polizas):
         ]
         columnas_disponibles = [col for col in columnas_mostrar if col in df_prospectos.columns]
 
-        if columnas_disponibles:
-            st.dataframe(df_prospectos[columnas_disponibles], use_container_width=True)
-        else:
-            st.dataframe(df_prospectos, use_container_width=True)
+        tabla_paginada(df_prospectos[columnas_disponibles or list(df_prospectos.columns)], key="tabla_prospectos")
 
         # Estadísticas
         st.subheader("📊 Estadísticas")
@@ -3116,13 +2726,13 @@ def mostrar_prospectos(df_prospectos, df_polizas):
         st.info("No hay prospectos registrados")
 
 # 2. Seguimiento
+@trazado
 def mostrar_seguimiento(df_prospectos, df_seguimiento):
     st.header("📞 Seguimiento de Prospectos")
 
     # Selector de prospecto
     if not df_prospectos.empty:
-        prospectos_lista = df_prospectos["Nombre/Razón Social"].dropna().tolist()
-        prospecto_seleccionado = st.selectbox("Seleccionar Prospecto", [""] + prospectos_lista, key="seguimiento_prospecto")
+        prospecto_seleccionado = selector_busqueda("Seleccionar Prospecto", "Prospectos", key="seguimiento_prospecto")
 
         if prospecto_seleccionado:
             # Buscar seguimientos existentes
@@ -3189,16 +2799,16 @@ def mostrar_seguimiento(df_prospectos, df_seguimiento):
     # Mostrar todos los seguimientos
     if not df_seguimiento.empty:
         st.subheader("Todos los Seguimientos")
-        st.dataframe(df_seguimiento, use_container_width=True)
+        tabla_paginada(df_seguimiento, key="tabla_seguimientos")
 
 # 3. Registro de Cliente (Primera Póliza)
+@trazado
 def mostrar_registro_cliente(df_prospectos, df_polizas):
     st.header("👤 Registro de Cliente (Primera Póliza)")
 
     # Seleccionar prospecto
     if not df_prospectos.empty:
-        prospectos_lista = df_prospectos["Nombre/Razón Social"].dropna().tolist()
-        prospecto_seleccionado = st.selectbox("Seleccionar Prospecto", [""] + prospectos_lista, key="registro_cliente")
+        prospecto_seleccionado = selector_busqueda("Seleccionar Prospecto", "Prospectos", key="registro_cliente")
 
         if prospecto_seleccionado:
             # Cargar datos del prospecto seleccionado
@@ -3347,6 +2957,7 @@ def mostrar_registro_cliente(df_prospectos, df_polizas):
             st.info("No hay prospectos disponibles para convertir en clientes")
 
 # 4. Consulta de Clientes
+@trazado
 def mostrar_consulta_clientes(df_polizas):
     st.header("🔍 Consulta de Clientes")
 
@@ -3362,7 +2973,7 @@ def mostrar_consulta_clientes(df_polizas):
         return
 
     # Seleccionar cliente
-    cliente_seleccionado = st.selectbox("Seleccionar Cliente", [""] + clientes_unicos, key="consulta_cliente")
+    cliente_seleccionado = selector_busqueda("Seleccionar Cliente", "Polizas", key="consulta_cliente")
 
     if cliente_seleccionado:
         # Filtrar pólizas del cliente seleccionado
@@ -3478,6 +3089,7 @@ def mostrar_consulta_clientes(df_polizas):
                             st.error(fecha_error)
                         else:
                             # Actualizar todas las pólizas del cliente con los nuevos datos
+                            admitir_categorias(df_polizas, {"Tipo Persona": tipo_persona_edit, "Promoción": promocion})
                             for index in polizas_cliente.index:
                                 df_polizas.loc[index, "Tipo Persona"] = tipo_persona_edit
                                 df_polizas.loc[index, "RFC"] = rfc_edit
@@ -3818,23 +3430,28 @@ def mostrar_consulta_clientes(df_polizas):
                                 mask = df_polizas['No. Póliza'] == poliza_seleccionada
                                 
                                 # Actualizar todos los campos
-                                df_polizas.loc[mask, 'Producto'] = producto
-                                df_polizas.loc[mask, 'Inicio Vigencia'] = inicio_vigencia
-                                df_polizas.loc[mask, 'Fin Vigencia'] = fin_vigencia
-                                df_polizas.loc[mask, 'RFC'] = rfc
-                                df_polizas.loc[mask, 'Forma de Pago'] = forma_pago
-                                df_polizas.loc[mask, 'Banco'] = banco
-                                df_polizas.loc[mask, 'Periodicidad'] = periodicidad
-                                df_polizas.loc[mask, 'Prima Total Emitida'] = prima_total_emitida
-                                df_polizas.loc[mask, 'Prima Neta'] = prima_neta
-                                df_polizas.loc[mask, 'Primer Pago'] = primer_pago
-                                df_polizas.loc[mask, 'Pagos Subsecuentes'] = pagos_subsecuentes
-                                df_polizas.loc[mask, 'Aseguradora'] = aseguradora
-                                df_polizas.loc[mask, '% Comisión'] = comision_porcentaje
-                                df_polizas.loc[mask, 'Estado'] = estado
-                                df_polizas.loc[mask, 'Moneda'] = moneda
-                                df_polizas.loc[mask, 'Clave de Emisión'] = clave_emision
-                                df_polizas.loc[mask, 'Promoción'] = promocion
+                                cambios = {
+                                    'Producto': producto,
+                                    'Inicio Vigencia': inicio_vigencia,
+                                    'Fin Vigencia': fin_vigencia,
+                                    'RFC': rfc,
+                                    'Forma de Pago': forma_pago,
+                                    'Banco': banco,
+                                    'Periodicidad': periodicidad,
+                                    'Prima Total Emitida': prima_total_emitida,
+                                    'Prima Neta': prima_neta,
+                                    'Primer Pago': primer_pago,
+                                    'Pagos Subsecuentes': pagos_subsecuentes,
+                                    'Aseguradora': aseguradora,
+                                    '% Comisión': comision_porcentaje,
+                                    'Estado': estado,
+                                    'Moneda': moneda,
+                                    'Clave de Emisión': clave_emision,
+                                    'Promoción': promocion,
+                                }
+                                admitir_categorias(df_polizas, cambios)
+                                for columna, valor in cambios.items():
+                                    df_polizas.loc[mask, columna] = valor
                                 
                                 if guardar_datos(df_polizas=df_polizas):
                                     st.success("✅ Póliza actualizada correctamente")
@@ -3853,6 +3470,7 @@ def mostrar_consulta_clientes(df_polizas):
                     if st.form_submit_button("💾 Actualizar Estado"):
                         # Actualizar el estado en el DataFrame
                         mask = (df_polizas['No. Póliza'] == poliza_seleccionada)
+                        admitir_categorias(df_polizas, {'Estado': nuevo_estado})
                         df_polizas.loc[mask, 'Estado'] = nuevo_estado
                         
                         if guardar_datos(df_polizas=df_polizas):
@@ -3862,13 +3480,13 @@ def mostrar_consulta_clientes(df_polizas):
                             st.error("❌ Error al actualizar el estado")
 
 # 5. Póliza Nueva (para clientes existentes) - CON VALIDACIÓN MEJORADA
+@trazado
 def mostrar_poliza_nueva(df_prospectos, df_polizas):
     st.header("🆕 Póliza Nueva para Cliente Existente")
 
     # Seleccionar cliente existente
     if not df_polizas.empty and "Nombre/Razón Social" in df_polizas.columns:
-        clientes_unicos = df_polizas["Nombre/Razón Social"].dropna().unique().tolist()
-        cliente_seleccionado = st.selectbox("Seleccionar Cliente", [""] + clientes_unicos, key="cliente_existente")
+        cliente_seleccionado = selector_busqueda("Seleccionar Cliente", "Polizas", key="cliente_existente")
 
         if cliente_seleccionado:
             # Mostrar pólizas existentes del cliente
@@ -3989,35 +3607,13 @@ def mostrar_poliza_nueva(df_prospectos, df_polizas):
                         errores.append(f"{campo_nombre} es obligatorio")
 
                 # Validar que los campos numéricos tengan valores válidos
-                try:
-                    if prima_total_emitida and prima_total_emitida.strip():
-                        float(prima_total_emitida.replace(',', ''))
-                except ValueError:
-                    errores.append("Prima Total Emitida debe ser un número válido")
-                
-                try:
-                    if prima_neta and prima_neta.strip():
-                        float(prima_neta.replace(',', ''))
-                except ValueError:
-                    errores.append("Prima Neta debe ser un número válido")
-                
-                try:
-                    if primer_pago and primer_pago.strip():
-                        float(primer_pago.replace(',', ''))
-                except ValueError:
-                    errores.append("Primer Pago debe ser un número válido")
-                
-                try:
-                    if pagos_subsecuentes and pagos_subsecuentes.strip():
-                        float(pagos_subsecuentes.replace(',', ''))
-                except ValueError:
-                    errores.append("Pagos Subsecuentes debe ser un número válido")
-                
-                try:
-                    if comision_porcentaje and comision_porcentaje.strip():
-                        float(comision_porcentaje.replace(',', ''))
-                except ValueError:
-                    errores.append("% Comisión debe ser un número válido")
+                for campo_nombre, campo_valor in [
+                    ("Prima Total Emitida", prima_total_emitida), ("Prima Neta", prima_neta),
+                    ("Primer Pago", primer_pago), ("Pagos Subsecuentes", pagos_subsecuentes),
+                    ("% Comisión", comision_porcentaje),
+                ]:
+                    if campo_valor and campo_valor.strip() and monto_a_centavos(campo_valor) is None:
+                        errores.append(f"{campo_nombre} debe ser un número válido")
 
                 submitted_nueva_poliza = st.form_submit_button("💾 Guardar Nueva Póliza")
                 if submitted_nueva_poliza:
@@ -4078,109 +3674,68 @@ def mostrar_poliza_nueva(df_prospectos, df_polizas):
             st.info("No hay clientes registrados")
 
 # 6. Renovaciones (antes Próximos Vencimientos)
+@trazado
 def mostrar_renovaciones(df_polizas):
     st.header("🔄 Renovaciones (Pólizas por Vencer)")
 
     if st.button("🔄 Actualizar Lista", key="actualizar_renovaciones"):
-        st.cache_data.clear()
+        invalidar_cache()
 
     if df_polizas.empty:
         st.info("No hay pólizas registradas")
         return
 
-    # Crear una copia para no modificar el original
-    df = df_polizas.copy()
-    
-    # Limpiar y convertir fechas de manera segura
-    df_clean = df.copy()
-    
-    # Función para convertir fecha de manera segura
-    def safe_date_conversion(date_str):
-        if pd.isna(date_str) or date_str == "" or date_str is None:
-            return None
-        
-        date_str = str(date_str).strip()
-        
-        # Lista de formatos a probar
-        formats = [
-            "%d/%m/%Y",  # 31/12/2023
-            "%Y-%m-%d",  # 2023-12-31
-            "%d-%m-%Y",  # 31-12-2023
-            "%m/%d/%Y",  # 12/31/2023 (formato americano)
-            "%Y/%m/%d",  # 2023/12/31
-        ]
-        
-        for fmt in formats:
-            try:
-                return datetime.strptime(date_str, fmt).date()
-            except ValueError:
-                continue
-        
-        # Si ningún formato funciona, usar pandas como último recurso
-        try:
-            result = pd.to_datetime(date_str, dayfirst=True, errors='coerce')
-            if not pd.isna(result):
-                return result.date()
-        except:
-            pass
-        
-        return None
-
-    # Aplicar conversión segura
-    df_clean['Fin_Vigencia_Date'] = df_clean['Fin Vigencia'].apply(safe_date_conversion)
-    
-    # Filtrar solo las que tienen fecha válida
-    df_valid = df_clean[df_clean['Fin_Vigencia_Date'].notna()]
-    
-    if df_valid.empty:
-        st.info("No hay pólizas con fechas de vencimiento válidas")
+    # Índice de vencimientos de pólizas vigentes (se construye una vez por versión de los datos)
+    indice = obtener_indice_vencimientos()
+    if not len(indice):
+        st.info("No hay pólizas vigentes con fechas de vencimiento válidas")
         return
 
-    # Calcular días restantes
-    hoy = datetime.now().date()
-    df_valid['Dias_Restantes'] = df_valid['Fin_Vigencia_Date'].apply(
-        lambda x: (x - hoy).days if x else None
-    )
-    
-    # Filtrar por estado VIGENTE si existe la columna
-    if 'Estado' in df_valid.columns:
-        df_vigentes = df_valid[df_valid['Estado'].astype(str).str.upper() == 'VIGENTE']
-    else:
-        df_vigentes = df_valid
-    
-    # Filtrar por rango de días (45-60 días para renovaciones)
-    df_renovaciones = df_vigentes[
-        (df_vigentes['Dias_Restantes'] >= 45) & 
-        (df_vigentes['Dias_Restantes'] <= 60)
-    ]
+    mostrar_calendario_renovaciones()
+
+    # Ventana de renovación configurable
+    col_ventana, col_desde, col_hasta = st.columns([2, 1, 1])
+    with col_ventana:
+        opciones_ventana = list(VENTANAS_RENOVACION) + ["Personalizada"]
+        ventana = st.selectbox("Ventana de renovación", opciones_ventana,
+                               index=opciones_ventana.index(VENTANA_RENOVACION_POR_DEFECTO), key="ventana_renovaciones")
+    desde_defecto, hasta_defecto = VENTANAS_RENOVACION.get(ventana, VENTANAS_RENOVACION[VENTANA_RENOVACION_POR_DEFECTO])
+    with col_desde:
+        desde_dias = st.number_input("Desde (días)", value=desde_defecto, step=1,
+                                     disabled=ventana != "Personalizada", key="renovaciones_desde")
+    with col_hasta:
+        hasta_dias = st.number_input("Hasta (días)", value=hasta_defecto, step=1,
+                                     disabled=ventana != "Personalizada", key="renovaciones_hasta")
+    if ventana != "Personalizada":
+        desde_dias, hasta_dias = desde_defecto, hasta_defecto
+    desde_dias, hasta_dias = int(desde_dias), int(hasta_dias)
+
+    df_renovaciones = indice.ventana(desde_dias, hasta_dias)
 
     if df_renovaciones.empty:
-        st.info("No hay pólizas por renovar en los próximos 45-60 días")
+        st.info(f"No hay pólizas por renovar en los próximos {desde_dias}-{hasta_dias} días")
         
         # Mostrar algunas estadísticas
-        if not df_vigentes.empty and 'Dias_Restantes' in df_vigentes.columns:
-            st.subheader("Estadísticas de Pólizas Vigentes")
-            col1, col2, col_stats3 = st.columns(3)
-            
-            with col1:
-                por_renovar = len(df_vigentes[df_vigentes['Dias_Restantes'] < 45])
-                st.metric("Por renovar (<45 días)", por_renovar)
-            
-            with col2:
-                renovaciones_lejanas = len(df_vigentes[df_vigentes['Dias_Restantes'] > 60])
-                st.metric("Renovaciones lejanas (>60 días)", renovaciones_lejanas)
-            
-            with col_stats3:
-                total_vigentes = len(df_vigentes)
-                st.metric("Total Vigentes", total_vigentes)
+        st.subheader("Estadísticas de Pólizas Vigentes")
+        col1, col2, col_stats3 = st.columns(3)
+        
+        with col1:
+            por_renovar = indice.contar(None, desde_dias - 1)
+            st.metric(f"Por renovar (<{desde_dias} días)", por_renovar)
+        
+        with col2:
+            renovaciones_lejanas = indice.contar(hasta_dias + 1, None)
+            st.metric(f"Renovaciones lejanas (>{hasta_dias} días)", renovaciones_lejanas)
+        
+        with col_stats3:
+            total_vigentes = len(indice)
+            st.metric("Total Vigentes", total_vigentes)
         
         return
 
     # Preparar datos para mostrar
     df_mostrar = df_renovaciones.copy()
-    df_mostrar['Fin_Vigencia_Formateada'] = df_mostrar['Fin_Vigencia_Date'].apply(
-        lambda x: x.strftime('%d/%m/%Y') if x else 'Fecha inválida'
-    )
+    df_mostrar['Fin_Vigencia_Formateada'] = df_mostrar['Fin_Vigencia_Date'].dt.strftime('%d/%m/%Y')
 
     # Columnas a mostrar
     columnas_mostrar = ['Nombre/Razón Social', 'No. Póliza', 'Producto', 'Fin_Vigencia_Formateada', 'Dias_Restantes']
@@ -4193,16 +3748,17 @@ def mostrar_renovaciones(df_polizas):
     })
     
     # Aplicar estilo para resaltar por días restantes
-    def style_dias_renovacion(val):
-        if val <= 50:
-            return 'background-color: #ffcccc; color: #cc0000; font-weight: bold;'
-        elif val <= 55:
-            return 'background-color: #fff0cc; color: #cc8800;'
-        else:
-            return 'background-color: #e6ffe6; color: #006600;'
+    def style_dias_renovacion(columna):
+        dias = pd.to_numeric(columna, errors='coerce').to_numpy(dtype=float)
+        return np.select(
+            [dias <= 50, dias <= 55],
+            ['background-color: #ffcccc; color: #cc0000; font-weight: bold;',
+             'background-color: #fff0cc; color: #cc8800;'],
+            default='background-color: #e6ffe6; color: #006600;'
+        )
     
     try:
-        styled_df = df_display.style.applymap(
+        styled_df = df_display.style.apply(
             style_dias_renovacion, 
             subset=['Días para Renovación']
         )
@@ -4210,50 +3766,102 @@ def mostrar_renovaciones(df_polizas):
     except Exception:
         st.dataframe(df_display, use_container_width=True)
 
-    # Detalles de póliza seleccionada
+    mostrar_detalle_renovacion(df_renovaciones)
+
+@st.fragment
+@trazado
+def mostrar_detalle_renovacion(df_renovaciones):
+    """Detalle de una póliza por renovar; cambiar la selección sólo vuelve a ejecutar esta sección"""
     st.subheader("Detalles para Renovación")
     
     if 'No. Póliza' in df_renovaciones.columns:
         polizas_lista = df_renovaciones['No. Póliza'].astype(str).tolist()
-        
+    
         if polizas_lista:
             poliza_seleccionada = st.selectbox(
                 "Seleccionar Póliza para ver detalles", 
                 [""] + polizas_lista, 
                 key="detalle_poliza_renovaciones"
             )
-            
+    
             if poliza_seleccionada:
                 # Encontrar la póliza seleccionada
                 poliza_mask = df_renovaciones['No. Póliza'].astype(str) == poliza_seleccionada
                 if poliza_mask.any():
-                    poliza_detalle = df_renovaciones[poliza_mask].iloc[0]
-                    
+                    poliza = Poliza.desde_dataframe(df_renovaciones[poliza_mask].head(1))[0]
+                    dias_restantes = df_renovaciones.at[poliza.indice, 'Dias_Restantes']
+    
                     col1, col2 = st.columns(2)
-                    
+    
                     with col1:
                         st.write("**Información General:**")
-                        st.write(f"**Cliente:** {poliza_detalle.get('Nombre/Razón Social', 'N/A')}")
-                        st.write(f"**No. Póliza:** {poliza_detalle.get('No. Póliza', 'N/A')}")
-                        st.write(f"**Producto:** {poliza_detalle.get('Producto', 'N/A')}")
-                        st.write(f"**Aseguradora:** {poliza_detalle.get('Aseguradora', 'N/A')}")
-                        st.write(f"**Estado:** {poliza_detalle.get('Estado', 'N/A')}")
-                        st.write(f"**Días para Renovación:** {poliza_detalle.get('Dias_Restantes', 'N/A')}")
-                    
+                        st.write(f"**Cliente:** {poliza.nombre or 'N/A'}")
+                        st.write(f"**No. Póliza:** {poliza.no_poliza or 'N/A'}")
+                        st.write(f"**Producto:** {poliza.producto or 'N/A'}")
+                        st.write(f"**Aseguradora:** {poliza.aseguradora or 'N/A'}")
+                        st.write(f"**Estado:** {poliza.estado or 'N/A'}")
+                        st.write(f"**Días para Renovación:** {dias_restantes}")
+    
                     with col2:
                         st.write("**Fechas:**")
-                        st.write(f"**Inicio Vigencia:** {poliza_detalle.get('Inicio Vigencia', 'N/A')}")
-                        st.write(f"**Fin Vigencia:** {poliza_detalle.get('Fin_Vigencia_Date', 'N/A')}")
-                        
+                        st.write(f"**Inicio Vigencia:** {poliza.inicio_vigencia or 'N/A'}")
+                        st.write(f"**Fin Vigencia:** {df_renovaciones.at[poliza.indice, 'Fin_Vigencia_Date'].strftime('%d/%m/%Y')}")
+    
                         st.write("**Datos de Contacto:**")
-                        st.write(f"**Teléfono:** {poliza_detalle.get('Teléfono', 'N/A')}")
-                        st.write(f"**Correo:** {poliza_detalle.get('Correo', 'N/A')}")
-                        st.write(f"**Contacto:** {poliza_detalle.get('Contacto', 'N/A')}")
-                        
-                        if poliza_detalle.get('Dias_Restantes', 0) <= 50:
+                        st.write(f"**Teléfono:** {poliza.telefono or 'N/A'}")
+                        st.write(f"**Correo:** {poliza.correo or 'N/A'}")
+                        st.write(f"**Contacto:** {poliza.contacto or 'N/A'}")
+    
+                        if dias_restantes <= 50:
                             st.warning("⚠️ Esta póliza está próxima a vencer. Contactar al cliente para renovación.")
 
+@st.cache_resource(max_entries=4, ttl=300)
+def _indice_vencimientos_revision(firma):
+    """Índice de vencimientos para una versión de los datos (sólo lectura, compartido entre sesiones)"""
+    _, df_polizas, _, _, _ = _cargar_datos_revision(firma)
+    return IndiceVencimientos(df_polizas)
+
+def obtener_indice_vencimientos():
+    return _indice_vencimientos_revision(firma_datos())
+
+@st.cache_resource(max_entries=4, ttl=300)
+def _calendario_renovaciones_revision(firma, hoy):
+    """Calendario de renovaciones para una versión de los datos y un día"""
+    return CalendarioRenovaciones(_indice_vencimientos_revision(firma), pd.Timestamp(hoy))
+
+@trazado
+def mostrar_calendario_renovaciones():
+    """
+    Carga de renovaciones por semana o mes con detalle de cualquier periodo
+    """
+    with st.expander("📅 Calendario de Renovaciones"):
+        calendario = _calendario_renovaciones_revision(firma_datos(), datetime.now().strftime("%Y-%m-%d"))
+
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            frecuencia = st.radio("Agrupar por", list(FRECUENCIAS_CALENDARIO), horizontal=True, key="calendario_frecuencia")
+        with col2:
+            dimension = st.selectbox("Desglose", DIMENSIONES_CALENDARIO, key="calendario_dimension")
+        with col3:
+            periodos = st.number_input("Periodos a mostrar", min_value=1, max_value=104,
+                                       value=12 if frecuencia == "Semana" else 6, key=f"calendario_periodos_{frecuencia}")
+
+        histograma = calendario.histograma(frecuencia, dimension, int(periodos))
+        if histograma.empty:
+            st.info("No hay vencimientos próximos de pólizas vigentes")
+            return
+        st.bar_chart(histograma)
+
+        periodo = st.selectbox(f"Ver pólizas de la {frecuencia.lower()}" if frecuencia == "Semana" else "Ver pólizas del mes",
+                               [""] + list(histograma.index), key=f"calendario_detalle_{frecuencia}")
+        if periodo:
+            detalle = calendario.detalle(frecuencia, periodo)
+            columnas = [col for col in ['Nombre/Razón Social', 'No. Póliza', 'Producto', 'Aseguradora',
+                                        'Clave de Emisión', 'Fin Vigencia'] if col in detalle.columns]
+            st.dataframe(detalle[columnas], use_container_width=True, hide_index=True)
+
 # 7. Cobranza (versión actualizada que incluye recibos vencidos)
+@trazado
 def mostrar_cobranza(df_polizas, df_cobranza):
     st.header("💰 Cobranza")
 
@@ -4261,7 +3869,7 @@ def mostrar_cobranza(df_polizas, df_cobranza):
     col_btn1, col_btn2 = st.columns(2)
     with col_btn1:
         if st.button("🔄 Recalcular Cobranza (Incluye Vencidos)", use_container_width=True):
-            df_cobranza_proxima = calcular_cobranza()
+            df_cobranza_proxima = calcular_cobranza(df_polizas, df_cobranza)
             if not df_cobranza_proxima.empty:
                 # Combinar con datos existentes
                 if df_cobranza is not None and not df_cobranza.empty:
@@ -4290,7 +3898,7 @@ def mostrar_cobranza(df_polizas, df_cobranza):
             st.rerun()
 
     # Calcular cobranza de los próximos 60 días (incluye vencidos)
-    df_cobranza_proxima = calcular_cobranza()
+    df_cobranza_proxima = calcular_cobranza(df_polizas, df_cobranza)
 
     if df_cobranza_proxima.empty and (df_cobranza is None or df_cobranza.empty):
         st.info("No hay cobranza registrada")
@@ -4300,11 +3908,11 @@ def mostrar_cobranza(df_polizas, df_cobranza):
     if df_cobranza is not None and not df_cobranza.empty:
         # Usar ID_Cobranza para evitar duplicados si existe, si no usar No. Póliza y Recibo
         if 'ID_Cobranza' in df_cobranza.columns and 'ID_Cobranza' in df_cobranza_proxima.columns:
-            df_cobranza_completa = pd.concat([df_cobranza, df_cobranza_proxima]).drop_duplicates(
+            df_cobranza_completa = pd.concat([df_cobranza, df_cobranza_proxima], ignore_index=True).drop_duplicates(
                 subset=['ID_Cobranza'], keep='last'
             )
         else:
-            df_cobranza_completa = pd.concat([df_cobranza, df_cobranza_proxima]).drop_duplicates(
+            df_cobranza_completa = pd.concat([df_cobranza, df_cobranza_proxima], ignore_index=True).drop_duplicates(
                 subset=['No. Póliza', 'Recibo'], keep='last'
             )
     else:
@@ -4329,57 +3937,16 @@ def mostrar_cobranza(df_polizas, df_cobranza):
     # Obtener información de las pólizas
     df_mostrar_con_info = df_mostrar.copy()
     
-    # Buscar la información adicional para cada póliza
-    for idx, row in df_mostrar_con_info.iterrows():
-        no_poliza = row['No. Póliza']
-        poliza_info = df_polizas[df_polizas['No. Póliza'].astype(str) == str(no_poliza)]
-        
-        if not poliza_info.empty:
-            clave_emision = poliza_info.iloc[0].get('Clave de Emisión', '')
-            df_mostrar_con_info.at[idx, 'Clave de Emisión'] = clave_emision
-        else:
-            df_mostrar_con_info.at[idx, 'Clave de Emisión'] = ""
+    # Clave de Emisión de la póliza (la primera captura de cada No. Póliza)
+    df_mostrar_con_info['Clave de Emisión'] = claves_emision_por_poliza(df_polizas, df_mostrar_con_info['No. Póliza'])
 
-    # Calcular días transcurridos desde el vencimiento
-    hoy = datetime.now().date()
-    
-    def calcular_dias_transcurridos(fecha_vencimiento_str):
-        if not fecha_vencimiento_str or pd.isna(fecha_vencimiento_str) or fecha_vencimiento_str == "":
-            return None
-        
-        try:
-            # Convertir fecha de vencimiento a datetime
-            fecha_vencimiento = datetime.strptime(fecha_vencimiento_str, "%d/%m/%Y").date()
-            # Calcular días transcurridos desde la fecha de vencimiento
-            dias_transcurridos = (hoy - fecha_vencimiento).days
-            return max(0, dias_transcurridos)  # No mostrar negativos
-        except:
-            return None
-
-    # Aplicar cálculo de días transcurridos
-    df_mostrar_con_info['Días Transcurridos'] = df_mostrar_con_info['Fecha Vencimiento'].apply(calcular_dias_transcurridos)
+    # Días transcurridos desde el vencimiento (mismo cálculo que el proceso nocturno de estatus)
+    dias_atraso = calcular_antiguedad(df_mostrar_con_info['Fecha Vencimiento'])['Días Atraso']
+    df_mostrar_con_info['Días Transcurridos'] = dias_atraso.astype(object).where(dias_atraso.notna(), None)
 
     # Formatear montos con 2 decimales y separador de miles
-    def formatear_monto(monto):
-        try:
-            if pd.isna(monto) or monto == "" or monto is None:
-                return "0.00"
-            # Si ya es float, formatearlo directamente
-            if isinstance(monto, (int, float)):
-                return f"{monto:,.2f}"
-            # Si es string, limpiarlo y convertir
-            monto_limpio = str(monto).replace(',', '').replace('$', '').replace(' ', '').strip()
-            if monto_limpio == '':
-                return "0.00"
-            monto_float = float(monto_limpio)
-            return f"{monto_float:,.2f}"
-        except Exception as e:
-            print(f"Error formateando monto '{monto}': {e}")
-            return "0.00"
-
-    # Aplicar formato a los montos
-    df_mostrar_con_info['Prima de Recibo Formateado'] = df_mostrar_con_info['Prima de Recibo'].apply(formatear_monto)
-    df_mostrar_con_info['Monto Pagado Formateado'] = df_mostrar_con_info['Monto Pagado'].apply(formatear_monto)
+    df_mostrar_con_info['Prima de Recibo Formateado'] = formatear_montos(df_mostrar_con_info['Prima de Recibo'])
+    df_mostrar_con_info['Monto Pagado Formateado'] = formatear_montos(df_mostrar_con_info['Monto Pagado'])
 
     # Crear DataFrame para mostrar
     columnas_base = [
@@ -4398,32 +3965,37 @@ def mostrar_cobranza(df_polizas, df_cobranza):
         'Monto Pagado Formateado': 'Monto Pagado'
     })
 
-    # Aplicar colores según estatus y días transcurridos
-    def color_row_by_status(row):
-        estatus = row.get('Estatus', '')
-        dias_transcurridos = row.get('Días Transcurridos', 0)
-        
-        if estatus == 'Vencido':
-            return ['background-color: #8B0000; color: white; font-weight: bold;'] * len(row)
-        elif estatus == 'Pagado':
-            return ['background-color: #d4edda; color: #155724;'] * len(row)
-        elif dias_transcurridos is None:
-            return [''] * len(row)
-        elif dias_transcurridos >= 20:
-            return ['background-color: #f8d7da; color: #721c24; font-weight: bold;'] * len(row)
-        elif dias_transcurridos >= 11:
-            return ['background-color: #ffe6cc; color: #cc6600; font-weight: bold;'] * len(row)
-        elif dias_transcurridos >= 5:
-            return ['background-color: #fff3cd; color: #856404;'] * len(row)
-        else:
-            return ['background-color: #d4edda; color: #155724;'] * len(row)
+    # Aplicar colores según estatus y días transcurridos (una llamada para toda la tabla)
+    def color_row_by_status(tabla):
+        estatus = tabla['Estatus'].astype(str).to_numpy() if 'Estatus' in tabla.columns else np.full(len(tabla), '')
+        dias = pd.to_numeric(
+            tabla['Días Transcurridos'] if 'Días Transcurridos' in tabla.columns else pd.Series(np.nan, index=tabla.index),
+            errors='coerce'
+        ).to_numpy(dtype=float)
+        estilo_fila = np.select(
+            [estatus == 'Vencido', estatus == 'Pagado', np.isnan(dias), dias >= 20, dias >= 11, dias >= 5],
+            ['background-color: #8B0000; color: white; font-weight: bold;',
+             'background-color: #d4edda; color: #155724;',
+             '',
+             'background-color: #f8d7da; color: #721c24; font-weight: bold;',
+             'background-color: #ffe6cc; color: #cc6600; font-weight: bold;',
+             'background-color: #fff3cd; color: #856404;'],
+            default='background-color: #d4edda; color: #155724;'
+        )
+        return pd.DataFrame(np.repeat(estilo_fila[:, None], tabla.shape[1], axis=1),
+                            index=tabla.index, columns=tabla.columns)
 
-    # Mostrar el DataFrame sin índice
-    try:
-        styled_df = df_display.style.apply(color_row_by_status, axis=1)
-        st.dataframe(styled_df, use_container_width=True, hide_index=True)
-    except Exception:
-        st.dataframe(df_display, use_container_width=True, hide_index=True)
+    # Mostrar sólo la página visible; el estilo por fila se calcula sobre esa página
+    tabla_paginada(df_display, key="tabla_cobranza",
+                   estilo=lambda pagina: pagina.style.apply(color_row_by_status, axis=None))
+
+    # Exportar la vista filtrada con los montos sin formato
+    columnas_exportar = [col for col in COLUMNAS_COBRANZA + ['Días Transcurridos'] if col in df_mostrar_con_info.columns]
+    with st.expander("📤 Exportar vista de cobranza"):
+        botones_exportacion(df_mostrar_con_info[columnas_exportar], "cobranza", key="exportar_cobranza", nombre_hoja="Cobranza")
+
+    mostrar_antiguedad_saldos()
+    mostrar_pronostico_cobranza()
 
     # Leyenda de colores
     st.markdown("""
@@ -4437,272 +4009,375 @@ def mostrar_cobranza(df_polizas, df_cobranza):
     - ⚫ **Gris:** Recibos cancelados
     """)
 
-    # Formulario para registrar pagos (incluye recibos vencidos)
-    st.subheader("Registrar Pago (Incluye Vencidos)")
-
-    # Inicializar estado para la selección de cobranza
-    if 'cobranza_seleccionada' not in st.session_state:
-        st.session_state.cobranza_seleccionada = None
-    if 'info_cobranza_actual' not in st.session_state:
-        st.session_state.info_cobranza_actual = None
-
-    # Crear lista de opciones para selección individual de recibos (excluye pagados)
-    if not df_mostrar_con_info.empty:
-        df_no_pagados = df_mostrar_con_info[~df_mostrar_con_info['Estatus'].isin(['Pagado'])]
+    # Selección de recibo y formulario de pago: al elegir otro recibo sólo se vuelve a ejecutar esta sección
+    @st.fragment
+    def mostrar_registro_pago(df_cobranza_completa):
+        # Formulario para registrar pagos (incluye recibos vencidos)
+        st.subheader("Registrar Pago (Incluye Vencidos)")
+
+        # Inicializar estado para la selección de cobranza
+        if 'cobranza_seleccionada' not in st.session_state:
+            st.session_state.cobranza_seleccionada = None
+        if 'info_cobranza_actual' not in st.session_state:
+            st.session_state.info_cobranza_actual = None
+
+        # Crear lista de opciones para selección individual de recibos (excluye pagados)
+        if not df_mostrar_con_info.empty:
+            df_no_pagados = df_mostrar_con_info[~df_mostrar_con_info['Estatus'].isin(['Pagado'])]
         
-        if not df_no_pagados.empty:
-            opciones_cobranza = []
-            for idx, row in df_no_pagados.iterrows():
-                # Formatear monto
-                monto_formateado = formatear_monto(row.get('Prima de Recibo', 0))
-                # Crear descripción amigable
-                estatus_display = "VENCIDO" if row.get('Estatus') == 'Vencido' else row.get('Estatus', '')
-                descripcion = f"{row['No. Póliza']} - Recibo {row['Recibo']} - {row.get('Nombre/Razón Social', '')} - {monto_formateado} {row.get('Moneda', 'MXN')} - Vence: {row.get('Fecha Vencimiento', '')} - {estatus_display}"
-                opciones_cobranza.append({
-                    'descripcion': descripcion,
-                    'id_cobranza': f"{row['No. Póliza']}_R{row['Recibo']}",
-                    'datos': row
-                })
+            if not df_no_pagados.empty:
+                # Descripción amigable -> Recibo
+                opciones_cobranza = {}
+                for recibo, monto_formateado in zip(Recibo.desde_dataframe(df_no_pagados),
+                                                    df_no_pagados['Prima de Recibo Formateado'].tolist()):
+                    estatus_display = "VENCIDO" if recibo.estatus == 'Vencido' else recibo.estatus
+                    descripcion = f"{recibo.no_poliza} - Recibo {recibo.recibo} - {recibo.nombre} - {monto_formateado} {recibo.moneda or 'MXN'} - Vence: {recibo.fecha_vencimiento} - {estatus_display}"
+                    opciones_cobranza[descripcion] = recibo
             
-            # Selector de recibo específico
-            if opciones_cobranza:
-                opcion_seleccionada = st.selectbox(
-                    "Seleccionar Recibo de Cobranza",
-                    options=[""] + [opc['descripcion'] for opc in opciones_cobranza],
-                    key="select_recibo_cobranza"
-                )
+                # Selector de recibo específico
+                if opciones_cobranza:
+                    opcion_seleccionada = st.selectbox(
+                        "Seleccionar Recibo de Cobranza",
+                        options=[""] + list(opciones_cobranza),
+                        key="select_recibo_cobranza"
+                    )
                 
-                if opcion_seleccionada:
-                    # Encontrar los datos del recibo seleccionado
-                    recibo_seleccionado = next((opc for opc in opciones_cobranza if opc['descripcion'] == opcion_seleccionada), None)
+                    if opcion_seleccionada:
+                        # Encontrar los datos del recibo seleccionado
+                        info_cobranza = opciones_cobranza.get(opcion_seleccionada)
                     
-                    if recibo_seleccionado:
-                        info_cobranza = recibo_seleccionado['datos']
-                        st.session_state.cobranza_seleccionada = recibo_seleccionado['id_cobranza']
-                        st.session_state.info_cobranza_actual = info_cobranza
+                        if info_cobranza:
+                            st.session_state.cobranza_seleccionada = f"{info_cobranza.no_poliza}_R{info_cobranza.recibo}"
+                            st.session_state.info_cobranza_actual = info_cobranza
                         
-                        # Mostrar información del recibo seleccionado
-                        col_info1, col_info2 = st.columns(2)
+                            # Mostrar información del recibo seleccionado
+                            col_info1, col_info2 = st.columns(2)
                         
-                        with col_info1:
-                            st.write(f"**Recibo seleccionado:** {info_cobranza.get('Recibo', '')}")
-                            st.write(f"**Cliente:** {info_cobranza.get('Nombre/Razón Social', '')}")
-                            st.write(f"**No. Póliza:** {info_cobranza.get('No. Póliza', '')}")
-                            st.write(f"**Clave de Emisión:** {info_cobranza.get('Clave de Emisión', 'No disponible')}")
+                            with col_info1:
+                                st.write(f"**Recibo seleccionado:** {info_cobranza.recibo}")
+                                st.write(f"**Cliente:** {info_cobranza.nombre}")
+                                st.write(f"**No. Póliza:** {info_cobranza.no_poliza}")
+                                st.write(f"**Clave de Emisión:** {info_cobranza.clave_emision or 'No disponible'}")
                         
-                        with col_info2:
-                            # Mostrar Prima de Recibo directamente
-                            prima_recibo = info_cobranza.get('Prima de Recibo', 0)
-                            moneda = info_cobranza.get('Moneda', 'MXN')
-                            prima_recibo_formateado = formatear_monto(prima_recibo)
-                            st.write(f"**Prima de Recibo:** {prima_recibo_formateado} {moneda}")
-                            st.write(f"**Fecha Vencimiento:** {info_cobranza.get('Fecha Vencimiento', '')}")
-                            st.write(f"**Periodicidad:** {info_cobranza.get('Periodicidad', '')}")
-                            st.write(f"**Estatus actual:** {info_cobranza.get('Estatus', '')}")
+                            with col_info2:
+                                # Mostrar Prima de Recibo directamente
+                                moneda = info_cobranza.moneda or 'MXN'
+                                prima_recibo_formateado = formatear_monto(info_cobranza.prima_recibo / 100)
+                                st.write(f"**Prima de Recibo:** {prima_recibo_formateado} {moneda}")
+                                st.write(f"**Fecha Vencimiento:** {info_cobranza.fecha_vencimiento}")
+                                st.write(f"**Periodicidad:** {info_cobranza.periodicidad}")
+                                st.write(f"**Estatus actual:** {info_cobranza.estatus}")
                         
-                        # Mostrar comentario si existe
-                        comentario = info_cobranza.get('Comentario', '')
-                        if comentario:
-                            st.warning(f"**Comentario:** {comentario}")
+                            # Mostrar comentario si existe
+                            comentario = info_cobranza.comentario
+                            if comentario:
+                                st.warning(f"**Comentario:** {comentario}")
                         
-                        # Mostrar días transcurridos
-                        dias_transcurridos = calcular_dias_transcurridos(info_cobranza.get('Fecha Vencimiento', ''))
-                        if dias_transcurridos is not None and dias_transcurridos > 0:
-                            st.error(f"**⚠️ ALERTA:** Este recibo tiene {dias_transcurridos} días de vencido")
-
-                        # Formulario para el pago - SOLO SE MUESTRA CUANDO HAY UN RECIBO SELECCIONADO
-                        with st.form("form_pago"):
-                            col_form1, col_form2 = st.columns(2)
+                            # Mostrar días transcurridos
+                            dias_transcurridos = calcular_antiguedad(
+                                pd.Series([info_cobranza.fecha_vencimiento])
+                            )['Días Atraso'].iloc[0]
+                            if pd.notna(dias_transcurridos) and dias_transcurridos > 0:
+                                st.error(f"**⚠️ ALERTA:** Este recibo tiene {dias_transcurridos} días de vencido")
+
+                            # Formulario para el pago - SOLO SE MUESTRA CUANDO HAY UN RECIBO SELECCIONADO
+                            with st.form("form_pago"):
+                                col_form1, col_form2 = st.columns(2)
                             
-                            with col_form1:
-                                # Monto Pagado con valor por defecto igual a la prima
-                                monto_prima = info_cobranza.get('Prima de Recibo', 0)
-                                monto_pagado = st.number_input(
-                                    "Monto Pagado", 
-                                    min_value=0.0,
-                                    value=float(monto_prima) if monto_prima else 0.0,
-                                    step=0.01, 
-                                    key="monto_pagado"
-                                )
+                                with col_form1:
+                                    # Monto Pagado con valor por defecto igual a la prima
+                                    monto_pagado = st.number_input(
+                                        "Monto Pagado", 
+                                        min_value=0.0,
+                                        value=info_cobranza.prima_recibo / 100,
+                                        step=0.01, 
+                                        key="monto_pagado"
+                                    )
                                 
-                                # Mostrar la moneda del pago
-                                moneda_cobranza = info_cobranza.get('Moneda', 'MXN')
-                                st.write(f"**Moneda del pago:** {moneda_cobranza}")
+                                    # Mostrar la moneda del pago
+                                    moneda_cobranza = info_cobranza.moneda or 'MXN'
+                                    st.write(f"**Moneda del pago:** {moneda_cobranza}")
                             
-                            with col_form2:
-                                fecha_pago = st.text_input(
-                                    "Fecha de Pago (dd/mm/yyyy)", 
-                                    value="", 
-                                    placeholder="dd/mm/yyyy",
-                                    key="fecha_pago_cob"
-                                )
+                                with col_form2:
+                                    fecha_pago = st.text_input(
+                                        "Fecha de Pago (dd/mm/yyyy)", 
+                                        value="", 
+                                        placeholder="dd/mm/yyyy",
+                                        key="fecha_pago_cob"
+                                    )
                                 
-                                # Campo opcional para comentario de pago
-                                comentario_pago = st.text_area(
-                                    "Comentario del Pago (opcional)",
-                                    placeholder="Ej: Pago realizado con retraso, se contactó al cliente, etc.",
-                                    key="comentario_pago"
-                                )
-
-                            submitted = st.form_submit_button("💾 Registrar Pago")
+                                    # Campo opcional para comentario de pago
+                                    comentario_pago = st.text_area(
+                                        "Comentario del Pago (opcional)",
+                                        placeholder="Ej: Pago realizado con retraso, se contactó al cliente, etc.",
+                                        key="comentario_pago"
+                                    )
+
+                                submitted = st.form_submit_button("💾 Registrar Pago")
                             
-                            if submitted:
-                                # Validaciones
-                                if monto_pagado <= 0:
-                                    st.warning("El monto pagado debe ser mayor a 0")
-                                else:
-                                    valido, error = validar_fecha(fecha_pago)
-                                    if not valido:
-                                        st.error(f"Fecha de pago: {error}")
+                                if submitted:
+                                    # Validaciones
+                                    if monto_pagado <= 0:
+                                        st.warning("El monto pagado debe ser mayor a 0")
                                     else:
-                                        # Buscar el registro específico por ID único
-                                        mask = (
-                                            (df_cobranza_completa['No. Póliza'] == info_cobranza['No. Póliza']) & 
-                                            (df_cobranza_completa['Recibo'] == info_cobranza['Recibo'])
-                                        )
+                                        valido, error = validar_fecha(fecha_pago)
+                                        if not valido:
+                                            st.error(f"Fecha de pago: {error}")
+                                        else:
+                                            # Buscar el registro específico por ID único
+                                            mask = (
+                                                (df_cobranza_completa['No. Póliza'] == info_cobranza.no_poliza) & 
+                                                (df_cobranza_completa['Recibo'] == info_cobranza.recibo)
+                                            )
                                         
-                                        if mask.any():
-                                            # Actualizar el monto pagado, fecha, estatus y comentario
-                                            df_cobranza_completa.loc[mask, 'Monto Pagado'] = monto_pagado
-                                            df_cobranza_completa.loc[mask, 'Fecha Pago'] = fecha_pago
-                                            df_cobranza_completa.loc[mask, 'Estatus'] = 'Pagado'
+                                            if mask.any():
+                                                # Actualizar el monto pagado, fecha, estatus y comentario
+                                                df_cobranza_completa.loc[mask, 'Monto Pagado'] = monto_pagado
+                                                df_cobranza_completa.loc[mask, 'Fecha Pago'] = fecha_pago
+                                                df_cobranza_completa.loc[mask, 'Estatus'] = 'Pagado'
                                             
-                                            # Actualizar días de atraso si existe la columna
-                                            if 'Días Atraso' in df_cobranza_completa.columns:
-                                                fecha_vencimiento = info_cobranza.get('Fecha Vencimiento', '')
-                                                if fecha_vencimiento:
-                                                    try:
-                                                        fecha_vencimiento_dt = datetime.strptime(fecha_vencimiento, "%d/%m/%Y")
-                                                        fecha_pago_dt = datetime.strptime(fecha_pago, "%d/%m/%Y")
-                                                        dias_atraso = max(0, (fecha_pago_dt - fecha_vencimiento_dt).days)
-                                                        df_cobranza_completa.loc[mask, 'Días Atraso'] = dias_atraso
-                                                    except:
-                                                        pass
+                                                # Actualizar días de atraso si existe la columna
+                                                if 'Días Atraso' in df_cobranza_completa.columns:
+                                                    fecha_vencimiento = info_cobranza.fecha_vencimiento
+                                                    if fecha_vencimiento:
+                                                        try:
+                                                            fecha_vencimiento_dt = datetime.strptime(fecha_vencimiento, "%d/%m/%Y")
+                                                            fecha_pago_dt = datetime.strptime(fecha_pago, "%d/%m/%Y")
+                                                            dias_atraso = max(0, (fecha_pago_dt - fecha_vencimiento_dt).days)
+                                                            df_cobranza_completa.loc[mask, 'Días Atraso'] = dias_atraso
+                                                        except:
+                                                            pass
                                             
-                                            # Agregar comentario si se proporcionó
-                                            if comentario_pago:
-                                                comentario_actual = df_cobranza_completa.loc[mask, 'Comentario'].values[0]
-                                                nuevo_comentario = f"{comentario_actual} | Pago: {comentario_pago}" if comentario_actual else f"Pago: {comentario_pago}"
-                                                df_cobranza_completa.loc[mask, 'Comentario'] = nuevo_comentario
-                                        else:
-                                            # Si no existe (caso raro), agregamos un registro como pagado
-                                            nuevo = {
-                                                "No. Póliza": info_cobranza['No. Póliza'],
-                                                "Nombre/Razón Social": info_cobranza.get('Nombre/Razón Social', ''),
-                                                "Mes Cobranza": info_cobranza.get('Mes Cobranza', ''),
-                                                "Fecha Vencimiento": info_cobranza.get('Fecha Vencimiento', ''),
-                                                "Prima de Recibo": info_cobranza.get('Prima de Recibo', 0),
-                                                "Monto Pagado": monto_pagado,
-                                                "Fecha Pago": fecha_pago,
-                                                "Estatus": "Pagado",
-                                                "Periodicidad": info_cobranza.get('Periodicidad', ''),
-                                                "Moneda": info_cobranza.get('Moneda', 'MXN'),
-                                                "Recibo": info_cobranza.get('Recibo', ''),
-                                                "Clave de Emisión": info_cobranza.get('Clave de Emisión', ''),
-                                                "Comentario": f"Pago: {comentario_pago}" if comentario_pago else "",
-                                                "ID_Cobranza": f"{info_cobranza['No. Póliza']}_R{info_cobranza.get('Recibo', '')}"
-                                            }
-                                            df_cobranza_completa = pd.concat([df_cobranza_completa, pd.DataFrame([nuevo])], ignore_index=True)
-
-                                        if guardar_datos(df_cobranza=df_cobranza_completa):
-                                            st.success("✅ Pago registrado correctamente")
-                                            st.rerun()
-                                        else:
-                                            st.error("❌ Error al registrar el pago")
+                                                # Agregar comentario si se proporcionó
+                                                if comentario_pago:
+                                                    comentario_actual = df_cobranza_completa.loc[mask, 'Comentario'].values[0]
+                                                    nuevo_comentario = f"{comentario_actual} | Pago: {comentario_pago}" if comentario_actual else f"Pago: {comentario_pago}"
+                                                    df_cobranza_completa.loc[mask, 'Comentario'] = nuevo_comentario
+                                            else:
+                                                # Si no existe (caso raro), agregamos un registro como pagado
+                                                nuevo = {
+                                                    **info_cobranza.a_dict(),
+                                                    "Monto Pagado": monto_pagado,
+                                                    "Fecha Pago": fecha_pago,
+                                                    "Estatus": "Pagado",
+                                                    "Moneda": info_cobranza.moneda or 'MXN',
+                                                    "Comentario": f"Pago: {comentario_pago}" if comentario_pago else "",
+                                                    "ID_Cobranza": f"{info_cobranza.no_poliza}_R{info_cobranza.recibo}"
+                                                }
+                                                df_cobranza_completa = pd.concat([df_cobranza_completa, pd.DataFrame([nuevo])], ignore_index=True)
+
+                                            if guardar_datos(df_cobranza=df_cobranza_completa):
+                                                registrar_comisiones(df_cobranza_completa[
+                                                    (df_cobranza_completa['No. Póliza'] == info_cobranza.no_poliza) &
+                                                    (df_cobranza_completa['Recibo'] == info_cobranza.recibo)
+                                                ], df_polizas)
+                                                st.success("✅ Pago registrado correctamente")
+                                                st.rerun()
+                                            else:
+                                                st.error("❌ Error al registrar el pago")
+                    else:
+                        st.info("Seleccione un recibo de cobranza para registrar el pago")
                 else:
-                    st.info("Seleccione un recibo de cobranza para registrar el pago")
+                    st.info("No hay recibos pendientes o vencidos disponibles para seleccionar")
             else:
-                st.info("No hay recibos pendientes o vencidos disponibles para seleccionar")
+                st.success("🎉 ¡Todos los recibos están pagados!")
         else:
-            st.success("🎉 ¡Todos los recibos están pagados!")
-    else:
-        st.info("No hay recibos para mostrar")
+            st.info("No hay recibos para mostrar")
+
+    mostrar_registro_pago(df_cobranza_completa)
+
     # Sección para gestión de recibos
     st.markdown("---")
-    df_cobranza_completa = mostrar_gestion_recibos(df_cobranza_completa)
+    mostrar_gestion_recibos(df_cobranza_completa)
+    mostrar_cancelacion_masiva(df_polizas, df_cobranza)
+    mostrar_conciliacion_bancaria(df_polizas, df_cobranza)
+    mostrar_comisiones(df_polizas, df_cobranza)
     st.markdown("---")
-    # HISTORIAL DE PAGOS CON FILTROS MEJORADOS
-    if df_cobranza is not None and not df_cobranza.empty:
-        if 'Estatus' in df_cobranza.columns:
-            df_pagados = df_cobranza[df_cobranza['Estatus'] == 'Pagado']
-        else:
-            df_pagados = pd.DataFrame()
-            
-        if not df_pagados.empty:
-            st.subheader("📋 Historial de Pagos")
+    # HISTORIAL DE PAGOS CON FILTROS MEJORADOS (los filtros sólo vuelven a ejecutar esta sección)
+    @st.fragment
+    def mostrar_historial_pagos():
+        if df_cobranza is not None and not df_cobranza.empty:
+            if 'Estatus' in df_cobranza.columns:
+                df_pagados = df_cobranza[df_cobranza['Estatus'] == 'Pagado']
+            else:
+                df_pagados = pd.DataFrame()
             
-            # Enriquecer el historial con información de las pólizas (Clave de Emisión)
-            df_historial = df_pagados.copy()
+            if not df_pagados.empty:
+                st.subheader("📋 Historial de Pagos")
             
-            # Agregar Clave de Emisión al historial
-            claves_emision = []
-            for idx, pago in df_historial.iterrows():
-                no_poliza = pago['No. Póliza']
-                poliza_info = df_polizas[df_polizas['No. Póliza'].astype(str) == str(no_poliza)]
-                if not poliza_info.empty:
-                    claves_emision.append(poliza_info.iloc[0].get('Clave de Emisión', ''))
-                else:
-                    claves_emision.append('')
+                # Enriquecer el historial con información de las pólizas (Clave de Emisión)
+                df_historial = df_pagados.copy()
             
-            df_historial['Clave de Emisión'] = claves_emision
+                # Agregar Clave de Emisión al historial
+                df_historial['Clave de Emisión'] = claves_emision_por_poliza(df_polizas, df_historial['No. Póliza'])
             
-            # Crear columnas de año y mes para filtros
-            df_historial['Fecha Pago DT'] = pd.to_datetime(df_historial['Fecha Pago'], dayfirst=True, errors='coerce')
-            df_historial['Año'] = df_historial['Fecha Pago DT'].dt.year
-            df_historial['Mes'] = df_historial['Fecha Pago DT'].dt.month
+                # Crear columnas de año y mes para filtros
+                df_historial['Fecha Pago DT'] = pd.to_datetime(df_historial['Fecha Pago'], dayfirst=True, errors='coerce')
+                df_historial['Año'] = df_historial['Fecha Pago DT'].dt.year
+                df_historial['Mes'] = df_historial['Fecha Pago DT'].dt.month
             
-            # Filtros
-            col_filtro1, col_filtro2 = st.columns(2)
+                # Filtros
+                col_filtro1, col_filtro2 = st.columns(2)
             
-            with col_filtro1:
-                años = sorted(df_historial['Año'].dropna().unique(), reverse=True)
-                año_seleccionado = st.selectbox(
-                    "Filtrar por Año",
-                    options=["Todos"] + años,
-                    key="filtro_año_historial"
-                )
+                with col_filtro1:
+                    años = sorted(df_historial['Año'].dropna().unique(), reverse=True)
+                    año_seleccionado = st.selectbox(
+                        "Filtrar por Año",
+                        options=["Todos"] + años,
+                        key="filtro_año_historial"
+                    )
             
-            with col_filtro2:
-                if año_seleccionado != "Todos":
-                    meses_disponibles = sorted(df_historial[df_historial['Año'] == año_seleccionado]['Mes'].dropna().unique(), reverse=True)
-                else:
-                    meses_disponibles = sorted(df_historial['Mes'].dropna().unique(), reverse=True)
+                with col_filtro2:
+                    if año_seleccionado != "Todos":
+                        meses_disponibles = sorted(df_historial[df_historial['Año'] == año_seleccionado]['Mes'].dropna().unique(), reverse=True)
+                    else:
+                        meses_disponibles = sorted(df_historial['Mes'].dropna().unique(), reverse=True)
                 
-                mes_seleccionado = st.selectbox(
-                    "Filtrar por Mes",
-                    options=["Todos"] + meses_disponibles,
-                    key="filtro_mes_historial"
-                )
+                    mes_seleccionado = st.selectbox(
+                        "Filtrar por Mes",
+                        options=["Todos"] + meses_disponibles,
+                        key="filtro_mes_historial"
+                    )
             
-            # Aplicar filtros
-            df_filtrado = df_historial.copy()
-            if año_seleccionado != "Todos":
-                df_filtrado = df_filtrado[df_filtrado['Año'] == año_seleccionado]
-            if mes_seleccionado != "Todos":
-                df_filtrado = df_filtrado[df_filtrado['Mes'] == mes_seleccionado]
+                # Aplicar filtros
+                df_filtrado = df_historial.copy()
+                if año_seleccionado != "Todos":
+                    df_filtrado = df_filtrado[df_filtrado['Año'] == año_seleccionado]
+                if mes_seleccionado != "Todos":
+                    df_filtrado = df_filtrado[df_filtrado['Mes'] == mes_seleccionado]
             
-            # Formatear montos para el historial
-            df_filtrado['Prima de Recibo Formateado'] = df_filtrado['Prima de Recibo'].apply(formatear_monto)
-            df_filtrado['Monto Pagado Formateado'] = df_filtrado['Monto Pagado'].apply(formatear_monto)
+                # Formatear montos para el historial
+                df_filtrado['Prima de Recibo Formateado'] = formatear_montos(df_filtrado['Prima de Recibo'])
+                df_filtrado['Monto Pagado Formateado'] = formatear_montos(df_filtrado['Monto Pagado'])
             
-            # Columnas para mostrar en el historial
-            columnas_historial = [
-                'Recibo', 'No. Póliza', 'Nombre/Razón Social', 'Mes Cobranza', 
-                'Prima de Recibo Formateado', 'Monto Pagado Formateado', 'Fecha Pago',
-                'Periodicidad', 'Moneda', 'Clave de Emisión', 'Comentario'
-            ]
-            columnas_disponibles = [col for col in columnas_historial if col in df_filtrado.columns]
+                # Columnas para mostrar en el historial
+                columnas_historial = [
+                    'Recibo', 'No. Póliza', 'Nombre/Razón Social', 'Mes Cobranza', 
+                    'Prima de Recibo Formateado', 'Monto Pagado Formateado', 'Fecha Pago',
+                    'Periodicidad', 'Moneda', 'Clave de Emisión', 'Comentario'
+                ]
+                columnas_disponibles = [col for col in columnas_historial if col in df_filtrado.columns]
             
-            # Renombrar columnas para mostrar
-            df_historial_display = df_filtrado[columnas_disponibles].rename(columns={
-                'Prima de Recibo Formateado': 'Prima de Recibo',
-                'Monto Pagado Formateado': 'Monto Pagado'
-            })
+                # Renombrar columnas para mostrar
+                df_historial_display = df_filtrado[columnas_disponibles].rename(columns={
+                    'Prima de Recibo Formateado': 'Prima de Recibo',
+                    'Monto Pagado Formateado': 'Monto Pagado'
+                })
             
-            # Mostrar estadísticas del filtro aplicado
-            st.write(f"**Mostrando {len(df_filtrado)} registros**")
+                # Mostrar estadísticas del filtro aplicado
+                st.write(f"**Mostrando {len(df_filtrado)} registros**")
+                if 'Moneda' in df_filtrado.columns and not df_filtrado.empty:
+                    aviso_monedas_sin_tasa(df_filtrado['Moneda'])
+                    # Cada pago se convierte y redondea al centavo; la suma se hace en enteros
+                    cobrado_mxn = obtener_tipos_cambio().a_mxn(
+                        a_centavos(df_filtrado['Monto Pagado']), df_filtrado['Moneda'], df_filtrado['Fecha Pago DT']
+                    )
+                    total_centavos = pd.Series([np.rint(cobrado_mxn).dropna().astype("int64").sum()], dtype="Int64")
+                    st.metric("Total Cobrado (MXN al tipo de cambio de la fecha de pago)",
+                              formatear_centavos(total_centavos, simbolo="$").iloc[0])
             
-            st.dataframe(df_historial_display, use_container_width=True, hide_index=True)
+                tabla_paginada(df_historial_display, key="tabla_historial_pagos")
+
+                columnas_exportar = [col for col in columnas_historial if col in df_filtrado.columns and not col.endswith('Formateado')]
+                with st.expander("📤 Exportar historial de pagos"):
+                    botones_exportacion(df_filtrado[columnas_exportar + ['Prima de Recibo', 'Monto Pagado']], "historial_pagos", key="exportar_historial", nombre_hoja="Pagos")
+
+    mostrar_historial_pagos()
+
+# 8. Importación masiva de pólizas y recibos
+@trazado
+def mostrar_importacion(df_polizas, df_cobranza):
+    st.header("📥 Importación Masiva")
+    st.markdown(
+        "Cargue un CSV o Excel con los mismos encabezados de la hoja destino. "
+        "Las fechas deben venir en formato dd/mm/yyyy y los catálogos con los valores del sistema."
+    )
+
+    tipos = {"Pólizas": "polizas", "Recibos de Cobranza": "cobranza"}
+    tipo_label = st.radio("Tipo de importación", list(tipos.keys()), horizontal=True, key="tipo_importacion")
+    tipo = tipos[tipo_label]
+
+    archivo = st.file_uploader("Archivo a importar", type=["csv", "xlsx"], key="archivo_importacion")
+    if archivo is None:
+        return
+
+    try:
+        df_archivo = leer_archivo(archivo, archivo.name)
+        aceptadas, rechazadas = validar_importacion(tipo, df_archivo, df_polizas, df_cobranza)
+    except Exception as e:
+        st.error(f"❌ No se pudo validar el archivo: {e}")
+        return
+
+    ignoradas = columnas_desconocidas(df_archivo, tipo)
+    if ignoradas:
+        st.warning(f"⚠️ Columnas ignoradas: {', '.join(ignoradas)}")
+
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Filas en archivo", len(df_archivo))
+    with col2:
+        st.metric("Aceptadas", len(aceptadas))
+    with col3:
+        st.metric("Rechazadas", len(rechazadas))
+
+    if not rechazadas.empty:
+        st.subheader("❌ Filas Rechazadas")
+        st.dataframe(rechazadas.head(500), use_container_width=True, hide_index=True)
+        st.download_button(
+            "⬇️ Descargar reporte de errores",
+            data=rechazadas.to_csv(index=False).encode("utf-8-sig"),
+            file_name=f"rechazos_{tipo}.csv",
+            mime="text/csv",
+            key="descargar_rechazos"
+        )
+
+    if aceptadas.empty:
+        st.info("No hay filas válidas para importar")
+        return
+
+    st.subheader("✅ Vista Previa de Filas Aceptadas")
+    st.dataframe(aceptadas.head(100), use_container_width=True, hide_index=True)
+
+    hoja = HOJA_DESTINO[tipo]
+    if st.button(f"💾 Importar {len(aceptadas)} filas a '{hoja}'", type="primary", key="btn_importar"):
+        try:
+            spreadsheet = conectar_google_sheets()
+            if not spreadsheet:
+                return
+            agregadas = agregar_filas(spreadsheet, hoja, aceptadas)
+            invalidar_cache([hoja])
+            st.success(f"✅ {agregadas} filas agregadas a '{hoja}'")
+        except Exception as e:
+            st.error(f"❌ Error al importar: {e}")
+
+# 9. Exportación de hojas y vistas filtradas
+@trazado
+def mostrar_exportacion(datos_por_hoja):
+    st.header("📤 Exportación")
+
+    hoja = st.selectbox("Hoja a exportar", list(datos_por_hoja.keys()), key="hoja_exportacion")
+    df = datos_por_hoja[hoja]
+    if df.empty:
+        st.info("La hoja no tiene registros")
+        return
+
+    # Filtros por columna (valores exactos)
+    columnas_filtro = st.multiselect("Filtrar por columnas", list(df.columns), key=f"columnas_filtro_{hoja}")
+    filtros = {}
+    for columna in columnas_filtro:
+        valores = sorted(df[columna].astype(str).str.strip().unique().tolist())
+        seleccion = st.multiselect(f"Valores de '{columna}'", valores, key=f"filtro_{hoja}_{columna}")
+        if seleccion:
+            filtros[columna] = seleccion
+
+    columnas = st.multiselect("Columnas a exportar", list(df.columns), default=list(df.columns), key=f"columnas_exportar_{hoja}")
+    if not columnas:
+        st.warning("Seleccione al menos una columna")
+        return
+
+    df_filtrado = filtrar_exportacion(df, filtros)
+    st.write(f"**{len(df_filtrado)} de {len(df)} registros**")
+    botones_exportacion(df_filtrado[columnas], hoja.lower(), key=f"exportar_{hoja}", nombre_hoja=hoja)
 
 # ================================
 # FUNCIÓN PRINCIPAL
@@ -4714,11 +4389,11 @@ def main():
     col1, col2, col3 = st.columns([3,1,1])
     with col2:
         if st.button("🔄 Recargar Datos", use_container_width=True):
-            st.cache_data.clear()
+            invalidar_cache()
             st.rerun()
     with col3:
         if st.button("🧹 Limpiar Cache", use_container_width=True):
-            st.cache_data.clear()
+            invalidar_cache()
             st.cache_resource.clear()
             st.success("✅ Cache limpiado")
             st.rerun()
@@ -4735,7 +4410,9 @@ def main():
         "🆕 Póliza Nueva",
         "🔄 Renovaciones",
         "💰 Cobranza",
-        "💰 Operación"
+        "💰 Operación",
+        "📥 Importación Masiva",
+        "📤 Exportación"
     ]
         #"📈 Asesoría Rizkora"  # NUEVA PESTAÑA
     # Usar radio buttons para una selección más confiable
@@ -4772,15 +4449,62 @@ def main():
         mostrar_cobranza(df_polizas, df_cobranza)
     elif st.session_state.active_tab == "💰 Operación":
         mostrar_operacion(df_operacion)
+    elif st.session_state.active_tab == "📥 Importación Masiva":
+        mostrar_importacion(df_polizas, df_cobranza)
+    elif st.session_state.active_tab == "📤 Exportación":
+        mostrar_exportacion(dict(zip(HOJAS, [df_prospectos, df_polizas, df_cobranza, df_seguimiento, df_operacion])))
     #elif st.session_state.active_tab == "📈 Asesoría Rizkora":  # NUEVA PESTAÑA
         #mostrar_asesoria_axa()
 
+# ================================
+# PANEL DE RENDIMIENTO (ADMINISTRADORES)
+# ================================
+def mostrar_panel_instrumentacion(n=10):
+    """Últimas ejecuciones con sus tramos y llamadas a Google Sheets, en la barra lateral"""
+    trazas = obtener_registro_trazas().ultimas(n)
+    with st.sidebar.expander("⏱️ Rendimiento", expanded=False):
+        if not trazas:
+            st.caption("Sin ejecuciones registradas")
+            return
+        resumen = pd.DataFrame([{
+            "Hora": traza.fecha[11:],
+            "Pestaña": traza.nombre,
+            "ms": traza.duracion_ms,
+            "Llamadas": traza.llamadas,
+            "KB": round((traza.bytes_enviados + traza.bytes_recibidos) / 1024, 1),
+        } for traza in trazas])
+        st.dataframe(resumen, use_container_width=True, hide_index=True)
+
+        posicion = st.selectbox(
+            "Detalle de la ejecución", range(len(trazas)),
+            format_func=lambda i: f"{resumen.at[i, 'Hora']} · {resumen.at[i, 'Pestaña']}",
+            key="panel_instrumentacion_traza"
+        )
+        spans = pd.DataFrame(trazas[posicion].spans)
+        if spans.empty:
+            st.caption("Sin tramos registrados")
+            return
+        spans["Tramo"] = ["· " * p + nombre for p, nombre in zip(spans["profundidad"], spans["nombre"])]
+        if "filas" in spans.columns:
+            spans["filas"] = spans["filas"].astype("Int64")
+        detalle = [col for col in ["hoja", "fuente", "recurso", "tabla", "filas", "error"] if col in spans.columns]
+        st.dataframe(spans[["Tramo", "duracion_ms", "llamadas", "bytes"] + detalle], use_container_width=True, hide_index=True)
+        st.caption(f"Bitácora: {obtener_registro_trazas().ruta}")
+
 # ================================
 # EJECUTAR LA APLICACIÓN
 # ================================
 if __name__ == "__main__":
-    # Configurar estilo de matplotlib
-    plt.style.use('seaborn-v0_8-whitegrid')
-    
-    # Ejecutar la aplicación
-    main()
+    iniciar_servidor_metricas()
+    # Ejecutar la aplicación dentro de una traza (una por rerun)
+    try:
+        with obtener_registro_trazas().traza(st.session_state.get("tab_selector", st.session_state.active_tab)):
+            main()
+    finally:
+        if ARCHIVO_METRICAS:
+            try:
+                escribir_metricas(ARCHIVO_METRICAS)
+            except OSError:
+                pass
+    if es_administrador():
+        mostrar_panel_instrumentacion()